@@ -1,15 +1,16 @@
 import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.data_loader import load_data
+
 # Define a function to load the results from a CSV file
 def load_results(file_path):
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    return pd.read_csv(file_path)
+    return load_data(file_path, columns=['model_name', 'true_values', 'predicted_values'])
 
 # Define a function to calculate performance metrics
 def calculate_metrics(true_values, predicted_values):
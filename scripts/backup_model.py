@@ -2,37 +2,81 @@ import os
 import shutil
 import json
 import datetime
+import time
+import sys
 import pickle
 import argparse
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.backup_store import ChunkStore, load_manifest, store_for_backup, throughput
+from src.utils.backup_catalog import BackupCatalog
+
+# Chunks shared by every backup in a backup directory live in this subdirectory
+CHUNK_STORE = 'chunks'
+
 # Define a function to save a model backup
-def backup_model(model, model_name, backup_dir='model_backups', metadata=None):
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+def backup_model(model, model_name, backup_dir='model_backups', metadata=None, codec=None, level=None, n_threads=None):
+    """
+    Back up a model as a manifest of deduplicated chunks in the backup directory's chunk store.
+    Only chunks not already stored by an earlier backup are written, compressed with `codec`
+    (zstd by default) on `n_threads` threads.
+    """
+    created = datetime.datetime.now()
+    timestamp = created.strftime('%Y%m%d_%H%M%S_%f')
     backup_path = os.path.join(backup_dir, f"{model_name}_{timestamp}")
     os.makedirs(backup_path, exist_ok=True)
     
-    # Save the model
-    model_file = os.path.join(backup_path, f"{model_name}.pkl")
-    with open(model_file, 'wb') as f:
-        pickle.dump(model, f)
-    
-    # Save the metadata
-    metadata_file = os.path.join(backup_path, f"{model_name}_metadata.json")
-    if metadata is None:
-        metadata = {}
-    metadata['backup_timestamp'] = timestamp
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f)
+    # Save the model as chunks plus a manifest; the shared store lock keeps garbage collection
+    # away from this backup's chunks until the catalog references them
+    store = ChunkStore(os.path.join(backup_dir, CHUNK_STORE), codec=codec, level=level, n_threads=n_threads)
+    with store.lock():
+        start_time = time.perf_counter()
+        chunks = store.write_object(model)
+        elapsed = time.perf_counter() - start_time
+        manifest = {
+            'model_name': model_name,
+            'timestamp': timestamp,
+            'size': sum(chunk['size'] for chunk in chunks),
+            'stored_size': sum(chunk['stored_size'] for chunk in chunks),
+            'chunks': chunks,
+        }
+        manifest_file = os.path.join(backup_path, 'manifest.json')
+        with open(f"{manifest_file}.tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+        
+        # Save the metadata
+        metadata_file = os.path.join(backup_path, f"{model_name}_metadata.json")
+        if metadata is None:
+            metadata = {}
+        metadata['backup_timestamp'] = timestamp
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f)
+        
+        # Index the backup once everything it references is on disk
+        with BackupCatalog(backup_dir) as catalog:
+            catalog.add(os.path.basename(backup_path), model_name, created, size=manifest['size'],
+                        stored_size=manifest['stored_size'], metadata=metadata, chunks=chunks)
     
     print(f"Model and metadata backed up to: {backup_path}")
+    print(f"{len(chunks)} chunks, {store.bytes_written / 1024 ** 2:.2f} MB new, "
+          f"{store.bytes_reused / 1024 ** 2:.2f} MB deduplicated, "
+          f"{manifest['size'] / 1024 ** 2:.2f} MB stored as {manifest['stored_size'] / 1024 ** 2:.2f} MB "
+          f"at {throughput(manifest['size'], elapsed)}")
     return backup_path
 
 # Define a function to restore a model from a backup
-def restore_model(backup_path):
-    # Load the model
-    model_file = [f for f in os.listdir(backup_path) if f.endswith('.pkl')][0]
-    with open(os.path.join(backup_path, model_file), 'rb') as f:
-        model = pickle.load(f)
+def restore_model(backup_path, n_threads=None):
+    # Load the model from its chunks, verifying each one, or from the pickle of a legacy backup
+    manifest = load_manifest(backup_path)
+    if manifest is not None:
+        start_time = time.perf_counter()
+        model = store_for_backup(backup_path, n_threads=n_threads).read_object(manifest['chunks'])
+        print(f"Read {manifest['size'] / 1024 ** 2:.2f} MB at {throughput(manifest['size'], time.perf_counter() - start_time)}")
+    else:
+        model_file = [f for f in os.listdir(backup_path) if f.endswith('.pkl')][0]
+        with open(os.path.join(backup_path, model_file), 'rb') as f:
+            model = pickle.load(f)
     
     # Load the metadata
     metadata_file = [f for f in os.listdir(backup_path) if f.endswith('_metadata.json')][0]
@@ -43,43 +87,71 @@ def restore_model(backup_path):
     return model, metadata
 
 # Define a function to list available backups
-def list_backups(backup_dir='model_backups'):
+def list_backups(backup_dir='model_backups', model_name=None, since=None, until=None, metadata_filter=None):
+    """
+    List backups from the backup catalog, newest first, optionally filtered by model name,
+    creation date range and exact metadata field values.
+    """
     backups = []
     if os.path.exists(backup_dir):
-        for folder in os.listdir(backup_dir):
-            folder_path = os.path.join(backup_dir, folder)
-            if os.path.isdir(folder_path):
-                backups.append(folder_path)
+        with BackupCatalog(backup_dir) as catalog:
+            backups = catalog.find(model_name=model_name, since=since, until=until, metadata=metadata_filter)
     else:
         print(f"No backup directory found: {backup_dir}")
     
     if backups:
         print("Available backups:")
         for backup in backups:
-            print(f"- {backup}")
+            size = f", {backup['size'] / 1024 ** 2:.2f} MB" if backup['size'] is not None else ""
+            print(f"- {backup['path']} ({backup['model_name']}, {backup['created_at']}{size})")
     else:
         print("No backups found.")
+    return backups
 
 # Define a function to delete old backups
-def delete_old_backups(backup_dir='model_backups', keep_last_n=5):
+def delete_old_backups(backup_dir='model_backups', keep_last_n=5, model_name=None):
+    """
+    Keep the `keep_last_n` most recent backups of each model (or only of `model_name`) and
+    delete the rest, then garbage-collect chunks that no remaining backup references.
+    Collection holds the chunk store's exclusive lock, so it waits for backups in progress.
+    """
     if os.path.exists(backup_dir):
-        backups = sorted(os.listdir(backup_dir), reverse=True)
-        for backup in backups[keep_last_n:]:
-            shutil.rmtree(os.path.join(backup_dir, backup))
-            print(f"Deleted old backup: {backup}")
+        with BackupCatalog(backup_dir) as catalog:
+            expired = catalog.expired(keep_last_n, model_name=model_name)
+            # Drop the catalog entries first so a crash never leaves entries for deleted backups
+            catalog.remove(expired)
+            for backup in expired:
+                shutil.rmtree(os.path.join(backup_dir, backup), ignore_errors=True)
+                print(f"Deleted old backup: {backup}")
+        
+        store_dir = os.path.join(backup_dir, CHUNK_STORE)
+        if os.path.exists(store_dir):
+            store = ChunkStore(store_dir)
+            with store.lock(exclusive=True):
+                # Read the references under the lock, after any concurrent backup is cataloged
+                with BackupCatalog(backup_dir) as catalog:
+                    referenced = catalog.referenced_chunks()
+                freed_chunks, freed_bytes = store.garbage_collect(referenced)
+            print(f"Garbage-collected {freed_chunks} unreferenced chunks ({freed_bytes / 1024 ** 2:.2f} MB)")
     else:
         print(f"No backup directory found: {backup_dir}")
 
 # Main function for command-line interface
 def main():
     parser = argparse.ArgumentParser(description="Backup and restore machine learning models.")
-    parser.add_argument('action', choices=['backup', 'restore', 'list', 'delete_old'], help="Action to perform")
+    parser.add_argument('action', choices=['backup', 'restore', 'list', 'delete_old', 'reindex'], help="Action to perform")
     parser.add_argument('--model', type=str, help="Path to the model file for backup or restore")
-    parser.add_argument('--model_name', type=str, help="Name of the model for backup")
+    parser.add_argument('--model_name', type=str, help="Name of the model for backup; filters list, delete_old and restore (latest backup)")
     parser.add_argument('--backup_dir', type=str, default='model_backups', help="Directory to store or retrieve backups")
     parser.add_argument('--metadata', type=str, help="Path to a JSON file containing model metadata")
     parser.add_argument('--keep_last_n', type=int, default=5, help="Number of recent backups to keep when deleting old ones")
     parser.add_argument('--backup_path', type=str, help="Path to the specific backup to restore")
+    parser.add_argument('--since', type=str, help="Only list backups created on or after this ISO date")
+    parser.add_argument('--until', type=str, help="Only list backups created on or before this ISO date")
+    parser.add_argument('--filter', type=str, nargs='*', default=[], help="Only list backups whose metadata matches key=value (value parsed as JSON if possible)")
+    parser.add_argument('--codec', type=str, choices=['zstd', 'zlib', 'none'], help="Chunk compression (default: zstd if installed, else zlib)")
+    parser.add_argument('--level', type=int, help="Compression level")
+    parser.add_argument('--threads', type=int, help="Threads for compressing, decompressing and verifying chunks")
     
     args = parser.parse_args()
     
@@ -92,20 +164,40 @@ def main():
         if args.metadata:
             with open(args.metadata, 'r') as f:
                 metadata = json.load(f)
-        backup_model(model, args.model_name, backup_dir=args.backup_dir, metadata=metadata)
+        backup_model(model, args.model_name, backup_dir=args.backup_dir, metadata=metadata,
+                     codec=args.codec, level=args.level, n_threads=args.threads)
     
     elif args.action == 'restore':
-        if args.backup_path is None:
-            parser.error("--backup_path is required for restore.")
-        model, metadata = restore_model(args.backup_path)
+        backup_path = args.backup_path
+        if backup_path is None and args.model_name is not None:
+            with BackupCatalog(args.backup_dir) as catalog:
+                latest = catalog.latest(args.model_name)
+            if latest is None:
+                parser.error(f"No backups found for model: {args.model_name}")
+            backup_path = latest['path']
+        if backup_path is None:
+            parser.error("--backup_path or --model_name is required for restore.")
+        model, metadata = restore_model(backup_path, n_threads=args.threads)
         print(f"Model: {model}")
         print(f"Metadata: {metadata}")
     
     elif args.action == 'list':
-        list_backups(backup_dir=args.backup_dir)
+        metadata_filter = {}
+        for condition in args.filter:
+            key, _, value = condition.partition('=')
+            try:
+                metadata_filter[key] = json.loads(value)
+            except ValueError:
+                metadata_filter[key] = value
+        list_backups(backup_dir=args.backup_dir, model_name=args.model_name, since=args.since,
+                     until=args.until, metadata_filter=metadata_filter)
     
     elif args.action == 'delete_old':
-        delete_old_backups(backup_dir=args.backup_dir, keep_last_n=args.keep_last_n)
+        delete_old_backups(backup_dir=args.backup_dir, keep_last_n=args.keep_last_n, model_name=args.model_name)
+    
+    elif args.action == 'reindex':
+        with BackupCatalog(args.backup_dir) as catalog:
+            print(f"Indexed {catalog.rebuild()} backups in {catalog.path}")
 
 if __name__ == "__main__":
     main()
@@ -1,121 +1,274 @@
 import os
+import sys
+import time
 import pandas as pd
 import numpy as np
 import argparse
 
-def load_data(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    return pd.read_csv(file_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.pipeline_cache import PipelineCache
+from src.utils.data_loader import load_data, iter_chunks
 
-def handle_missing_values(df, strategy="mean", fill_value=None):
+class ColumnStatistics:
     """
-    Handle missing values in the dataset.
+    Per-column statistics gathered in one pass and shared between imputation and outlier detection.
     
-    strategy: str, default="mean"
-        The strategy to use for filling missing values. Options:
-        - "mean": Fill with mean of the column.
-        - "median": Fill with median of the column.
-        - "mode": Fill with mode of the column.
-        - "constant": Fill with a constant value specified by `fill_value`.
-    fill_value: default=None
-        The value to fill missing values with when strategy="constant".
+    Means and standard deviations are exact: each chunk's count, mean and sum of squared
+    deviations are merged into the running ones with Chan et al.'s parallel update, which
+    stays accurate on large-magnitude columns. Medians and quartiles are exact when all rows fit
+    in the quantile sample (`sample_size` rows), and are otherwise estimated from a uniform
+    bottom-k sample of rows drawn across all chunks.
     """
-    if strategy == "mean":
-        df = df.fillna(df.mean())
-    elif strategy == "median":
-        df = df.fillna(df.median())
-    elif strategy == "mode":
-        df = df.fillna(df.mode().iloc[0])
-    elif strategy == "constant":
-        if fill_value is not None:
-            df = df.fillna(fill_value)
+    def __init__(self, sample_size=1_000_000, track_modes=False, random_state=42):
+        self.sample_size = sample_size
+        self.track_modes = track_modes
+        self.rng = np.random.default_rng(random_state)
+        self.count = None
+        self.mean = None
+        self.m2 = None
+        self.sample = None
+        self.value_counts = {}
+        self.rows = 0
+
+    def update(self, chunk):
+        """
+        Fold one chunk of raw data into the running statistics.
+        """
+        numeric = chunk.select_dtypes(include=[np.number]).astype(float)
+        count = numeric.count()
+        mean = numeric.mean().fillna(0.0)
+        m2 = ((numeric - mean) ** 2).sum()
+        if self.count is None:
+            self.count, self.mean, self.m2 = count, mean, m2
         else:
-            raise ValueError("fill_value must be specified when strategy='constant'")
-    else:
-        raise ValueError(f"Unknown strategy: {strategy}")
-    
-    return df
+            columns = self.count.index.union(count.index, sort=False)
+            count_a, mean_a, m2_a = (series.reindex(columns, fill_value=0.0) for series in (self.count, self.mean, self.m2))
+            count_b, mean_b, m2_b = (series.reindex(columns, fill_value=0.0) for series in (count, mean, m2))
+            total = count_a + count_b
+            weight = (count_b / total).where(total > 0, 0.0)
+            delta = mean_b - mean_a
+            self.count = total
+            self.mean = mean_a + delta * weight
+            self.m2 = m2_a + m2_b + delta ** 2 * count_a * weight
 
-def remove_duplicates(df):
-    """
-    Remove duplicate rows from the dataset.
-    """
-    before = df.shape[0]
-    df = df.drop_duplicates()
-    after = df.shape[0]
-    print(f"Removed {before - after} duplicate rows.")
-    return df
+        keyed = numeric.assign(_sample_key=self.rng.random(len(numeric)))
+        if self.sample is not None:
+            keyed = pd.concat([self.sample, keyed], ignore_index=True)
+        self.sample = keyed.nsmallest(self.sample_size, '_sample_key') if len(keyed) > self.sample_size else keyed
+
+        if self.track_modes:
+            for column in chunk.columns:
+                counts = chunk[column].value_counts()
+                if column in self.value_counts:
+                    counts = self.value_counts[column].add(counts, fill_value=0)
+                self.value_counts[column] = counts
+        self.rows += len(chunk)
 
-def standardize_data(df, columns):
+    def finalize(self):
+        """
+        Derive mean, standard deviation, median, quartiles and modes from the accumulated state.
+        """
+        self.mean = self.mean.where(self.count > 0)
+        # Population standard deviation, matching scipy.stats.zscore
+        self.std = np.sqrt(self.m2 / self.count)
+        quantiles = self.sample.drop(columns=['_sample_key']).quantile([0.25, 0.5, 0.75])
+        self.q1, self.median, self.q3 = quantiles.loc[0.25], quantiles.loc[0.5], quantiles.loc[0.75]
+        self.mode = pd.Series({column: counts.idxmax() for column, counts in self.value_counts.items() if len(counts)})
+        return self
+
+
+class DigestSet:
     """
-    Standardize the data format in specified columns.
+    Set of 64-bit row digests stored as sorted numpy runs.
     
-    columns: list of str
-        List of columns to standardize. For example, date columns or categorical columns.
+    New digests form a run of their own, and runs are merged while the newest is at least as
+    large as the one before it (like carries in a binary counter), so there are O(log n) runs
+    and each digest is re-merged O(log n) times. Membership is a searchsorted per run.
     """
-    for column in columns:
-        if pd.api.types.is_datetime64_any_dtype(df[column]):
-            df[column] = pd.to_datetime(df[column])
-        elif pd.api.types.is_numeric_dtype(df[column]):
-            df[column] = df[column].astype(float)
-        elif pd.api.types.is_categorical_dtype(df[column]) or df[column].dtype == 'object':
-            df[column] = df[column].str.strip().str.lower()
-    return df
-
-def handle_outliers(df, method="IQR", threshold=1.5):
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add(self, digests):
+        """
+        Add an array of digests and return a mask of the positions holding a digest not seen
+        before (the first occurrence of each).
+        """
+        unique, first = np.unique(digests, return_index=True)
+        seen = np.zeros(len(unique), dtype=bool)
+        for run in self.runs:
+            positions = np.searchsorted(run, unique).clip(max=len(run) - 1)
+            seen |= run[positions] == unique
+        keep = np.zeros(len(digests), dtype=bool)
+        keep[first[~seen]] = True
+
+        run = unique[~seen]
+        if len(run):
+            while self.runs and len(self.runs[-1]) <= len(run):
+                run = np.sort(np.concatenate([self.runs.pop(), run]), kind='stable')
+            self.runs.append(run)
+        return keep
+
+
+class CleaningEngine:
     """
-    Handle outliers in the dataset.
+    Fused cleaning pipeline: imputation, hash-based deduplication, string normalization and
+    outlier filtering applied chunk by chunk, using column statistics computed once.
     
-    method: str, default="IQR"
-        The method to use for outlier detection. Options:
-        - "IQR": Use the interquartile range method to detect outliers.
-        - "zscore": Use z-scores to detect outliers.
-    threshold: float, default=1.5
-        The threshold to use for outlier detection.
+    Duplicates are detected through 64-bit row digests (`pd.util.hash_pandas_object`), so only
+    one integer per distinct row is retained across chunks rather than the rows themselves.
+    Digests are taken over a copy with numeric columns cast to float64, because each chunk
+    infers its own dtypes (an int64 column becomes float64 in a chunk with a missing value)
+    and the same row would otherwise hash differently in different chunks; the rows
+    themselves are written with the dtypes they were read with.
+    Statistics are taken from the raw input (missing values skipped), so outlier bounds are
+    not shifted by imputed values.
     """
-    if method == "IQR":
-        Q1 = df.quantile(0.25)
-        Q3 = df.quantile(0.75)
-        IQR = Q3 - Q1
-        df = df[~((df < (Q1 - threshold * IQR)) | (df > (Q3 + threshold * IQR))).any(axis=1)]
-    elif method == "zscore":
-        from scipy.stats import zscore
-        df = df[(np.abs(zscore(df.select_dtypes(include=[np.number]))) < threshold).all(axis=1)]
-    else:
-        raise ValueError(f"Unknown method: {method}")
-    
-    return df
+    def __init__(self, strategy="mean", fill_value=None, outlier_method="IQR", outlier_threshold=1.5, chunksize=None):
+        if strategy not in ["mean", "median", "mode", "constant"]:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        if strategy == "constant" and fill_value is None:
+            raise ValueError("fill_value must be specified when strategy='constant'")
+        if outlier_method not in ["IQR", "zscore"]:
+            raise ValueError(f"Unknown method: {outlier_method}")
 
-def save_clean_data(df, output_path):
-    """
-    Save the cleaned dataset to a CSV file.
-    """
-    df.to_csv(output_path, index=False)
-    print(f"Cleaned data saved to {output_path}")
+        self.strategy = strategy
+        self.fill_value = fill_value
+        self.outlier_method = outlier_method
+        self.outlier_threshold = outlier_threshold
+        self.chunksize = chunksize
+        self.stats = None
+        self.seen_digests = DigestSet()
+        self.report = {}
+
+    def _record(self, stage, started, rows_in, rows_out):
+        entry = self.report.setdefault(stage, {'seconds': 0.0, 'rows_in': 0, 'rows_out': 0})
+        entry['seconds'] += time.perf_counter() - started
+        entry['rows_in'] += rows_in
+        entry['rows_out'] += rows_out
 
-def main(input_file, output_file, strategy, fill_value, outlier_method, outlier_threshold):
-    # Load the data
-    df = load_data(input_file)
+    def _chunks(self, input_file):
+        if self.chunksize:
+            return iter_chunks(input_file, self.chunksize)
+        return iter([load_data(input_file, optimize=False)])
 
-    # Handle missing values
-    df = handle_missing_values(df, strategy=strategy, fill_value=fill_value)
+    def compute_statistics(self, chunks):
+        """
+        Compute the shared column statistics from an iterable of chunks.
+        """
+        started = time.perf_counter()
+        stats = ColumnStatistics(track_modes=self.strategy == "mode")
+        for chunk in chunks:
+            stats.update(chunk)
+        self.stats = stats.finalize()
+        self._record('statistics', started, stats.rows, stats.rows)
+        return self.stats
+
+    def clean_chunk(self, chunk):
+        """
+        Run every cleaning stage over one chunk and return the surviving rows.
+        """
+        started = time.perf_counter()
+        rows = len(chunk)
+        if self.strategy == "mean":
+            chunk = chunk.fillna(self.stats.mean)
+        elif self.strategy == "median":
+            chunk = chunk.fillna(self.stats.median)
+        elif self.strategy == "mode":
+            chunk = chunk.fillna(self.stats.mode)
+        else:
+            chunk = chunk.fillna(self.fill_value)
+        self._record('impute', started, rows, len(chunk))
+
+        started, rows = time.perf_counter(), len(chunk)
+        # Hash with one numeric dtype for every chunk, so a row's digest does not depend on its chunk
+        numeric_columns = chunk.select_dtypes(include='number').columns
+        hashable = chunk.astype({column: 'float64' for column in numeric_columns})
+        digests = pd.util.hash_pandas_object(hashable, index=False).to_numpy()
+        chunk = chunk[self.seen_digests.add(digests)]
+        self._record('deduplicate', started, rows, len(chunk))
+
+        started, rows = time.perf_counter(), len(chunk)
+        text_columns = chunk.select_dtypes(include=['object', 'string', 'category']).columns
+        chunk = chunk.assign(**{column: chunk[column].str.strip().str.lower() for column in text_columns})
+        self._record('standardize', started, rows, len(chunk))
+
+        started, rows = time.perf_counter(), len(chunk)
+        numeric_columns = [column for column in self.stats.mean.index if column in chunk.columns]
+        numeric = chunk[numeric_columns]
+        if self.outlier_method == "IQR":
+            iqr = self.stats.q3 - self.stats.q1
+            lower = self.stats.q1 - self.outlier_threshold * iqr
+            upper = self.stats.q3 + self.outlier_threshold * iqr
+            outliers = ((numeric < lower) | (numeric > upper)).any(axis=1)
+            chunk = chunk[~outliers]
+        else:
+            z = (numeric - self.stats.mean) / self.stats.std
+            chunk = chunk[(z.abs() < self.outlier_threshold).all(axis=1)]
+        self._record('outliers', started, rows, len(chunk))
+        return chunk
 
-    # Remove duplicates
-    df = remove_duplicates(df)
+    def run(self, input_file, output_file):
+        """
+        Clean `input_file` into `output_file`, streaming chunks when `chunksize` is set.
+        Returns the per-stage report.
+        """
+        self.report = {}
+        self.seen_digests = DigestSet()
+
+        started = time.perf_counter()
+        if self.chunksize:
+            self.compute_statistics(self._chunks(input_file))
+            chunks = self._chunks(input_file)
+        else:
+            df = next(self._chunks(input_file))
+            self._record('load', started, len(df), len(df))
+            self.compute_statistics([df])
+            chunks = [df]
+
+        header = True
+        for chunk in chunks:
+            cleaned = self.clean_chunk(chunk)
+            started = time.perf_counter()
+            cleaned.to_csv(output_file, mode='w' if header else 'a', header=header, index=False)
+            header = False
+            self._record('save', started, len(cleaned), len(cleaned))
+
+        print(f"Cleaned data saved to {output_file}")
+        return self.report
+
+
+def print_report(report):
+    """
+    Print per-stage timing and row counts from CleaningEngine.run.
+    """
+    print(f"{'Stage':<12} {'Seconds':>10} {'Rows in':>12} {'Rows out':>12}")
+    for stage, entry in report.items():
+        print(f"{stage:<12} {entry['seconds']:>10.3f} {entry['rows_in']:>12} {entry['rows_out']:>12}")
 
-    # Standardize data formats (example for standardizing all object-type columns)
-    df = standardize_data(df, columns=df.select_dtypes(include=['object']).columns)
 
-    # Handle outliers
-    df = handle_outliers(df, method=outlier_method, threshold=outlier_threshold)
+def main(input_file, output_file, strategy, fill_value, outlier_method, outlier_threshold, chunksize=None, cache_dir=None, cache_max_mb=5120):
+    # Reuse the output of an identical earlier run when caching is enabled
+    cache, cache_key = None, None
+    if cache_dir:
+        cache = PipelineCache(cache_dir, max_bytes=cache_max_mb * 1024 ** 2)
+        params = {
+            'output_name': os.path.basename(output_file), 'strategy': strategy, 'fill_value': fill_value,
+            'outlier_method': outlier_method, 'outlier_threshold': outlier_threshold, 'chunksize': chunksize,
+        }
+        cache_key = cache.key('cleanup', [input_file], params)
+        if cache.fetch('cleanup', cache_key, os.path.dirname(output_file) or '.'):
+            print(f"Cleaned data restored from cache to {output_file}")
+            return
 
-    # Save the cleaned data
-    save_clean_data(df, output_file)
+    engine = CleaningEngine(strategy=strategy, fill_value=fill_value, outlier_method=outlier_method,
+                            outlier_threshold=outlier_threshold, chunksize=chunksize)
+    report = engine.run(input_file, output_file)
+    print_report(report)
+    if cache:
+        cache.store('cleanup', cache_key, [output_file])
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Clean and preprocess a dataset.")
@@ -129,6 +282,13 @@ if __name__ == "__main__":
                         help="Method to handle outliers")
     parser.add_argument("--outlier_threshold", type=float, default=1.5,
                         help="Threshold for outlier detection")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Process the input in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                        help="Reuse the output of identical earlier runs from this cache directory")
+    parser.add_argument("--cache_max_mb", type=int, default=5120,
+                        help="Size bound of the cache directory in MB (LRU eviction)")
 
     args = parser.parse_args()
-    main(args.input_file, args.output_file, args.strategy, args.fill_value, args.outlier_method, args.outlier_threshold)
+    main(args.input_file, args.output_file, args.strategy, args.fill_value, args.outlier_method, args.outlier_threshold, args.chunksize,
+         args.cache_dir, args.cache_max_mb)
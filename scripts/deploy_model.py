@@ -1,11 +1,28 @@
 import os
+import sys
 import pickle
 import json
+import pandas as pd
 from flask import Flask, request, jsonify
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.data_validation import SchemaValidator
+from src.monitoring.performance_monitor import instrument_flask
+from src.monitoring.tracing import tracer, trace_flask
+from src.monitoring.memory_diagnostics import diagnostics
+from src.monitoring.sampling_profiler import profiler
+
 # Initialize the Flask app
 app = Flask(__name__)
 
+# Time every route and serve the metrics at /metrics; trace requests when tracing is configured
+instrument_flask(app)
+trace_flask(app)
+
+# Admin-only memory diagnostics under /admin/memory and sampling profiler under /admin/profile
+diagnostics.register_routes(app)
+profiler.register_routes(app)
+
 # Load the model and metadata
 def load_model(model_path, metadata_path=None):
     with open(model_path, 'rb') as model_file:
@@ -25,13 +42,60 @@ def predict():
         
         # Convert the JSON data into a format suitable for the model
         features = [data.get(key) for key in metadata['feature_names']]
-        prediction = model.predict([features])
+        with tracer.span('model.predict'):
+            prediction = model.predict([features])
         
         # Return the prediction as a JSON response
         return jsonify({'prediction': prediction.tolist()})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# Build the ingress validator from a schema file, or from the feature names and dtypes train_model.py records
+def load_validator(metadata, schema_path=None):
+    if schema_path:
+        return SchemaValidator.from_file(schema_path)
+    if not metadata.get('feature_names'):
+        raise ValueError("Cannot validate /predict_batch input: pass --schema, or --metadata with the "
+                         "feature_names recorded by train_model.py")
+    dtypes = metadata.get('feature_dtypes', {})
+    columns = {name: {'dtype': schema_dtype(dtypes.get(name)), 'nullable': False} for name in metadata['feature_names']}
+    return SchemaValidator({'columns': columns})
+
+# Map a recorded pandas dtype name to a SchemaValidator dtype (numeric when unknown)
+def schema_dtype(dtype_name):
+    if dtype_name is None:
+        return 'numeric'
+    dtype = pd.api.types.pandas_dtype(dtype_name)
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'string'
+
+# Define the batch predict route
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    try:
+        # Accept either a list of records or {"instances": [...]}
+        data = request.get_json(force=True)
+        records = data.get('instances', []) if isinstance(data, dict) else data
+        df = pd.DataFrame.from_records(records)
+
+        # Reject malformed batches before they reach the model
+        with tracer.span('validate'):
+            report = validator.validate(df)
+        if not report.ok:
+            return jsonify({'error': 'Validation failed', 'validation': report.to_dict()}), 400
+
+        features = df[metadata['feature_names']] if metadata.get('feature_names') else df
+        with tracer.span('model.predict', rows=len(features)):
+            prediction = model.predict(features)
+        return jsonify({'predictions': prediction.tolist()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 # Define the health check route
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -47,6 +111,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Deploy a machine learning model using Flask.")
     parser.add_argument('--model', type=str, required=True, help="Path to the trained model file (pickle format).")
     parser.add_argument('--metadata', type=str, help="Path to the model metadata JSON file.")
+    parser.add_argument('--schema', type=str, help="JSON schema for validating /predict_batch input (default: the feature names and dtypes in the metadata).")
     parser.add_argument('--host', type=str, default='0.0.0.0', help="Host to run the Flask app on.")
     parser.add_argument('--port', type=int, default=5000, help="Port to run the Flask app on.")
     
@@ -54,6 +119,10 @@ if __name__ == '__main__':
 
     # Load the model and metadata
     model, metadata = load_model(args.model, args.metadata)
+    validator = load_validator(metadata, args.schema)
+
+    # SIGUSR2 starts memory tracing, then writes a memory report on each further signal
+    diagnostics.install_signal_handler()
 
     # Start the Flask app
     app.run(host=args.host, port=args.port)
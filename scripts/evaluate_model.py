@@ -1,9 +1,13 @@
 import os
+import sys
 import pickle
 import json
 import pandas as pd
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, mean_squared_error, r2_score
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.data_loader import load_data as read_data, load_split
+
 def load_model(model_path):
     """
     Load the machine learning model from a pickle file.
@@ -14,9 +18,15 @@ def load_model(model_path):
 
 def load_data(data_path, target_column):
     """
-    Load the dataset from a CSV file.
+    Load the dataset and split it into features and target.
+    
+    `data_path` may be a CSV, Parquet or .npy file containing the target column, or a
+    directory written by preprocess_data.py, in which case its test split is used.
     """
-    data = pd.read_csv(data_path)
+    if os.path.isdir(data_path):
+        return load_split(data_path, 'test')
+
+    data = read_data(data_path)
     X = data.drop(columns=[target_column])
     y = data[target_column]
     return X, y
@@ -96,7 +106,7 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Evaluate a machine learning model.")
     parser.add_argument('--model', type=str, required=True, help="Path to the trained model file (pickle format).")
-    parser.add_argument('--data', type=str, required=True, help="Path to the dataset CSV file.")
+    parser.add_argument('--data', type=str, required=True, help="Path to the dataset (CSV, Parquet or .npy), or a directory of splits written by preprocess_data.py.")
     parser.add_argument('--target', type=str, required=True, help="The name of the target column in the dataset.")
     parser.add_argument('--output', type=str, required=True, help="Path to save the evaluation results (JSON format).")
     parser.add_argument('--model_type', type=str, required=True, choices=['classification', 'regression'], help="Type of the model: 'classification' or 'regression'.")
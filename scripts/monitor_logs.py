@@ -1,86 +1,141 @@
 import os
-import time
+import sys
+import glob
+import asyncio
 import argparse
-import re
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.monitoring.log_tailer import follow, page_backward
+from src.monitoring.log_monitor import AsyncLogMonitor
+from src.monitoring.pattern_matcher import PatternMatcher, benchmark
+from src.monitoring import alerting
+
 def tail_file(filename, lines=20):
     """
     Return the last `lines` lines from the file.
-    """
-    with open(filename, 'rb') as f:
-        f.seek(0, os.SEEK_END)
-        file_size = f.tell()
-        buffer_size = 1024
-        buffer = bytearray(buffer_size)
-        lines_found = []
-        position = file_size
 
-        while position >= 0 and len(lines_found) < lines:
-            position -= buffer_size
-            if position < 0:
-                position = 0
-            f.seek(position)
-            read_bytes = f.readinto(buffer)
-            lines_found = buffer[:read_bytes].splitlines()
-        
-        return [line.decode() for line in lines_found[-lines:]]
+    The file is memory-mapped and scanned backward for newlines, so only the returned lines are
+    touched however large the file is, and long lines are returned whole. Use
+    page_backward(filename, page_size) to keep paging further back through the history.
+    """
+    if lines <= 0:
+        return []
+    for page in page_backward(filename, page_size=lines):
+        return page
+    return []
 
-def monitor_logs(file_path, patterns, alert_callback=None, poll_interval=1.0):
+def monitor_logs(file_path, patterns, alert_callback=None, poll_interval=1.0, offset_file=None, use_inotify=True):
     """
     Monitor the log file for specific patterns.
     
     file_path: str
         Path to the log file to be monitored.
     patterns: list of str
-        List of regex patterns to search for in the log file.
+        List of regex patterns to search for in the log file. They are compiled once into a
+        PatternMatcher, so each batch of lines is scanned in a single pass.
     alert_callback: callable
         A function to call when a pattern is matched.
     poll_interval: float
-        How often to check the log file (in seconds).
+        How often to check the log file (in seconds) when inotify is unavailable; with inotify,
+        new lines are read as soon as they are written.
+    offset_file: str
+        JSON file where the read offset is saved, so a restarted monitor resumes where it stopped.
+    use_inotify: bool
+        Wake on inotify events instead of polling, when the platform supports it.
     """
-    last_position = 0
-
-    while True:
-        with open(file_path, 'r') as f:
-            f.seek(last_position)
-            lines = f.readlines()
-            last_position = f.tell()
+    matcher = PatternMatcher(patterns)
+    for lines in follow(file_path, poll_interval=poll_interval, offset_file=offset_file, use_inotify=use_inotify):
+        for line, matched in matcher.match_lines(lines):
+            for pattern in matched:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                message = f"[{timestamp}] Pattern '{pattern}' matched: {line.strip()}"
+                print(message)
+                if alert_callback:
+                    alert_callback(message)
 
-        for line in lines:
-            for pattern in patterns:
-                if re.search(pattern, line):
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    message = f"[{timestamp}] Pattern '{pattern}' matched: {line.strip()}"
-                    print(message)
-                    if alert_callback:
-                        alert_callback(message)
-
-        time.sleep(poll_interval)
+def monitor_many(targets, patterns, alert_callback=None, poll_interval=1.0, offset_file=None, use_inotify=True,
+                 read_budget=256 * 1024):
+    """
+    Monitor several log files and glob patterns (e.g. 'logs/**/*.log') concurrently from one
+    asyncio event loop. Files matching a pattern that are created later are picked up
+    automatically, and each file is read at most `read_budget` bytes at a time so a noisy log
+    cannot starve the others.
+    """
+    monitor = AsyncLogMonitor(targets, patterns, alert_callback=alert_callback, poll_interval=poll_interval,
+                              read_budget=read_budget, offset_file=offset_file, use_inotify=use_inotify)
+    try:
+        asyncio.run(monitor.run())
+    except KeyboardInterrupt:
+        pass
 
 def alert(message):
     """
-    Placeholder for an alert system (e.g., send an email or log to a monitoring system).
+    Queue an alert on the alert dispatcher, which groups repeats and delivers them in batches
+    to the configured channels (console by default; see alerting.configure).
     """
-    print(f"ALERT: {message}")
+    alerting.send_alert(message, source='monitor_logs')
 
-def main(log_file, patterns, poll_interval, alert_on_match):
-    if not os.path.exists(log_file):
-        raise FileNotFoundError(f"Log file not found: {log_file}")
+def benchmark_patterns(log_file, patterns, max_lines=1000000):
+    """
+    Compare the throughput of the compiled PatternMatcher with per-pattern re.search on the
+    first `max_lines` lines of a log file.
+    """
+    with open(log_file, 'r', errors='replace') as f:
+        lines = [line.rstrip('\n') for _, line in zip(range(max_lines), f)]
+    results = benchmark(patterns, lines)
+    for name, result in results.items():
+        print(f"{name}: {result['mb_per_s']:.1f} MB/s, {result['matched_lines']} matching lines")
+    print(f"Speedup: {results['matcher']['mb_per_s'] / results['naive']['mb_per_s']:.1f}x")
+    return results
+
+def main(log_files, patterns, poll_interval, alert_on_match, offset_file=None, use_inotify=True, run_benchmark=False,
+         read_budget=256 * 1024):
+    if isinstance(log_files, str):
+        log_files = [log_files]
+    for log_file in log_files:
+        if not glob.has_magic(log_file) and not os.path.exists(log_file):
+            raise FileNotFoundError(f"Log file not found: {log_file}")
+
+    if run_benchmark:
+        for log_file in log_files:
+            for path in sorted(glob.glob(log_file, recursive=True)):
+                print(f"{path}:")
+                benchmark_patterns(path, patterns)
+        return
 
     if alert_on_match:
         alert_callback = alert
     else:
         alert_callback = None
 
-    monitor_logs(log_file, patterns, alert_callback, poll_interval)
+    if len(log_files) == 1 and not glob.has_magic(log_files[0]):
+        monitor_logs(log_files[0], patterns, alert_callback, poll_interval, offset_file, use_inotify)
+    else:
+        monitor_many(log_files, patterns, alert_callback, poll_interval, offset_file, use_inotify, read_budget)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Monitor log files for specific patterns.")
-    parser.add_argument('--log_file', type=str, required=True, help="Path to the log file to monitor.")
+    parser.add_argument('--log_file', type=str, nargs='+', required=True, help="Log files or glob patterns to monitor (quote globs).")
     parser.add_argument('--patterns', type=str, nargs='+', required=True, help="List of patterns to search for in the log file.")
     parser.add_argument('--poll_interval', type=float, default=1.0, help="Interval (in seconds) between checks.")
     parser.add_argument('--alert_on_match', action='store_true', help="Trigger an alert when a pattern is matched.")
-    
+    parser.add_argument('--offset_file', type=str, help="JSON file for persisting the read offset across restarts.")
+    parser.add_argument('--no_inotify', action='store_true', help="Poll instead of waiting for inotify events.")
+    parser.add_argument('--benchmark', action='store_true', help="Measure pattern matching throughput on the log file and exit.")
+    parser.add_argument('--read_budget', type=int, default=256 * 1024, help="Maximum bytes read from one file before serving the others.")
+    parser.add_argument('--alert_file', type=str, help="Also append alerts as JSON lines to this file.")
+    parser.add_argument('--smtp_host', type=str, help="Also email alert batches through this SMTP server.")
+    parser.add_argument('--smtp_port', type=int, default=25, help="SMTP server port.")
+    parser.add_argument('--alert_email', type=str, nargs='*', default=[], help="Recipients of alert emails.")
+    parser.add_argument('--webhook_url', type=str, help="Also POST alert batches as JSON to this URL.")
+    parser.add_argument('--alert_group_window', type=float, default=10.0, help="Seconds identical alerts are collected before delivery.")
+    parser.add_argument('--alert_dedup_window', type=float, default=300.0, help="Seconds a delivered alert is suppressed before repeats are reported.")
+    parser.add_argument('--alert_rate_limit', type=int, help="Maximum alert batches per minute for each file, email or webhook channel.")
+
     args = parser.parse_args()
-    main(args.log_file, args.patterns, args.poll_interval, args.alert_on_match)
+    if args.alert_on_match:
+        alerting.configure(args.alert_file, args.smtp_host, args.smtp_port, args.alert_email, args.webhook_url,
+                           group_window=args.alert_group_window, dedup_window=args.alert_dedup_window,
+                           rate_limit=args.alert_rate_limit)
+    main(args.log_file, args.patterns, args.poll_interval, args.alert_on_match, args.offset_file, not args.no_inotify, args.benchmark, args.read_budget)
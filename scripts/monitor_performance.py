@@ -1,91 +1,159 @@
 import os
-import psutil
+import sys
 import time
 import argparse
 from datetime import datetime
 
-def log_performance_metrics(output_file):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.monitoring.system_sampler import SystemSampler, ProcessSampler, SYSTEM_METRICS, system_families, process_families
+from src.monitoring.prometheus import PrometheusExporter
+from src.monitoring.timeseries import TimeSeriesStore
+from src.monitoring import alerting
+
+def format_snapshot(timestamp, snapshot):
     """
-    Logs system performance metrics to a specified file.
+    Format one snapshot as a single human-readable line.
     """
-    with open(output_file, 'a') as f:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory_info = psutil.virtual_memory()
-        disk_usage = psutil.disk_usage('/')
-        net_io = psutil.net_io_counters()
-
-        log_entry = (
-            f"{timestamp}, "
-            f"CPU: {cpu_usage}%, "
-            f"Memory: {memory_info.percent}%, "
-            f"Disk: {disk_usage.percent}%, "
-            f"Net Sent: {net_io.bytes_sent / (1024 ** 2):.2f} MB, "
-            f"Net Received: {net_io.bytes_recv / (1024 ** 2):.2f} MB\n"
-        )
-
-        f.write(log_entry)
-        print(log_entry.strip())
+    return (
+        f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')}, "
+        f"CPU: {snapshot['cpu_percent']:.1f}%, "
+        f"Memory: {snapshot['memory_percent']:.1f}%, "
+        f"Disk: {snapshot['disk_percent']:.1f}%, "
+        f"Net Sent: {snapshot['net_sent_bytes_per_s'] / 1024:.1f} KB/s, "
+        f"Net Received: {snapshot['net_recv_bytes_per_s'] / 1024:.1f} KB/s"
+    )
 
-def check_thresholds(cpu_threshold, memory_threshold, disk_threshold, alert_callback=None):
+def check_thresholds(snapshot, cpu_threshold, memory_threshold, disk_threshold, alert_callback=None):
     """
-    Checks if system performance metrics exceed specified thresholds and triggers an alert if they do.
+    Checks if the metrics of one snapshot exceed the specified thresholds and triggers an alert if they do.
     """
-    cpu_usage = psutil.cpu_percent(interval=1)
-    memory_usage = psutil.virtual_memory().percent
-    disk_usage = psutil.disk_usage('/').percent
+    checks = (
+        ('CPU', snapshot['cpu_percent'], cpu_threshold),
+        ('Memory', snapshot['memory_percent'], memory_threshold),
+        ('Disk', snapshot['disk_percent'], disk_threshold),
+    )
+    for name, usage, threshold in checks:
+        if usage > threshold:
+            message = f"ALERT: {name} usage is {usage}% which exceeds the threshold of {threshold}%"
+            print(message)
+            if alert_callback:
+                alert_callback(message)
 
-    if cpu_usage > cpu_threshold:
-        message = f"ALERT: CPU usage is {cpu_usage}% which exceeds the threshold of {cpu_threshold}%"
-        print(message)
-        if alert_callback:
-            alert_callback(message)
-    
-    if memory_usage > memory_threshold:
-        message = f"ALERT: Memory usage is {memory_usage}% which exceeds the threshold of {memory_threshold}%"
-        print(message)
-        if alert_callback:
-            alert_callback(message)
+def alert(message):
+    """
+    Queue an alert on the alert dispatcher, which groups repeats and delivers them in batches
+    to the configured channels (console by default; see alerting.configure).
+    """
+    alerting.send_alert(message, source='monitor_performance')
 
-    if disk_usage > disk_threshold:
-        message = f"ALERT: Disk usage is {disk_usage}% which exceeds the threshold of {disk_threshold}%"
-        print(message)
-        if alert_callback:
-            alert_callback(message)
+def format_processes(samples):
+    """
+    Format per-process samples as one line per process.
+    """
+    return [
+        f"  pid {sample['pid']} ({sample['name']}): "
+        f"RSS {sample['rss_bytes'] / 1024 ** 2:.1f} MB, "
+        f"CPU {sample['cpu_user_seconds'] + sample['cpu_system_seconds']:.1f}s, "
+        f"threads {sample['num_threads']}, "
+        f"fds {sample.get('open_fds', '?')}"
+        for sample in samples
+    ]
 
-def alert(message):
+def monitor_system(interval, store_dir, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold,
+                   quiet=False, iterations=None, pids=(), process_names=(), include_threads=True, prometheus_port=None):
     """
-    Placeholder function for sending alerts (e.g., email, SMS, logging to an external system).
+    Continuously sample system performance metrics every `interval` seconds into a ring-buffer
+    store in `store_dir`.
+
+    Each tick takes one non-blocking snapshot, records it and checks the thresholds against that
+    same snapshot. Ticks follow a fixed schedule, so sampling does not drift by the time spent
+    taking a sample. With `pids` or `process_names`, the matching processes and their threads
+    are sampled on the same tick; with `prometheus_port`, everything is served in Prometheus
+    text format at http://<host>:<port>/metrics.
     """
-    print(f"ALERT: {message}")
+    sampler = SystemSampler()
+    store = TimeSeriesStore(store_dir, SYSTEM_METRICS)
+    process_sampler = ProcessSampler(pids, process_names, include_threads) if (pids or process_names) else None
+    exporter = PrometheusExporter(prometheus_port).start() if prometheus_port is not None else None
+    if exporter is not None:
+        print(f"Serving Prometheus metrics on port {exporter.port}")
+    next_tick = time.monotonic() + interval
+    count = 0
+    try:
+        while iterations is None or count < iterations:
+            time.sleep(max(next_tick - time.monotonic(), 0))
+            next_tick += interval
+            timestamp, snapshot = sampler.sample()
+            store.append(timestamp, snapshot)
+            processes = process_sampler.sample() if process_sampler is not None else []
+            if exporter is not None:
+                overhead = process_sampler.overhead if process_sampler is not None else None
+                exporter.update(system_families(snapshot) + process_families(processes, overhead))
+            if not quiet:
+                print(format_snapshot(timestamp, snapshot))
+                for line in format_processes(processes):
+                    print(line)
+            if alert_on_threshold:
+                check_thresholds(snapshot, cpu_threshold, memory_threshold, disk_threshold, alert_callback=alert)
+            count += 1
+    finally:
+        store.flush()
+        if exporter is not None:
+            exporter.stop()
 
-def monitor_system(interval, output_file, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold):
+def query_metrics(store_dir, metrics, seconds):
     """
-    Continuously monitors system performance metrics at specified intervals.
+    Print the mean, min and max of each metric over the last `seconds` seconds.
     """
-    while True:
-        log_performance_metrics(output_file)
-        
-        if alert_on_threshold:
-            check_thresholds(cpu_threshold, memory_threshold, disk_threshold, alert_callback=alert)
-        
-        time.sleep(interval)
+    store = TimeSeriesStore(store_dir, SYSTEM_METRICS)
+    now = time.time()
+    for metric in metrics or SYSTEM_METRICS:
+        summary = store.summary(metric, seconds, now)
+        if not summary['samples']:
+            print(f"{metric}: no samples in the last {seconds}s")
+            continue
+        print(f"{metric} ({summary['resolution']}, {summary['samples']} samples): "
+              f"mean {summary['mean']:.2f}, min {summary['min']:.2f}, max {summary['max']:.2f}")
+
+def main(interval, store_dir, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold, quiet=False,
+         query=None, window=3600, pids=(), process_names=(), include_threads=True, prometheus_port=None):
+    if query is not None:
+        query_metrics(store_dir, query, window)
+        return
 
-def main(interval, output_file, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold):
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
     # Start monitoring system performance
-    monitor_system(interval, output_file, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold)
+    monitor_system(interval, store_dir, cpu_threshold, memory_threshold, disk_threshold, alert_on_threshold, quiet,
+                   pids=pids, process_names=process_names, include_threads=include_threads, prometheus_port=prometheus_port)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Monitor system performance metrics.")
-    parser.add_argument('--interval', type=int, default=5, help="Interval (in seconds) between each performance check.")
-    parser.add_argument('--output_file', type=str, required=True, help="File to log the performance metrics.")
+    parser.add_argument('--interval', type=float, default=1.0, help="Interval (in seconds) between each performance sample.")
+    parser.add_argument('--store_dir', type=str, required=True, help="Directory of the ring-buffer metric store (1s, 1m and 1h tiers).")
     parser.add_argument('--cpu_threshold', type=float, default=80.0, help="CPU usage threshold for alerts (in percent).")
     parser.add_argument('--memory_threshold', type=float, default=80.0, help="Memory usage threshold for alerts (in percent).")
     parser.add_argument('--disk_threshold', type=float, default=90.0, help="Disk usage threshold for alerts (in percent).")
     parser.add_argument('--alert_on_threshold', action='store_true', help="Enable alerts when thresholds are exceeded.")
-    
+    parser.add_argument('--quiet', action='store_true', help="Do not print each sample.")
+    parser.add_argument('--query', type=str, nargs='*', help="Print statistics for these metrics (all if none given) and exit.")
+    parser.add_argument('--window', type=float, default=3600, help="Query window (in seconds).")
+    parser.add_argument('--pids', type=int, nargs='*', default=[], help="Process IDs to profile.")
+    parser.add_argument('--process_names', type=str, nargs='*', default=[], help="Patterns matched against process name and command line, e.g. '*deploy_model.py*'.")
+    parser.add_argument('--no_threads', action='store_true', help="Do not sample individual threads.")
+    parser.add_argument('--prometheus_port', type=int, help="Serve metrics in Prometheus text format on this port.")
+    parser.add_argument('--alert_file', type=str, help="Also append alerts as JSON lines to this file.")
+    parser.add_argument('--smtp_host', type=str, help="Also email alert batches through this SMTP server.")
+    parser.add_argument('--smtp_port', type=int, default=25, help="SMTP server port.")
+    parser.add_argument('--alert_email', type=str, nargs='*', default=[], help="Recipients of alert emails.")
+    parser.add_argument('--webhook_url', type=str, help="Also POST alert batches as JSON to this URL.")
+    parser.add_argument('--alert_group_window', type=float, default=10.0, help="Seconds identical alerts are collected before delivery.")
+    parser.add_argument('--alert_dedup_window', type=float, default=300.0, help="Seconds a delivered alert is suppressed before repeats are reported.")
+    parser.add_argument('--alert_rate_limit', type=int, help="Maximum alert batches per minute for each file, email or webhook channel.")
+
     args = parser.parse_args()
-    main(args.interval, args.output_file, args.cpu_threshold, args.memory_threshold, args.disk_threshold, args.alert_on_threshold)
+    if args.alert_on_threshold:
+        alerting.configure(args.alert_file, args.smtp_host, args.smtp_port, args.alert_email, args.webhook_url,
+                           group_window=args.alert_group_window, dedup_window=args.alert_dedup_window,
+                           rate_limit=args.alert_rate_limit)
+    main(args.interval, args.store_dir, args.cpu_threshold, args.memory_threshold, args.disk_threshold,
+         args.alert_on_threshold, args.quiet, args.query, args.window, args.pids, args.process_names,
+         not args.no_threads, args.prometheus_port)
@@ -1,19 +1,43 @@
 import os
+import sys
+import json
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, MaxAbsScaler, OneHotEncoder
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.impute import SimpleImputer
 import argparse
 
-def load_data(file_path):
-    """
-    Load the dataset from a CSV file.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.pipeline_cache import PipelineCache
+from src.utils.data_loader import load_data, load_schema
+from src.utils.data_validation import SchemaValidator, DataValidationError
+
+# Category used for missing values in categorical columns
+MISSING_CATEGORY = '__missing__'
+
+def validate_data(df, target_column, categorical_columns=None, schema_path=None):
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
+    Validate the raw dataset before preprocessing and raise DataValidationError on violations.
     
-    return pd.read_csv(file_path)
+    schema_path: str, default=None
+        A JSON schema for SchemaValidator. Without one, the target must be present with no
+        missing values and any categorical columns must be present.
+    """
+    if schema_path:
+        validator = SchemaValidator.from_file(schema_path)
+    else:
+        columns = {column: {} for column in categorical_columns or []}
+        columns[target_column] = {'nullable': False}
+        validator = SchemaValidator({'columns': columns})
+
+    report = validator.validate(df)
+    if not report.ok:
+        raise DataValidationError(report)
+    print(report.summary())
+    return report
 
 def handle_missing_values(df, strategy="mean", fill_value=None):
     """
@@ -48,6 +72,75 @@ def encode_categorical_features(df, categorical_columns):
     df = pd.concat([df, encoded_df], axis=1)
     return df
 
+def encode_categorical_features_sparse(df, categorical_columns, method="onehot", n_features=2 ** 20):
+    """
+    Encode categorical variables into a CSR matrix without ever densifying them.
+    
+    categorical_columns: list of str
+        The list of categorical columns to encode.
+    method: str, default="onehot"
+        The encoding to use. Options:
+        - "onehot": One column per category (first category dropped), stored as CSR.
+        - "hashing": Hashing trick over "column=value" tokens into `n_features` columns;
+          memory stays bounded regardless of cardinality.
+    n_features: int, default=2**20
+        The output width when method="hashing".
+    
+    Returns the CSR matrix and its feature names (None for hashing, whose columns are anonymous).
+    """
+    if method not in ["onehot", "hashing"]:
+        raise ValueError(f"Unknown encoding method: {method}")
+
+    # astype(str) keeps missing values as NaN, which neither encoder accepts as a category
+    categories = df[categorical_columns].astype(str).fillna(MISSING_CATEGORY)
+    if method == "onehot":
+        encoder = OneHotEncoder(drop='first', dtype=np.float32)
+        encoded = encoder.fit_transform(categories).tocsr()
+        return encoded, list(encoder.get_feature_names_out(categorical_columns))
+
+    tokens = pd.DataFrame({column: column + "=" + categories[column] for column in categorical_columns})
+    hasher = FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False, dtype=np.float32)
+    encoded = hasher.transform(tokens.itertuples(index=False, name=None)).tocsr()
+    return encoded, None
+
+def scale_sparse_features(X, scaling_strategy="standard"):
+    """
+    Scale a sparse feature matrix without centering, so zero entries stay zero.
+    
+    scaling_strategy: str, default="standard"
+        - "standard": Scale to unit variance (StandardScaler with_mean=False).
+        - "minmax": Scale by the maximum absolute value into [-1, 1] (MaxAbsScaler).
+    """
+    if scaling_strategy not in ["standard", "minmax"]:
+        raise ValueError(f"Unknown scaling strategy: {scaling_strategy}")
+
+    scaler = StandardScaler(with_mean=False) if scaling_strategy == "standard" else MaxAbsScaler()
+    return scaler.fit_transform(X).tocsr()
+
+def build_sparse_features(df, target_column, categorical_columns, missing_strategy="mean", fill_value=None,
+                          scaling_strategy="standard", encoding="onehot", n_features=2 ** 20):
+    """
+    Build a scaled CSR feature matrix, its feature names (None when hashed) and the target
+    from a raw DataFrame.
+    
+    Missing values are imputed on the numeric columns only; categorical columns are encoded
+    with encode_categorical_features_sparse and stacked next to them.
+    """
+    categorical_columns = list(categorical_columns or [])
+    y = df[target_column]
+    numeric = df.drop(columns=[target_column] + categorical_columns)
+    numeric = handle_missing_values(numeric, strategy=missing_strategy, fill_value=fill_value)
+
+    blocks = [sparse.csr_matrix(numeric.to_numpy(dtype=np.float32))]
+    feature_names = [str(column) for column in numeric.columns]
+    if categorical_columns:
+        encoded, encoded_names = encode_categorical_features_sparse(df, categorical_columns, method=encoding, n_features=n_features)
+        blocks.append(encoded)
+        feature_names = feature_names + encoded_names if encoded_names is not None else None
+
+    X = scale_sparse_features(sparse.hstack(blocks, format='csr'), scaling_strategy=scaling_strategy)
+    return X, feature_names, y
+
 def scale_features(df, scaling_strategy="standard"):
     """
     Scale numerical features using the specified strategy.
@@ -80,25 +173,145 @@ def split_data(df, target_column, test_size=0.2, random_state=42):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
     return X_train, X_test, y_train, y_test
 
-def save_data(X_train, X_test, y_train, y_test, output_dir):
+def save_data(X_train, X_test, y_train, y_test, output_dir, output_format="csv"):
     """
-    Save the preprocessed data to CSV files.
+    Save the preprocessed data to the output directory.
     
     output_dir: str
         The directory to save the output files.
+    output_format: str, default="csv"
+        The file format to write. Options:
+        - "csv": Plain text CSV files.
+        - "parquet": Columnar Parquet files (requires pyarrow).
+        - "npy": NumPy arrays with a JSON schema sidecar, which the training and
+          evaluation scripts memory-map instead of parsing.
+    
+    Returns the paths of the files written.
     """
+    if output_format not in ["csv", "parquet", "npy"]:
+        raise ValueError(f"Unknown output format: {output_format}")
+
     os.makedirs(output_dir, exist_ok=True)
-    
-    X_train.to_csv(os.path.join(output_dir, 'X_train.csv'), index=False)
-    X_test.to_csv(os.path.join(output_dir, 'X_test.csv'), index=False)
-    y_train.to_csv(os.path.join(output_dir, 'y_train.csv'), index=False)
-    y_test.to_csv(os.path.join(output_dir, 'y_test.csv'), index=False)
+
+    paths = []
+    splits = {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+    for name, data in splits.items():
+        frame = data.to_frame() if isinstance(data, pd.Series) else data
+        path = os.path.join(output_dir, f'{name}.{output_format}')
+        if output_format == "csv":
+            frame.to_csv(path, index=False)
+        elif output_format == "parquet":
+            frame.reset_index(drop=True).to_parquet(path, index=False)
+        else:
+            paths.append(save_npy(frame, path))
+        paths.append(path)
 
     print(f"Preprocessed data saved to {output_dir}")
+    return paths
+
+def save_sparse_data(X_train, X_test, y_train, y_test, feature_names, output_dir, output_format="csv"):
+    """
+    Save a sparse train/test split: X as compressed CSR `.npz` files with a `.schema.json`
+    sidecar holding the feature names, and y in `output_format`. Returns the paths written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    for name, X in {'X_train': X_train, 'X_test': X_test}.items():
+        sparse.save_npz(os.path.join(output_dir, f'{name}.npz'), X.tocsr(), compressed=True)
+        schema = {'layout': 'sparse', 'columns': feature_names, 'dtypes': {}}
+        with open(os.path.join(output_dir, f'{name}.schema.json'), 'w') as f:
+            json.dump(schema, f)
+        paths += [os.path.join(output_dir, f'{name}.npz'), os.path.join(output_dir, f'{name}.schema.json')]
+
+    for name, y in {'y_train': y_train, 'y_test': y_test}.items():
+        frame = y.to_frame().reset_index(drop=True)
+        path = os.path.join(output_dir, f'{name}.{output_format}')
+        if output_format == "csv":
+            frame.to_csv(path, index=False)
+        elif output_format == "parquet":
+            frame.to_parquet(path, index=False)
+        else:
+            paths.append(save_npy(frame, path))
+        paths.append(path)
+
+    print(f"Preprocessed sparse data saved to {output_dir}")
+    return paths
+
+def save_npy(df, path):
+    """
+    Save a DataFrame as a .npy file plus a `<name>.schema.json` sidecar.
+    
+    Frames with a single numeric dtype are stored as a plain 2-D array so they can be
+    memory-mapped without copying; mixed frames are stored as a structured array with
+    one field per column. String columns are stored as fixed-width unicode, and the
+    sidecar records the original pandas dtypes so loaders can restore them exactly.
+    Returns the path of the sidecar.
+    """
+    dtypes = df.dtypes
+    homogeneous = dtypes.nunique() == 1 and pd.api.types.is_numeric_dtype(dtypes.iloc[0]) \
+        and not pd.api.types.is_extension_array_dtype(dtypes.iloc[0])
+    if homogeneous:
+        array = np.ascontiguousarray(df.to_numpy())
+        layout = "dense"
+    else:
+        column_dtypes = {}
+        for column in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                width = max(int(df[column].astype(str).str.len().max() or 0), 1)
+                column_dtypes[column] = f"U{width}"
+        array = df.to_records(index=False, column_dtypes=column_dtypes).view(np.ndarray)
+        layout = "structured"
+    np.save(path, array, allow_pickle=False)
+
+    schema = {
+        'layout': layout,
+        'columns': [str(column) for column in df.columns],
+        'dtypes': {str(column): str(dtype) for column, dtype in dtypes.items()}
+    }
+    schema_path = os.path.splitext(path)[0] + '.schema.json'
+    with open(schema_path, 'w') as f:
+        json.dump(schema, f, indent=4)
+    return schema_path
+
+def main(input_file, target_column, output_dir, missing_strategy, fill_value, categorical_columns, scaling_strategy, test_size, random_state,
+         output_format="csv", sparse_mode=False, encoding="onehot", hash_features=2 ** 20, cache_dir=None, cache_max_mb=5120,
+         dtype_schema=None, report_memory=False, validation_schema=None, validate=True, optimize_dtypes=False):
+    # Reuse the outputs of an identical earlier run when caching is enabled
+    cache, cache_key = None, None
+    if cache_dir:
+        cache = PipelineCache(cache_dir, max_bytes=cache_max_mb * 1024 ** 2)
+        params = {
+            'target_column': target_column, 'missing_strategy': missing_strategy, 'fill_value': fill_value,
+            'categorical_columns': categorical_columns, 'scaling_strategy': scaling_strategy, 'test_size': test_size,
+            'random_state': random_state, 'output_format': output_format, 'sparse_mode': sparse_mode,
+            'encoding': encoding, 'hash_features': hash_features, 'dtype_schema': load_schema(dtype_schema) if dtype_schema else None,
+            'validation_schema': load_schema(validation_schema) if validation_schema else None, 'validate': validate,
+            'optimize_dtypes': optimize_dtypes,
+        }
+        cache_key = cache.key('preprocess', [input_file], params)
+        if cache.fetch('preprocess', cache_key, output_dir):
+            print(f"Preprocessed data restored from cache to {output_dir}")
+            return
 
-def main(input_file, target_column, output_dir, missing_strategy, fill_value, categorical_columns, scaling_strategy, test_size, random_state):
     # Load the data
-    df = load_data(input_file)
+    dtypes = load_schema(dtype_schema) if dtype_schema else None
+    df = load_data(input_file, dtypes=dtypes, optimize=optimize_dtypes, report_memory=report_memory)
+
+    # Validate the raw data before any transformation
+    if validate:
+        validate_data(df, target_column, categorical_columns, schema_path=validation_schema)
+
+    if sparse_mode:
+        # Keep categorical encodings sparse end to end
+        X, feature_names, y = build_sparse_features(df, target_column, categorical_columns, missing_strategy=missing_strategy,
+                                                    fill_value=fill_value, scaling_strategy=scaling_strategy,
+                                                    encoding=encoding, n_features=hash_features)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+        paths = save_sparse_data(X_train, X_test, y_train, y_test, feature_names, output_dir, output_format=output_format)
+        if cache:
+            cache.store('preprocess', cache_key, paths)
+        return
 
     # Handle missing values
     df = handle_missing_values(df, strategy=missing_strategy, fill_value=fill_value)
@@ -107,14 +320,18 @@ def main(input_file, target_column, output_dir, missing_strategy, fill_value, ca
     if categorical_columns:
         df = encode_categorical_features(df, categorical_columns)
 
-    # Scale numerical features
-    df = scale_features(df, scaling_strategy=scaling_strategy)
+    # Scale numerical features, leaving the target untouched
+    target = df[target_column].to_numpy()
+    df = scale_features(df.drop(columns=[target_column]), scaling_strategy=scaling_strategy)
+    df[target_column] = target
 
     # Split the data into training and testing sets
     X_train, X_test, y_train, y_test = split_data(df, target_column, test_size=test_size, random_state=random_state)
 
     # Save the preprocessed data
-    save_data(X_train, X_test, y_train, y_test, output_dir)
+    paths = save_data(X_train, X_test, y_train, y_test, output_dir, output_format=output_format)
+    if cache:
+        cache.store('preprocess', cache_key, paths)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Preprocess a dataset for machine learning.")
@@ -129,6 +346,21 @@ if __name__ == "__main__":
                         help="Strategy for scaling numerical features.")
     parser.add_argument('--test_size', type=float, default=0.2, help="Proportion of the dataset to include in the test split.")
     parser.add_argument('--random_state', type=int, default=42, help="Seed used by the random number generator for splitting the data.")
+    parser.add_argument('--output_format', type=str, default="csv", choices=["csv", "parquet", "npy"],
+                        help="File format for the preprocessed splits. 'parquet' and 'npy' are read without text parsing.")
+    parser.add_argument('--sparse', action='store_true', help="Keep encoded features sparse and save X as CSR .npz files.")
+    parser.add_argument('--categorical_encoding', type=str, default="onehot", choices=["onehot", "hashing"],
+                        help="Sparse categorical encoding: one-hot or the hashing trick.")
+    parser.add_argument('--hash_features', type=int, default=2 ** 20, help="Number of output columns for hashing encoding.")
+    parser.add_argument('--cache_dir', type=str, default=None, help="Reuse outputs of identical earlier runs from this cache directory.")
+    parser.add_argument('--cache_max_mb', type=int, default=5120, help="Size bound of the cache directory in MB (LRU eviction).")
+    parser.add_argument('--dtype_schema', type=str, default=None, help="JSON file mapping column names to dtypes for loading the input.")
+    parser.add_argument('--report_memory', action='store_true', help="Print the memory usage of the loaded dataset.")
+    parser.add_argument('--optimize_dtypes', action='store_true', help="Downcast inferred column dtypes after loading to save memory.")
+    parser.add_argument('--validation_schema', type=str, default=None, help="JSON schema to validate the input against.")
+    parser.add_argument('--skip_validation', action='store_true', help="Skip input validation.")
     
     args = parser.parse_args()
-    main(args.input_file, args.target_column, args.output_dir, args.missing_strategy, args.fill_value, args.categorical_columns, args.scaling_strategy, args.test_size, args.random_state)
+    main(args.input_file, args.target_column, args.output_dir, args.missing_strategy, args.fill_value, args.categorical_columns, args.scaling_strategy, args.test_size, args.random_state,
+         args.output_format, args.sparse, args.categorical_encoding, args.hash_features, args.cache_dir, args.cache_max_mb,
+         args.dtype_schema, args.report_memory, args.validation_schema, not args.skip_validation, args.optimize_dtypes)
@@ -1,8 +1,14 @@
 import os
+import sys
+import time
 import pickle
 import json
 import argparse
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.backup_store import ChunkIntegrityError, load_manifest, store_for_backup, throughput
+from src.utils.backup_catalog import BackupCatalog
+
 def load_model(model_path):
     """
     Load the machine learning model from a pickle file.
@@ -39,20 +45,80 @@ def verify_backup(model_path, metadata_path):
     
     return True, "Backup integrity verified."
 
-def restore_model(backup_dir, verbose=False):
+def verify_chunked_backup(backup_dir, manifest, metadata_path, full=False, n_threads=None):
+    """
+    Verify a chunked backup by checking that its metadata and every chunk in its manifest exist.
+    With `full`, every chunk is also read, decompressed and checked against its checksum in
+    parallel, stopping at the first bad chunk.
+    """
+    if not os.path.exists(metadata_path):
+        return False, f"Metadata file missing: {metadata_path}"
+    
+    store = store_for_backup(backup_dir, n_threads=n_threads)
+    missing = [chunk['hash'] for chunk in manifest['chunks'] if not store.has(chunk['hash'])]
+    if missing:
+        return False, f"{len(missing)} chunk(s) missing from {store.root}, e.g. {missing[0]}"
+    
+    if full:
+        start_time = time.perf_counter()
+        try:
+            verified = store.verify(manifest['chunks'])
+        except ChunkIntegrityError as e:
+            return False, str(e)
+        return True, f"Backup integrity verified: {len(manifest['chunks'])} chunks at {throughput(verified, time.perf_counter() - start_time)}."
+    
+    return True, "Backup integrity verified."
+
+def find_metadata(backup_dir):
     """
-    Restore the model and metadata from the backup directory.
+    Locate the metadata file of a backup: metadata.json, or <model_name>_metadata.json as
+    written by backup_model.py.
     """
-    model_path = os.path.join(backup_dir, 'model.pkl')
     metadata_path = os.path.join(backup_dir, 'metadata.json')
+    if not os.path.exists(metadata_path) and os.path.isdir(backup_dir):
+        candidates = sorted(f for f in os.listdir(backup_dir) if f.endswith('_metadata.json'))
+        if candidates:
+            metadata_path = os.path.join(backup_dir, candidates[0])
+    return metadata_path
+
+def find_latest_backup(backup_root, model_name):
+    """
+    Look up the newest backup of a model in the catalog of `backup_root`.
+    """
+    with BackupCatalog(backup_root) as catalog:
+        latest = catalog.latest(model_name)
+    if latest is None:
+        raise FileNotFoundError(f"No backups of {model_name} found in {backup_root}")
+    return latest['path']
+
+def restore_model(backup_dir, verbose=False, n_threads=None):
+    """
+    Restore the model and metadata from the backup directory. Chunked backups are decompressed
+    in parallel and each chunk is checked against its checksum as it streams in, so a corrupt
+    backup raises ChunkIntegrityError at the first bad chunk.
+    """
+    metadata_path = find_metadata(backup_dir)
+    manifest = load_manifest(backup_dir)
     
-    # Verify the backup
-    is_valid, message = verify_backup(model_path, metadata_path)
-    if not is_valid:
-        raise FileNotFoundError(message)
+    if manifest is not None:
+        # Verify the backup, then stream the model out of the shared chunk store
+        is_valid, message = verify_chunked_backup(backup_dir, manifest, metadata_path)
+        if not is_valid:
+            raise FileNotFoundError(message)
+        start_time = time.perf_counter()
+        model = store_for_backup(backup_dir, n_threads=n_threads).read_object(manifest['chunks'])
+        print(f"Read {manifest['size'] / 1024 ** 2:.2f} MB at {throughput(manifest['size'], time.perf_counter() - start_time)}")
+    else:
+        model_path = os.path.join(backup_dir, 'model.pkl')
+        
+        # Verify the backup
+        is_valid, message = verify_backup(model_path, metadata_path)
+        if not is_valid:
+            raise FileNotFoundError(message)
+        
+        # Load the model
+        model = load_model(model_path)
     
-    # Load the model and metadata
-    model = load_model(model_path)
     metadata = load_metadata(metadata_path)
     
     if verbose:
@@ -63,9 +129,18 @@ def restore_model(backup_dir, verbose=False):
     
     return model, metadata
 
-def main(backup_dir, verbose):
+def main(backup_dir, verbose, verify_only=False, n_threads=None):
+    if verify_only:
+        manifest = load_manifest(backup_dir)
+        if manifest is None:
+            is_valid, message = verify_backup(os.path.join(backup_dir, 'model.pkl'), find_metadata(backup_dir))
+        else:
+            is_valid, message = verify_chunked_backup(backup_dir, manifest, find_metadata(backup_dir), full=True, n_threads=n_threads)
+        print(message)
+        return is_valid
+    
     try:
-        model, metadata = restore_model(backup_dir, verbose)
+        model, metadata = restore_model(backup_dir, verbose, n_threads)
         print("Model restored successfully.")
         
         if verbose:
@@ -77,8 +152,12 @@ def main(backup_dir, verbose):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Restore a machine learning model from a backup.")
-    parser.add_argument('--backup_dir', type=str, required=True, help="Path to the backup directory containing the model and metadata.")
+    parser.add_argument('--backup_dir', type=str, required=True, help="Path to the backup directory containing the model and metadata, or to the backup root with --model_name.")
+    parser.add_argument('--model_name', type=str, help="Restore the latest backup of this model from the catalog in --backup_dir.")
     parser.add_argument('--verbose', action='store_true', help="Print detailed information about the restored model.")
+    parser.add_argument('--verify_only', action='store_true', help="Check every chunk against its checksum without restoring the model.")
+    parser.add_argument('--threads', type=int, help="Threads for decompressing and verifying chunks.")
     
     args = parser.parse_args()
-    main(args.backup_dir, args.verbose)
+    backup_dir = find_latest_backup(args.backup_dir, args.model_name) if args.model_name else args.backup_dir
+    main(backup_dir, args.verbose, args.verify_only, args.threads)
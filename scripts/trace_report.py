@@ -0,0 +1,130 @@
+import os
+import json
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+def load_spans(trace_file):
+    """
+    Load Zipkin v2 spans from a JSON-lines file (as written by tracing.FileExporter) or a JSON array.
+    """
+    with open(trace_file, 'r') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def group_traces(spans):
+    """
+    Group spans by trace id. Returns {trace_id: (root span, {span id: [child spans]})} for
+    every trace whose root span is present.
+    """
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span['traceId']].append(span)
+
+    traces = {}
+    for trace_id, trace_spans in by_trace.items():
+        ids = {span['id'] for span in trace_spans}
+        children = defaultdict(list)
+        roots = []
+        for span in trace_spans:
+            if span.get('parentId') in ids:
+                children[span['parentId']].append(span)
+            else:
+                roots.append(span)
+        if roots:
+            # A continued trace can have a remote parent; the earliest local span is the root
+            traces[trace_id] = (min(roots, key=lambda span: span['timestamp']), children)
+    return traces
+
+def critical_path(span, children, breakdown, path=None, depth=0):
+    """
+    Add to `breakdown` the time each span name spends on the critical path under `span`.
+
+    Walking backward from the span's end, the child that finished last is the one the span
+    was waiting on; its own critical path is followed, the cursor moves to its start, and the
+    gaps between children count as the span's own (self) time.
+    """
+    end = span['timestamp'] + span['duration']
+    cursor = end
+    self_time = 0
+    for child in sorted(children.get(span['id'], []), key=lambda c: c['timestamp'] + c['duration'], reverse=True):
+        child_end = min(child['timestamp'] + child['duration'], cursor)
+        if child['timestamp'] >= cursor:
+            continue
+        self_time += cursor - child_end
+        critical_path(child, children, breakdown, path, depth + 1)
+        cursor = child['timestamp']
+    self_time += max(cursor - span['timestamp'], 0)
+    breakdown[span['name']] += self_time
+    if path is not None:
+        path.append((depth, span['name'], span['duration'], self_time))
+    return breakdown
+
+def endpoint_report(traces, endpoint=None, min_duration_ms=0.0):
+    """
+    Return {endpoint: {'count', 'p50', 'p95', 'p99', 'breakdown': {span name: mean ms}}},
+    with durations in milliseconds.
+    """
+    per_endpoint = defaultdict(list)
+    for trace_id, (root, children) in traces.items():
+        if endpoint is not None and root['name'] != endpoint:
+            continue
+        if root['duration'] / 1000 < min_duration_ms:
+            continue
+        per_endpoint[root['name']].append((root, children))
+
+    report = {}
+    for name, items in per_endpoint.items():
+        durations = np.array([root['duration'] / 1000 for root, _ in items])
+        totals = defaultdict(float)
+        for root, children in items:
+            for span_name, micros in critical_path(root, children, defaultdict(float)).items():
+                totals[span_name] += micros / 1000
+        report[name] = {
+            'count': len(items),
+            'p50': float(np.percentile(durations, 50)),
+            'p95': float(np.percentile(durations, 95)),
+            'p99': float(np.percentile(durations, 99)),
+            'breakdown': {span_name: total / len(items) for span_name, total in totals.items()},
+        }
+    return report
+
+def print_report(report):
+    for name, stats in sorted(report.items(), key=lambda item: -item[1]['p95']):
+        print(f"{name}: {stats['count']} traces, p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms, p99 {stats['p99']:.2f} ms")
+        mean_total = sum(stats['breakdown'].values()) or 1.0
+        for span_name, mean_ms in sorted(stats['breakdown'].items(), key=lambda item: -item[1]):
+            print(f"    {span_name:<40} {mean_ms:9.3f} ms  {100 * mean_ms / mean_total:5.1f}%")
+
+def print_slowest(traces, count, endpoint=None):
+    """
+    Print the critical path of the `count` slowest traces, one line per span on the path.
+    """
+    candidates = [(root, children) for root, children in traces.values() if endpoint is None or root['name'] == endpoint]
+    for root, children in sorted(candidates, key=lambda item: -item[0]['duration'])[:count]:
+        print(f"Trace {root['traceId']} ({root['name']}, {root['duration'] / 1000:.2f} ms):")
+        path = []
+        critical_path(root, children, defaultdict(float), path)
+        for depth, name, duration, self_time in reversed(path):
+            print(f"    {'  ' * depth}{name}: {duration / 1000:.3f} ms (self {self_time / 1000:.3f} ms)")
+
+def main(trace_file, endpoint=None, min_duration_ms=0.0, slowest=0):
+    if not os.path.exists(trace_file):
+        raise FileNotFoundError(f"Trace file not found: {trace_file}")
+    traces = group_traces(load_spans(trace_file))
+    print_report(endpoint_report(traces, endpoint, min_duration_ms))
+    if slowest:
+        print_slowest(traces, slowest, endpoint)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print per-endpoint critical-path breakdowns from exported traces.")
+    parser.add_argument('--trace_file', type=str, required=True, help="Span file written with QUANTICORE_TRACE_FILE.")
+    parser.add_argument('--endpoint', type=str, help="Only report this root span name, e.g. 'GET /api/user'.")
+    parser.add_argument('--min_duration_ms', type=float, default=0.0, help="Only include traces at least this slow.")
+    parser.add_argument('--slowest', type=int, default=0, help="Also print the critical path of the N slowest traces.")
+
+    args = parser.parse_args()
+    main(args.trace_file, args.endpoint, args.min_duration_ms, args.slowest)
@@ -1,24 +1,34 @@
 import os
+import sys
 import json
+import time
 import pickle
+import shutil
 import argparse
+import tempfile
+import glob
+import functools
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from threadpoolctl import threadpool_limits
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.linear_model import LogisticRegression, LinearRegression
 from sklearn.svm import SVC, SVR
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neural_network import MLPClassifier, MLPRegressor
+from sklearn.pipeline import Pipeline
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.hyperparameter_tuning import HyperparameterTuner, share_arrays, load_shared_arrays
+from src.utils.data_loader import load_data, load_split, load_schema, iter_chunks, find_split_file
 
-def load_data(file_path):
-    """
-    Load the dataset from a CSV file.
-    """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    return pd.read_csv(file_path)
 
 def preprocess_data(df, target_column, scale_features=True, encode_labels=True):
     """
@@ -27,7 +37,7 @@ def preprocess_data(df, target_column, scale_features=True, encode_labels=True):
     X = df.drop(columns=[target_column])
     y = df[target_column]
 
-    if encode_labels and y.dtype == 'object':
+    if encode_labels and not pd.api.types.is_numeric_dtype(y):
         le = LabelEncoder()
         y = le.fit_transform(y)
 
@@ -37,26 +47,30 @@ def preprocess_data(df, target_column, scale_features=True, encode_labels=True):
     
     return X, y
 
-def train_model(X_train, y_train, model_type='classification', model_name='random_forest'):
+def train_model(X_train, y_train, model_type='classification', model_name='random_forest', params=None):
     """
     Train a machine learning model.
+    
+    X_train may be a dense array, a DataFrame or a scipy.sparse matrix. `params` are passed
+    to the estimator constructor (e.g. the best parameters found by HyperparameterTuner).
     """
+    params = params or {}
     if model_type == 'classification':
         if model_name == 'random_forest':
-            model = RandomForestClassifier()
+            model = RandomForestClassifier(**params)
         elif model_name == 'logistic_regression':
-            model = LogisticRegression()
+            model = LogisticRegression(**params)
         elif model_name == 'svm':
-            model = SVC()
+            model = SVC(**params)
         else:
             raise ValueError(f"Unknown model name: {model_name}")
     elif model_type == 'regression':
         if model_name == 'random_forest':
-            model = RandomForestRegressor()
+            model = RandomForestRegressor(**params)
         elif model_name == 'linear_regression':
-            model = LinearRegression()
+            model = LinearRegression(**params)
         elif model_name == 'svm':
-            model = SVR()
+            model = SVR(**params)
         else:
             raise ValueError(f"Unknown model name: {model_name}")
     else:
@@ -80,9 +94,31 @@ def evaluate_model(model, X_test, y_test, model_type='classification'):
     else:
         raise ValueError(f"Unknown model type: {model_type}")
 
-def save_model(model, output_dir, model_name='model'):
+def feature_dtypes(X):
+    """
+    Return {column: dtype name} for a DataFrame of model inputs, or None for an array.
+    """
+    if not isinstance(X, pd.DataFrame):
+        return None
+    return {str(column): str(dtype) for column, dtype in X.dtypes.items()}
+
+def input_features(input_file, target_column):
+    """
+    Return feature_dtypes for the model inputs from the first row of a dataset file, or of the
+    X_train split of a preprocess_data.py directory (None for sparse splits).
+    """
+    if os.path.isdir(input_file):
+        path = find_split_file(input_file, 'X_train')
+        return None if path.endswith('.npz') else feature_dtypes(next(iter_chunks(path, 1)))
+    return feature_dtypes(next(iter_chunks(input_file, 1)).drop(columns=[target_column]))
+
+def save_model(model, output_dir, model_name='model', features=None):
     """
     Save the trained model and metadata to the output directory.
+    
+    The metadata records the input columns (`feature_names`, and `feature_dtypes` when
+    `features` ({column: dtype name}) is given) that deploy_model.py validates requests against.
+    Without `features`, the columns the estimator was fitted on are used when it has them.
     """
     os.makedirs(output_dir, exist_ok=True)
     
@@ -95,41 +131,344 @@ def save_model(model, output_dir, model_name='model'):
         'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'model_params': model.get_params()
     }
+    if features:
+        metadata['feature_names'] = list(features)
+        metadata['feature_dtypes'] = dict(features)
+    elif hasattr(model, 'feature_names_in_'):
+        metadata['feature_names'] = [str(name) for name in model.feature_names_in_]
     
     metadata_path = os.path.join(output_dir, f'{model_name}_metadata.json')
     with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=4)
+        json.dump(metadata, f, indent=4, default=str)
 
     print(f"Model and metadata saved to {output_dir}")
 
-def main(input_file, target_column, model_type, model_name, test_size, output_dir, scale_features, encode_labels):
-    # Load and preprocess data
-    df = load_data(input_file)
-    X, y = preprocess_data(df, target_column, scale_features=scale_features, encode_labels=encode_labels)
+def tune_model(X_train, y_train, model_type, model_name, search='random', n_candidates=27, strategy='successive_halving',
+               n_jobs=None, trial_log=None, patience=None):
+    """
+    Search hyperparameters for the model family and return the best parameters.
+    """
+    tuner = HyperparameterTuner(model_type, model_name, search=search, n_candidates=n_candidates, strategy=strategy,
+                                n_jobs=n_jobs, trial_log=trial_log, patience=patience)
+    best_params = tuner.fit(X_train, y_train)
+    print(f"Best parameters: {best_params} (validation score {tuner.best_score:.4f} over {len(tuner.trials)} trials)")
+    return best_params
+
+def train_shared_model(paths, model_type, model_name, params, n_threads, output_dir, features=None):
+    """
+    Worker entry point: train, evaluate and save one model on memory-mapped train/test splits.
+    `n_threads` caps the estimator's own parallelism and the BLAS/OpenMP thread pools.
+    """
+    X_train, y_train = load_shared_arrays(paths['train'])
+    X_test, y_test = load_shared_arrays(paths['test'])
+
+    params = dict(params or {})
+    if model_name == 'random_forest':
+        params.setdefault('n_jobs', n_threads)
+
+    with threadpool_limits(limits=n_threads):
+        started = time.perf_counter()
+        model = train_model(X_train, y_train, model_type=model_type, model_name=model_name, params=params)
+        fit_seconds = time.perf_counter() - started
+        performance = evaluate_model(model, X_test, y_test, model_type=model_type)
+
+    save_model(model, output_dir, model_name=model_name, features=features)
+    return dict(performance, model_name=model_name, fit_seconds=fit_seconds)
+
+def train_models_concurrently(X_train, X_test, y_train, y_test, model_type, model_names, output_dir, cpu_budget=None, params=None,
+                              features=None):
+    """
+    Train several model families on the same splits in parallel worker processes.
+    
+    The splits are written once to memory-mapped .npy files that every worker maps instead of
+    receiving its own copy. At most `cpu_budget` CPUs are used: one worker per model up to the
+    budget, with the remaining CPUs shared out as estimator/BLAS threads. Returns a comparison
+    table (best model first), which is also written to `model_comparison.json`. `features` is
+    recorded in each model's metadata (see save_model).
+    """
+    cpu_budget = cpu_budget or os.cpu_count()
+    n_workers = max(1, min(len(model_names), cpu_budget))
+    n_threads = max(1, cpu_budget // n_workers)
+    params = params or {}
+
+    directory = tempfile.mkdtemp(prefix='quanticore_train_')
+    try:
+        paths = {}
+        for split, (X, y) in {'train': (X_train, y_train), 'test': (X_test, y_test)}.items():
+            os.makedirs(os.path.join(directory, split))
+            paths[split] = share_arrays(X, y, os.path.join(directory, split))
+
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(train_shared_model, paths, model_type, model_name, params.get(model_name), n_threads, output_dir,
+                                       features)
+                       for model_name in model_names]
+            results = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    metric, best_first = ('accuracy', True) if model_type == 'classification' else ('mse', False)
+    comparison = pd.DataFrame(results).set_index('model_name').sort_values(metric, ascending=not best_first)
+    print("Model Comparison:")
+    print(comparison.to_string(float_format=lambda v: f"{v:.4f}"))
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'model_comparison.json'), 'w') as f:
+        json.dump(comparison.reset_index().to_dict(orient='records'), f, indent=4)
+    return comparison
+
+# Estimators that support partial_fit, for out-of-core training. Passive-aggressive models are
+# SGD with the PA-I step size (the PassiveAggressive* classes are deprecated in scikit-learn 1.8)
+INCREMENTAL_MODELS = {
+    'classification': {
+        'sgd': SGDClassifier,
+        'passive_aggressive': functools.partial(SGDClassifier, loss='hinge', penalty=None, learning_rate='pa1', eta0=1.0),
+        'naive_bayes': GaussianNB,
+        'mlp': MLPClassifier,
+    },
+    'regression': {
+        'sgd': SGDRegressor,
+        'passive_aggressive': functools.partial(SGDRegressor, loss='epsilon_insensitive', penalty=None, learning_rate='pa1', eta0=1.0),
+        'mlp': MLPRegressor,
+    },
+}
+
+def is_holdout(start, n_rows, test_size):
+    """
+    Deterministically mark rows as held out from their position in the file, so the same rows
+    are held out on every pass without storing an index.
+    """
+    positions = np.arange(start, start + n_rows, dtype=np.uint64)
+    hashed = (positions * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hashed < np.uint64(int(test_size * 2 ** 32))
+
+def iter_split_chunks(input_file, target_column, chunksize, test_size, holdout=False):
+    """
+    Stream the training (or held-out) rows as dense float arrays.
+    
+    A directory written by preprocess_data.py uses its own train/test splits; a single file is
+    split by row position with `test_size`.
+    """
+    if os.path.isdir(input_file):
+        X, y = load_split(input_file, 'test' if holdout else 'train')
+        for start in range(0, X.shape[0], chunksize):
+            X_chunk = X[start:start + chunksize] if sparse.issparse(X) else X.iloc[start:start + chunksize].to_numpy(dtype=np.float64)
+            yield X_chunk, y.iloc[start:start + chunksize].to_numpy()
+        return
+
+    start = 0
+    for chunk in iter_chunks(input_file, chunksize):
+        mask = is_holdout(start, len(chunk), test_size)
+        if not holdout:
+            mask = ~mask
+        start += len(chunk)
+        if mask.any():
+            X, y = chunk.drop(columns=[target_column]), chunk[target_column]
+            yield X.to_numpy(dtype=np.float64)[mask], y.to_numpy()[mask]
+
+def shuffled_batches(chunks, buffer_size, batch_size, rng):
+    """
+    Approximately shuffle a stream of (X, y) chunks with a bounded buffer of `buffer_size` rows
+    and yield mini-batches of `batch_size` rows.
+    """
+    buffer_X, buffer_y = [], []
+    buffered = 0
+    for X, y in chunks:
+        buffer_X.append(X)
+        buffer_y.append(y)
+        buffered += X.shape[0]
+        if buffered < buffer_size + batch_size:
+            continue
+        X_all = sparse.vstack(buffer_X) if sparse.issparse(X) else np.concatenate(buffer_X)
+        y_all = np.concatenate(buffer_y)
+        order = rng.permutation(buffered)
+        emit, keep = order[:buffered - buffer_size], order[buffered - buffer_size:]
+        for start in range(0, len(emit), batch_size):
+            rows = emit[start:start + batch_size]
+            yield X_all[rows], y_all[rows]
+        buffer_X, buffer_y, buffered = [X_all[keep]], [y_all[keep]], len(keep)
+
+    if buffered:
+        X_all = sparse.vstack(buffer_X) if sparse.issparse(buffer_X[0]) else np.concatenate(buffer_X)
+        y_all = np.concatenate(buffer_y)
+        order = rng.permutation(buffered)
+        for start in range(0, buffered, batch_size):
+            rows = order[start:start + batch_size]
+            yield X_all[rows], y_all[rows]
+
+def evaluate_incremental(model, scaler, chunks, model_type):
+    """
+    Score a model over a stream of held-out chunks, accumulating the metric chunk by chunk.
+    """
+    correct, squared_error, count = 0, 0.0, 0
+    for X, y in chunks:
+        predictions = model.predict(scaler.transform(X))
+        if model_type == 'classification':
+            correct += int((predictions == y).sum())
+        else:
+            squared_error += float(((predictions - y) ** 2).sum())
+        count += len(y)
+    if count == 0:
+        return {}
+    return {'accuracy': correct / count} if model_type == 'classification' else {'mse': squared_error / count}
+
+def latest_checkpoint(checkpoint_dir, model_name):
+    """
+    Return the path of the highest-epoch checkpoint for `model_name`, or None.
+    """
+    checkpoints = glob.glob(os.path.join(checkpoint_dir, f'{model_name}_epoch*.pkl'))
+    if not checkpoints:
+        return None
+    return max(checkpoints, key=lambda path: int(path.rsplit('_epoch', 1)[1][:-len('.pkl')]))
+
+def train_incremental(input_file, target_column, model_type, model_name, output_dir, epochs=5, chunksize=100_000,
+                      batch_size=10_000, shuffle_buffer=100_000, test_size=0.2, params=None, resume=False, random_state=42):
+    """
+    Train a partial_fit-capable estimator out of core, streaming the dataset in chunks.
+    
+    A first pass fits the StandardScaler statistics (and collects the class labels); each epoch
+    then streams the training rows through a shuffle buffer into partial_fit, scores the
+    held-out rows and writes a checkpoint that `resume=True` continues from. Returns the fitted
+    scaler/model Pipeline.
+    """
+    if model_type not in INCREMENTAL_MODELS:
+        raise ValueError(f"Unknown model type: {model_type}")
+    if model_name not in INCREMENTAL_MODELS[model_type]:
+        raise ValueError(f"Model {model_name} does not support incremental training for {model_type}")
+
+    checkpoint_dir = os.path.join(output_dir, 'checkpoints')
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    chunks = lambda holdout=False: iter_split_chunks(input_file, target_column, chunksize, test_size, holdout=holdout)
+
+    checkpoint_path = latest_checkpoint(checkpoint_dir, model_name) if resume else None
+    if checkpoint_path:
+        with open(checkpoint_path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        model, scaler, classes, start_epoch = checkpoint['model'], checkpoint['scaler'], checkpoint['classes'], checkpoint['epoch'] + 1
+        print(f"Resuming from {checkpoint_path}")
+    else:
+        # First pass: scaling statistics and the full set of class labels
+        scaler, labels = None, set()
+        for X, y in chunks():
+            if scaler is None:
+                scaler = StandardScaler(with_mean=not sparse.issparse(X))
+            scaler.partial_fit(X)
+            if model_type == 'classification':
+                labels.update(np.unique(y).tolist())
+        if scaler is None:
+            raise ValueError(f"No training rows in {input_file} (test_size={test_size})")
+        classes = np.array(sorted(labels)) if model_type == 'classification' else None
+        model = INCREMENTAL_MODELS[model_type][model_name](**(params or {}))
+        start_epoch = 0
+
+    for epoch in range(start_epoch, epochs):
+        started = time.perf_counter()
+        rng = np.random.default_rng([random_state, epoch])
+        for X, y in shuffled_batches(chunks(), shuffle_buffer, batch_size, rng):
+            if classes is not None:
+                model.partial_fit(scaler.transform(X), y, classes=classes)
+            else:
+                model.partial_fit(scaler.transform(X), y)
+
+        performance = evaluate_incremental(model, scaler, chunks(holdout=True), model_type)
+        print(f"Epoch {epoch + 1}/{epochs}: {performance} ({time.perf_counter() - started:.1f}s)")
+
+        checkpoint_path = os.path.join(checkpoint_dir, f'{model_name}_epoch{epoch}.pkl')
+        with open(checkpoint_path, 'wb') as f:
+            pickle.dump({'epoch': epoch, 'model': model, 'scaler': scaler, 'classes': classes, 'performance': performance}, f)
+
+    return Pipeline([('scaler', scaler), ('model', model)])
+
+def main(input_file, target_column, model_type, model_name, test_size, output_dir, scale_features, encode_labels,
+         tune=False, search='random', n_candidates=27, tuning_strategy='successive_halving', n_jobs=None, trial_log=None, patience=None,
+         cpu_budget=None, incremental=False, epochs=5, chunksize=100_000, batch_size=10_000, shuffle_buffer=100_000, resume=False,
+         dtype_schema=None, report_memory=False, optimize_dtypes=False):
+    if incremental:
+        # Out-of-core: the dataset is streamed, never loaded whole
+        features = input_features(input_file, target_column)
+        for name in ([model_name] if isinstance(model_name, str) else model_name):
+            model = train_incremental(input_file, target_column, model_type, name, output_dir, epochs=epochs, chunksize=chunksize,
+                                      batch_size=batch_size, shuffle_buffer=shuffle_buffer, test_size=test_size, resume=resume)
+            save_model(model, output_dir, model_name=name, features=features)
+        return
+
+    if os.path.isdir(input_file):
+        # Splits written by preprocess_data.py are already encoded, scaled and split
+        X_train, y_train = load_split(input_file, 'train')
+        X_test, y_test = load_split(input_file, 'test')
+        features = feature_dtypes(X_train)
+    else:
+        # Load and preprocess data
+        dtypes = load_schema(dtype_schema) if dtype_schema else None
+        df = load_data(input_file, dtypes=dtypes, optimize=optimize_dtypes, report_memory=report_memory)
+        # Scaling turns X into an array, so record the input columns first
+        features = feature_dtypes(df.head(0).drop(columns=[target_column]))
+        X, y = preprocess_data(df, target_column, scale_features=scale_features, encode_labels=encode_labels)
+
+        # Split the data into training and testing sets
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+    model_names = [model_name] if isinstance(model_name, str) else list(model_name)
+
+    # Optionally search hyperparameters on the training split
+    params = {}
+    if tune:
+        for name in model_names:
+            params[name] = tune_model(X_train, y_train, model_type, name, search=search, n_candidates=n_candidates,
+                                      strategy=tuning_strategy, n_jobs=n_jobs, trial_log=trial_log, patience=patience)
+
+    if len(model_names) > 1:
+        # Train every candidate concurrently on the shared, already preprocessed splits
+        train_models_concurrently(X_train, X_test, y_train, y_test, model_type, model_names, output_dir,
+                                  cpu_budget=cpu_budget, params=params, features=features)
+        return
 
-    # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    model_name = model_names[0]
+    params = params.get(model_name)
 
     # Train the model
-    model = train_model(X_train, y_train, model_type=model_type, model_name=model_name)
+    model = train_model(X_train, y_train, model_type=model_type, model_name=model_name, params=params)
 
     # Evaluate the model
     performance = evaluate_model(model, X_test, y_test, model_type=model_type)
     print(f"Model Performance: {performance}")
 
     # Save the model and metadata
-    save_model(model, output_dir, model_name=model_name)
+    save_model(model, output_dir, model_name=model_name, features=features)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train a machine learning model.")
-    parser.add_argument('--input_file', type=str, required=True, help="Path to the input CSV file containing the dataset.")
+    parser.add_argument('--input_file', type=str, required=True, help="Path to the dataset (CSV, Parquet or .npy), or a directory of splits written by preprocess_data.py.")
     parser.add_argument('--target_column', type=str, required=True, help="The name of the target column in the dataset.")
     parser.add_argument('--model_type', type=str, required=True, choices=['classification', 'regression'], help="Type of model to train.")
-    parser.add_argument('--model_name', type=str, default='random_forest', help="The name of the model to train (e.g., 'random_forest', 'logistic_regression', 'svm').")
+    parser.add_argument('--model_name', type=str, nargs='+', default=['random_forest'],
+                        help="The name(s) of the model(s) to train (e.g., 'random_forest', 'logistic_regression', 'svm'). "
+                             "Several names train concurrently on one preprocessed copy of the data.")
     parser.add_argument('--test_size', type=float, default=0.2, help="Proportion of the dataset to include in the test split.")
     parser.add_argument('--output_dir', type=str, required=True, help="Directory to save the trained model and metadata.")
     parser.add_argument('--scale_features', action='store_true', help="Scale numerical features before training.")
     parser.add_argument('--encode_labels', action='store_true', help="Encode target labels if they are categorical.")
+    parser.add_argument('--tune', action='store_true', help="Search hyperparameters before training the final model.")
+    parser.add_argument('--search', type=str, default='random', choices=['random', 'grid'], help="Hyperparameter search space sampling.")
+    parser.add_argument('--n_candidates', type=int, default=27, help="Number of candidates to sample (grid search: cap on grid size).")
+    parser.add_argument('--tuning_strategy', type=str, default='successive_halving', choices=['successive_halving', 'hyperband', 'none'],
+                        help="Budget allocation across candidates.")
+    parser.add_argument('--n_jobs', type=int, default=None, help="Worker processes for tuning (default: all CPUs).")
+    parser.add_argument('--trial_log', type=str, default=None, help="JSON-lines trial log; an existing log is resumed.")
+    parser.add_argument('--patience', type=int, default=None, help="With --tuning_strategy hyperband, stop after this many brackets without a full-budget improvement.")
+    parser.add_argument('--cpu_budget', type=int, default=None, help="CPUs to use when training several models (default: all CPUs).")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Stream the dataset in chunks and train with partial_fit (models: 'sgd', 'passive_aggressive', 'naive_bayes', 'mlp').")
+    parser.add_argument('--epochs', type=int, default=5, help="Passes over the data in incremental mode.")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows read per chunk in incremental mode.")
+    parser.add_argument('--batch_size', type=int, default=10_000, help="Rows per partial_fit call in incremental mode.")
+    parser.add_argument('--shuffle_buffer', type=int, default=100_000, help="Rows held in the shuffle buffer in incremental mode.")
+    parser.add_argument('--resume', action='store_true', help="Resume incremental training from the latest checkpoint in output_dir.")
+    parser.add_argument('--dtype_schema', type=str, default=None, help="JSON file mapping column names to dtypes for loading the dataset.")
+    parser.add_argument('--report_memory', action='store_true', help="Print the memory usage of the loaded dataset.")
+    parser.add_argument('--optimize_dtypes', action='store_true', help="Downcast inferred column dtypes after loading to save memory.")
     
     args = parser.parse_args()
-    main(args.input_file, args.target_column, args.model_type, args.model_name, args.test_size, args.output_dir, args.scale_features, args.encode_labels)
+    main(args.input_file, args.target_column, args.model_type, args.model_name, args.test_size, args.output_dir, args.scale_features, args.encode_labels,
+         args.tune, args.search, args.n_candidates, args.tuning_strategy, args.n_jobs, args.trial_log, args.patience,
+         args.cpu_budget, args.incremental, args.epochs, args.chunksize, args.batch_size, args.shuffle_buffer, args.resume,
+         args.dtype_schema, args.report_memory, args.optimize_dtypes)
@@ -3,6 +3,9 @@
 import random
 import time
 
+from src.monitoring.performance_monitor import timed
+from src.monitoring.memory_diagnostics import track
+
 class CognitiveModule:
     def __init__(self, module_name, specialization=None):
         self.module_name = module_name
@@ -22,6 +25,7 @@ class CognitiveModule:
             'relaxation_level': 0,
             'goals': []
         }
+        track(self, 'state.short_term_memory', 'state.long_term_memory', 'state.context')
     
     def process_input(self, input_data):
         # Update context and process input based on specialization
@@ -166,6 +170,7 @@ class CognitiveArchitecture:
             'collective_beliefs': {},
             'ethical_constraints': ['do no harm', 'ensure fairness']
         }
+        track(self, 'global_state.shared_memory', 'global_state.overall_context')
     
     def add_module(self, module_name, specialization=None):
         self.modules[module_name] = CognitiveModule(module_name, specialization)
@@ -178,6 +183,7 @@ class CognitiveArchitecture:
             self.global_state['shared_memory'].extend(module.state['long_term_memory'])
             self.global_state['collective_beliefs'].update(module.state['beliefs'])
     
+    @timed('cognitive_architecture_process_input_seconds', "Latency of CognitiveArchitecture.process_input.")
     def process_input(self, input_data):
         # Distribute input data to all modules for processing
         for module in self.modules.values():
@@ -3,6 +3,10 @@ import pickle
 import os
 from datetime import datetime
 
+from src.monitoring.performance_monitor import timed
+from src.monitoring.tracing import traced
+from src.monitoring.memory_diagnostics import track
+
 class AICore:
     def __init__(self, models_dir='models', log_file='ai_core.log'):
         """
@@ -12,6 +16,7 @@ class AICore:
         self.models_dir = models_dir
         self.log_file = log_file
         self._setup_logging()
+        track(self, 'models')
 
     def _setup_logging(self):
         """
@@ -70,6 +75,8 @@ class AICore:
         
         logging.info(f"Model {model_name} saved successfully.")
 
+    @timed('ai_core_predict_seconds', "Latency of AICore.predict.")
+    @traced('AICore.predict')
     def predict(self, model_name, input_data):
         """
         Perform a prediction using the specified model.
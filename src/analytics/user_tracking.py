@@ -3,6 +3,8 @@ import json
 import logging
 from datetime import datetime
 
+from src.monitoring.performance_monitor import timed
+
 class UserTracking:
     def __init__(self, log_dir='logs', log_file='user_tracking.log', analytics_file='user_analytics.json'):
         """
@@ -48,6 +50,7 @@ class UserTracking:
             json.dump(self.analytics_data, f, indent=4)
         logging.info(f"Analytics data saved to {self.analytics_file}")
 
+    @timed('user_tracking_track_event_seconds', "Latency of UserTracking.track_event.")
     def track_event(self, user_id, event_name, event_data=None):
         """
         Track a user event.
@@ -3,6 +3,10 @@ from flask_graphql import GraphQLView
 import graphene
 from graphene import ObjectType, String, Int, List, Field, Mutation, Boolean
 
+from src.monitoring.performance_monitor import instrument_flask
+from src.monitoring.memory_diagnostics import diagnostics
+from src.monitoring.sampling_profiler import profiler
+
 # Sample in-memory data storage
 users = [
     {"id": 1, "name": "John Doe", "age": 28},
@@ -90,6 +94,13 @@ schema = graphene.Schema(query=Query, mutation=Mutation)
 # Set up the Flask application
 app = Flask(__name__)
 
+# Time every route and serve the metrics at /metrics
+instrument_flask(app)
+
+# Admin-only memory diagnostics under /admin/memory and sampling profiler under /admin/profile
+diagnostics.register_routes(app)
+profiler.register_routes(app)
+
 # Add the GraphQL view to the Flask app
 app.add_url_rule(
     '/graphql',
@@ -107,4 +118,5 @@ def index():
 
 # Run the application
 if __name__ == '__main__':
+    diagnostics.install_signal_handler()
     app.run(debug=True)
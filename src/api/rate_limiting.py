@@ -1,12 +1,72 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from functools import wraps
 from redis import Redis
-import time
+import math
 import hashlib
 
-# Initialize Redis for storing request counts and timestamps
+from src.monitoring.tracing import tracer
+
+# Initialize Redis for storing rate limit state
 redis = Redis(host='localhost', port=6379, db=0, decode_responses=True)
 
+# Generic cell rate algorithm (GCRA): a key stores only the theoretical arrival time (TAT) of
+# the next request, in microseconds of the Redis server clock. Each request moves it forward
+# by the emission interval (period / max_requests); a request is refused when that would put
+# the TAT more than `period` ahead of now. This allows bursts of up to max_requests and then
+# one request per emission interval. Running as one script keeps the read and the update
+# atomic across app servers, and the server clock keeps them from disagreeing about "now".
+# Returns {allowed, remaining, retry_after_us, reset_us}.
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000000 + tonumber(now_parts[2])
+local emission_interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + emission_interval
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((now + tolerance - new_tat) / emission_interval), 0, new_tat - now}
+"""
+gcra = redis.register_script(GCRA_SCRIPT)
+
+def check_rate_limit(key, max_requests, period):
+    """
+    Count one request against `key` and report the state of its quota.
+
+    :param key: Identifies the limit; its state is stored under 'gcra:<key>', apart from the
+                sorted sets of the previous sliding-window implementation.
+    :param max_requests: Maximum number of allowed requests in the given period.
+    :param period: Time period in seconds in which max_requests are counted.
+    :return: A dict with 'allowed', 'limit', 'remaining', 'retry_after' (seconds until a
+             refused request may be retried) and 'reset' (seconds until the quota is full again).
+    """
+    emission_interval = int(period * 1000000 / max_requests)
+    allowed, remaining, retry_after, reset = gcra(keys=[f'gcra:{key}'], args=[emission_interval, emission_interval * max_requests])
+    return {
+        'allowed': bool(allowed),
+        'limit': max_requests,
+        'remaining': int(remaining),
+        'retry_after': int(retry_after) / 1000000,
+        'reset': int(reset) / 1000000,
+    }
+
+def rate_limit_headers(response, quota):
+    """
+    Add the X-RateLimit-* headers (and Retry-After on refusals) for `quota` to a response.
+    """
+    response.headers['X-RateLimit-Limit'] = str(quota['limit'])
+    response.headers['X-RateLimit-Remaining'] = str(quota['remaining'])
+    response.headers['X-RateLimit-Reset'] = str(math.ceil(quota['reset']))
+    if not quota['allowed']:
+        response.headers['Retry-After'] = str(math.ceil(quota['retry_after']))
+    return response
+
 def rate_limit(key_prefix, max_requests, period):
     """
     Rate limiting decorator to limit the number of requests.
@@ -18,24 +78,14 @@ def rate_limit(key_prefix, max_requests, period):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            key = generate_key(key_prefix)
-            current = int(time.time())
-            pipeline = redis.pipeline()
-            
-            # Record a new request timestamp
-            pipeline.zadd(key, {current: current})
-            # Remove timestamps outside the rate limit period
-            pipeline.zremrangebyscore(key, 0, current - period)
-            # Get the total number of requests within the period
-            pipeline.zcard(key)
-            # Set the expiration time for the key
-            pipeline.expire(key, period)
-            requests_in_window = pipeline.execute()[-2]
-            
-            if requests_in_window > max_requests:
-                return jsonify({"error": "Rate limit exceeded. Try again later."}), 429
-
-            return f(*args, **kwargs)
+            with tracer.span('rate_limit', key_prefix=key_prefix):
+                quota = check_rate_limit(generate_key(key_prefix), max_requests, period)
+
+            if not quota['allowed']:
+                response = make_response(jsonify({"error": "Rate limit exceeded. Try again later."}), 429)
+                return rate_limit_headers(response, quota)
+
+            return rate_limit_headers(make_response(f(*args, **kwargs)), quota)
         return wrapped
     return decorator
 
@@ -61,23 +111,13 @@ def limit_global_requests(max_requests, period):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            key = "global_rate_limit"
-            current = int(time.time())
-            pipeline = redis.pipeline()
-
-            # Record a new request timestamp
-            pipeline.zadd(key, {current: current})
-            # Remove timestamps outside the rate limit period
-            pipeline.zremrangebyscore(key, 0, current - period)
-            # Get the total number of requests within the period
-            pipeline.zcard(key)
-            # Set the expiration time for the key
-            pipeline.expire(key, period)
-            requests_in_window = pipeline.execute()[-2]
-
-            if requests_in_window > max_requests:
-                return jsonify({"error": "Global rate limit exceeded. Try again later."}), 429
-
-            return f(*args, **kwargs)
+            with tracer.span('global_rate_limit'):
+                quota = check_rate_limit("global_rate_limit", max_requests, period)
+
+            if not quota['allowed']:
+                response = make_response(jsonify({"error": "Global rate limit exceeded. Try again later."}), 429)
+                return rate_limit_headers(response, quota)
+
+            return rate_limit_headers(make_response(f(*args, **kwargs)), quota)
         return wrapped
     return decorator
@@ -1,16 +1,33 @@
 from flask import Flask, jsonify, request, abort, Blueprint
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from functools import wraps
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, verify_jwt_in_request
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import IntegrityError
 from .models import db, User  # Assuming models.py is in the same directory
 from .rate_limiting import limiter  # Assuming you have a rate_limiting module
 from .throttling import throttle  # Assuming you have a throttling module
+from src.monitoring.performance_monitor import instrument_flask
+from src.monitoring.tracing import tracer, traced, trace_flask, trace_sqlalchemy
+from src.monitoring.memory_diagnostics import diagnostics
+from src.monitoring.sampling_profiler import profiler
 
 api = Blueprint('api', __name__)
 
 # JWT setup
 jwt = JWTManager()
 
+def traced_jwt_required(view):
+    """
+    Require a valid JWT, like flask_jwt_extended.jwt_required(). Only the token check runs in
+    the 'jwt_verify' span, so its time is not mixed with the limiter, throttle and view below it.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        with tracer.span('jwt_verify'):
+            verify_jwt_in_request()
+        return view(*args, **kwargs)
+    return wrapped
+
 @api.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -49,9 +66,10 @@ def login():
     return jsonify(access_token=access_token), 200
 
 @api.route('/user', methods=['GET'])
-@jwt_required()
+@traced_jwt_required
 @limiter.limit("5 per minute")  # Rate limiting example
 @throttle(max_calls=10, period=60)  # Throttling example
+@traced('get_user')
 def get_user():
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -71,7 +89,8 @@ def health_check():
     return jsonify({"status": "healthy"}), 200
 
 @api.route('/update_profile', methods=['PUT'])
-@jwt_required()
+@traced_jwt_required
+@traced('update_profile')
 def update_profile():
     data = request.get_json()
     user_id = get_jwt_identity()
@@ -103,6 +122,13 @@ def create_app():
     # Register the Blueprint
     app.register_blueprint(api, url_prefix='/api')
 
+    # Time every route and serve the metrics at /metrics; trace requests and SQL when tracing is configured
+    instrument_flask(app)
+    trace_flask(app)
+    trace_sqlalchemy()
+    diagnostics.register_routes(app)
+    profiler.register_routes(app)
+
     @app.before_first_request
     def create_tables():
         db.create_all()
@@ -1,10 +1,15 @@
+import sys
 import time
 import functools
 from collections import defaultdict
 from flask import request, jsonify
 
+from src.monitoring.tracing import tracer
+from src.monitoring.memory_diagnostics import track
+
 # In-memory store for tracking requests (for simplicity, consider using Redis for production)
 request_log = defaultdict(list)
+track(sys.modules[__name__], 'request_log')
 
 def throttle(max_calls, period=60):
     """
@@ -16,19 +21,20 @@ def throttle(max_calls, period=60):
     def decorator(f):
         @functools.wraps(f)
         def wrapped(*args, **kwargs):
-            identifier = get_identifier()
-            now = time.time()
-            request_times = request_log[identifier]
+            with tracer.span('throttle'):
+                identifier = get_identifier()
+                now = time.time()
+                request_times = request_log[identifier]
 
-            # Filter out requests that are outside the current time window
-            request_times = [t for t in request_times if t > now - period]
-            request_log[identifier] = request_times
+                # Filter out requests that are outside the current time window
+                request_times = [t for t in request_times if t > now - period]
+                request_log[identifier] = request_times
 
-            if len(request_times) >= max_calls:
-                return jsonify({"error": "Too many requests, please try again later."}), 429
+                if len(request_times) >= max_calls:
+                    return jsonify({"error": "Too many requests, please try again later."}), 429
 
-            # Add the current request time to the log
-            request_log[identifier].append(now)
+                # Add the current request time to the log
+                request_log[identifier].append(now)
             return f(*args, **kwargs)
         return wrapped
     return decorator
@@ -57,17 +63,18 @@ def throttle_by_ip(max_calls, period=60):
     def decorator(f):
         @functools.wraps(f)
         def wrapped(*args, **kwargs):
-            identifier = request.remote_addr
-            now = time.time()
-            request_times = request_log[identifier]
+            with tracer.span('throttle_by_ip'):
+                identifier = request.remote_addr
+                now = time.time()
+                request_times = request_log[identifier]
 
-            request_times = [t for t in request_times if t > now - period]
-            request_log[identifier] = request_times
+                request_times = [t for t in request_times if t > now - period]
+                request_log[identifier] = request_times
 
-            if len(request_times) >= max_calls:
-                return jsonify({"error": "Too many requests from this IP, please try again later."}), 429
+                if len(request_times) >= max_calls:
+                    return jsonify({"error": "Too many requests from this IP, please try again later."}), 429
 
-            request_log[identifier].append(now)
+                request_log[identifier].append(now)
             return f(*args, **kwargs)
         return wrapped
     return decorator
@@ -82,17 +89,18 @@ def throttle_by_user(max_calls, period=60):
     def decorator(f):
         @functools.wraps(f)
         def wrapped(*args, **kwargs):
-            identifier = get_identifier()  # Modify this to get user ID or API key
-            now = time.time()
-            request_times = request_log[identifier]
+            with tracer.span('throttle_by_user'):
+                identifier = get_identifier()  # Modify this to get user ID or API key
+                now = time.time()
+                request_times = request_log[identifier]
 
-            request_times = [t for t in request_times if t > now - period]
-            request_log[identifier] = request_times
+                request_times = [t for t in request_times if t > now - period]
+                request_log[identifier] = request_times
 
-            if len(request_times) >= max_calls:
-                return jsonify({"error": "Too many requests, please try again later."}), 429
+                if len(request_times) >= max_calls:
+                    return jsonify({"error": "Too many requests, please try again later."}), 429
 
-            request_log[identifier].append(now)
+                request_log[identifier].append(now)
             return f(*args, **kwargs)
         return wrapped
     return decorator
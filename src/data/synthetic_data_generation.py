@@ -1,6 +1,228 @@
 
+import os
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+import pandas as pd
 
 def generate_synthetic_data(size=1000):
     data = np.random.normal(size=(size, 10))
     return data
+
+# Example benchmark schema: numeric distributions, categorical cardinalities, missing rates
+# and a class-conditional signal on a binary target
+DEFAULT_SCHEMA = {
+    'numeric': {
+        'amount': {'distribution': 'lognormal', 'mean': 3.0, 'sigma': 1.0, 'missing_rate': 0.01, 'signal': 0.3},
+        'duration': {'distribution': 'normal', 'loc': 60.0, 'scale': 15.0, 'missing_rate': 0.05, 'signal': 5.0},
+        'clicks': {'distribution': 'poisson', 'lam': 4.0, 'signal': 1.0},
+        'score': {'distribution': 'uniform', 'low': 0.0, 'high': 1.0},
+    },
+    'categorical': {
+        'country': {'cardinality': 50, 'zipf': 1.2, 'missing_rate': 0.02, 'signal': 0.1},
+        'user_id': {'cardinality': 1_000_000},
+    },
+    'target': {'name': 'target', 'type': 'classification', 'n_classes': 2, 'weights': [0.7, 0.3]},
+}
+
+def _sample_numeric(rng, spec, n_rows):
+    distribution = spec.get('distribution', 'normal')
+    if distribution == 'normal':
+        return rng.normal(spec.get('loc', 0.0), spec.get('scale', 1.0), n_rows)
+    if distribution == 'uniform':
+        return rng.uniform(spec.get('low', 0.0), spec.get('high', 1.0), n_rows)
+    if distribution == 'lognormal':
+        return rng.lognormal(spec.get('mean', 0.0), spec.get('sigma', 1.0), n_rows)
+    if distribution == 'poisson':
+        return rng.poisson(spec.get('lam', 1.0), n_rows).astype(np.float64)
+    if distribution == 'exponential':
+        return rng.exponential(spec.get('scale', 1.0), n_rows)
+    raise ValueError(f"Unknown distribution: {distribution}")
+
+def _category_probabilities(spec):
+    ranks = np.arange(1, spec['cardinality'] + 1, dtype=np.float64)
+    weights = ranks ** -spec.get('zipf', 0.0)
+    return weights / weights.sum()
+
+def generate_chunk(schema, chunk_index, n_rows, seed=42, categorical_codes=False):
+    """
+    Generate one chunk of rows from `schema`.
+
+    Each chunk draws from its own generator seeded with (seed, chunk_index), so the dataset is
+    identical however the chunks are distributed across workers. For classification targets,
+    numeric columns are shifted by `signal` per class and categorical codes are rotated by
+    `signal * cardinality` per class; for regression targets, the target is the signal-weighted
+    sum of the numeric columns plus noise. Missing values are injected at `missing_rate`.
+    Categorical columns are strings ("country_7"), or int32 codes (-1 for missing) when
+    `categorical_codes` is set.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    target = schema.get('target')
+    columns = {}
+
+    labels = None
+    if target and target.get('type', 'classification') == 'classification':
+        n_classes = target.get('n_classes', 2)
+        labels = rng.choice(n_classes, size=n_rows, p=target.get('weights'))
+
+    regression_target = np.zeros(n_rows)
+    for name, spec in schema.get('numeric', {}).items():
+        values = _sample_numeric(rng, spec, n_rows)
+        if labels is not None:
+            values = values + spec.get('signal', 0.0) * labels
+        else:
+            regression_target += spec.get('signal', 0.0) * values
+        if spec.get('missing_rate'):
+            values[rng.random(n_rows) < spec['missing_rate']] = np.nan
+        columns[name] = values
+
+    for name, spec in schema.get('categorical', {}).items():
+        cardinality = spec['cardinality']
+        if spec.get('zipf'):
+            codes = rng.choice(cardinality, size=n_rows, p=_category_probabilities(spec))
+        else:
+            codes = rng.integers(0, cardinality, n_rows)
+        if labels is not None and spec.get('signal'):
+            codes = (codes + labels * max(1, int(spec['signal'] * cardinality))) % cardinality
+        codes = codes.astype(np.int32)
+        missing = rng.random(n_rows) < spec['missing_rate'] if spec.get('missing_rate') else None
+        if categorical_codes:
+            if missing is not None:
+                codes[missing] = -1
+            columns[name] = codes
+        else:
+            values = (f"{name}_" + pd.Series(codes).astype(str)).to_numpy(dtype=object)
+            if missing is not None:
+                values[missing] = None
+            columns[name] = values
+
+    if target:
+        if labels is not None:
+            columns[target.get('name', 'target')] = labels.astype(np.int32)
+        else:
+            columns[target.get('name', 'target')] = regression_target + rng.normal(0.0, target.get('noise', 1.0), n_rows)
+
+    return pd.DataFrame(columns)
+
+def _arrow_schema(schema):
+    """
+    Arrow schema of the chunks generate_chunk produces for `schema`, so every Parquet row group
+    gets the same column types even when a chunk's column is all missing.
+    """
+    import pyarrow as pa
+
+    fields = [pa.field(name, pa.float64()) for name in schema.get('numeric', {})]
+    fields += [pa.field(name, pa.string()) for name in schema.get('categorical', {})]
+    target = schema.get('target')
+    if target:
+        classification = target.get('type', 'classification') == 'classification'
+        fields.append(pa.field(target.get('name', 'target'), pa.int32() if classification else pa.float64()))
+    return pa.schema(fields)
+
+def _chunk_rows(n_rows, chunk_rows, chunk_index):
+    return min(chunk_rows, n_rows - chunk_index * chunk_rows)
+
+def _csv_chunk(schema, chunk_index, n_rows, seed):
+    return generate_chunk(schema, chunk_index, n_rows, seed).to_csv(index=False, header=False).encode('utf-8')
+
+def _npy_chunk(schema, chunk_index, n_rows, seed, output_path, offset):
+    # Workers write straight into their slice of the pre-allocated memory-mapped file
+    df = generate_chunk(schema, chunk_index, n_rows, seed, categorical_codes=True)
+    array = np.load(output_path, mmap_mode='r+')
+    records = df.to_records(index=False).view(np.ndarray).astype(array.dtype)
+    array[offset:offset + n_rows] = records
+    array.flush()
+    return n_rows
+
+def stream_synthetic_data(schema, output_path, n_rows, chunk_rows=1_000_000, seed=42, n_workers=None):
+    """
+    Generate `n_rows` rows from `schema` across worker processes and stream them to
+    `output_path` (.csv, .parquet or .npy) without holding the dataset in memory.
+
+    Chunks are written in order, so the output is byte-for-byte reproducible for a given seed
+    and chunk size. CSV chunks are serialized by the workers; Parquet chunks become row groups;
+    .npy output is a pre-allocated structured array (categoricals as int32 codes) that workers
+    fill in place, with a `.schema.json` sidecar readable by src/utils/data_loader.load_npy.
+    Returns rows written per second.
+    """
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in ['.csv', '.parquet', '.npy']:
+        raise ValueError(f"Unknown output format: {extension}")
+
+    n_workers = n_workers or os.cpu_count()
+    n_chunks = (n_rows + chunk_rows - 1) // chunk_rows
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        if extension == '.npy':
+            template = generate_chunk(schema, 0, 1, seed, categorical_codes=True)
+            dtype = template.to_records(index=False).dtype
+            np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype.descr, shape=(n_rows,)).flush()
+            futures = [executor.submit(_npy_chunk, schema, i, _chunk_rows(n_rows, chunk_rows, i), seed, output_path, i * chunk_rows)
+                       for i in range(n_chunks)]
+            for future in futures:
+                future.result()
+            sidecar = {
+                'layout': 'structured',
+                'columns': list(template.columns),
+                'dtypes': {column: str(dtype) for column, dtype in template.dtypes.items()},
+            }
+            with open(os.path.splitext(output_path)[0] + '.schema.json', 'w') as f:
+                json.dump(sidecar, f, indent=4)
+        else:
+            pending = deque()
+
+            def write(result):
+                if extension == '.csv':
+                    writer.write(result)
+                else:
+                    writer.write_table(pa.Table.from_pandas(result, schema=arrow_schema, preserve_index=False))
+
+            if extension == '.parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                arrow_schema = _arrow_schema(schema)
+                writer = pq.ParquetWriter(output_path, arrow_schema)
+            else:
+                writer = open(output_path, 'wb')
+                header = generate_chunk(schema, 0, 0, seed).to_csv(index=False)
+                writer.write(header.encode('utf-8'))
+            task = _csv_chunk if extension == '.csv' else generate_chunk
+            try:
+                for i in range(n_chunks):
+                    pending.append(executor.submit(task, schema, i, _chunk_rows(n_rows, chunk_rows, i), seed))
+                    # Keep a bounded number of chunks in flight so memory stays flat
+                    if len(pending) >= 2 * n_workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+            finally:
+                writer.close()
+
+    elapsed = time.perf_counter() - started
+    rows_per_second = n_rows / elapsed if elapsed else float('inf')
+    print(f"Wrote {n_rows} rows to {output_path} in {elapsed:.1f}s ({rows_per_second:,.0f} rows/s)")
+    return rows_per_second
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a synthetic benchmark dataset to disk.")
+    parser.add_argument('--output', type=str, required=True, help="Output file (.csv, .parquet or .npy).")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of rows to generate.")
+    parser.add_argument('--schema', type=str, help="JSON schema file (default: DEFAULT_SCHEMA).")
+    parser.add_argument('--chunk_rows', type=int, default=1_000_000, help="Rows per chunk.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all CPUs).")
+
+    args = parser.parse_args()
+    schema = DEFAULT_SCHEMA
+    if args.schema:
+        with open(args.schema, 'r') as f:
+            schema = json.load(f)
+    stream_synthetic_data(schema, args.output, args.rows, chunk_rows=args.chunk_rows, seed=args.seed, n_workers=args.workers)
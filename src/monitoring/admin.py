@@ -0,0 +1,37 @@
+import os
+import hmac
+import functools
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def admin_only(view):
+    """
+    Restrict a Flask view to administrators. With QUANTICORE_ADMIN_TOKEN set, requests must send
+    it in the X-Admin-Token header; without it, only requests from the local host are allowed.
+    """
+    from flask import request, jsonify
+
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        token = os.environ.get('QUANTICORE_ADMIN_TOKEN')
+        if token:
+            allowed = hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+        else:
+            allowed = request.remote_addr in LOCAL_ADDRESSES
+        if not allowed:
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def query_number(name, default, kind=int):
+    """
+    Read a numeric query parameter of the current request, falling back to `default`.
+    """
+    from flask import request
+
+    try:
+        return kind(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
@@ -1,6 +1,327 @@
-
+import re
+import json
+import time
+import queue
+import atexit
+import hashlib
+import logging
 import smtplib
+import threading
+import urllib.request
+from email.message import EmailMessage
+
+_VOLATILE = re.compile(r'0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}|\d+(?:\.\d+)?')
+
+
+def fingerprint(message, source=''):
+    """
+    Identify alerts that are "the same": numbers, hex ids and timestamps are masked, so
+    'Disk usage is 91.2%' and 'Disk usage is 93.0%' share a fingerprint.
+    """
+    normalized = _VOLATILE.sub('#', message.strip())
+    return hashlib.sha1(f'{source}\0{normalized}'.encode('utf-8')).hexdigest()[:16]
+
+
+class Alert:
+    """
+    A group of identical alerts: the first message, how many times it fired and when.
+    """
+    __slots__ = ('message', 'source', 'severity', 'fingerprint', 'first_seen', 'last_seen', 'count')
+
+    def __init__(self, message, source='', severity='warning', fingerprint=None, timestamp=None):
+        self.message = message
+        self.source = source
+        self.severity = severity
+        self.fingerprint = fingerprint
+        self.first_seen = self.last_seen = timestamp or time.time()
+        self.count = 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+
+    def copy(self):
+        alert = Alert(self.message, self.source, self.severity, self.fingerprint, self.first_seen)
+        alert.last_seen = self.last_seen
+        alert.count = self.count
+        return alert
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self):
+        repeated = f" (x{self.count} between {time.strftime('%H:%M:%S', time.localtime(self.first_seen))} and " \
+                   f"{time.strftime('%H:%M:%S', time.localtime(self.last_seen))})" if self.count > 1 else ''
+        source = f"[{self.source}] " if self.source else ''
+        return f"{self.severity.upper()}: {source}{self.message}{repeated}"
+
+
+class AlertSink:
+    """
+    Base class for alert delivery channels. Each sink allows at most `max_batches` deliveries
+    per `per_seconds` (a token bucket); batches that arrive over the limit are held and merged
+    into the next delivery instead of being sent separately.
+    """
+    name = 'sink'
+
+    def __init__(self, max_batches=None, per_seconds=60.0):
+        self.max_batches = max_batches
+        self.per_seconds = per_seconds
+        self._tokens = float(max_batches) if max_batches else None
+        self._refilled = time.monotonic()
+
+    def allow(self):
+        if self.max_batches is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.max_batches, self._tokens + (now - self._refilled) * self.max_batches / self.per_seconds)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def send(self, alerts):
+        raise NotImplementedError
+
+
+class ConsoleSink(AlertSink):
+    name = 'console'
+
+    def send(self, alerts):
+        for alert in alerts:
+            print(f"ALERT: {alert}")
+
+
+class FileSink(AlertSink):
+    """
+    Append each alert as a JSON line.
+    """
+    name = 'file'
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def send(self, alerts):
+        with open(self.path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert.to_dict()) + '\n')
+
+
+class SMTPSink(AlertSink):
+    """
+    Send each batch as one email. For local testing, point it at a debugging SMTP server
+    (e.g. `python -m aiosmtpd -n -l localhost:1025`).
+    """
+    name = 'smtp'
+
+    def __init__(self, recipients, host='localhost', port=25, sender='quanticore-alerts@localhost',
+                 subject_prefix='[QUANTICORE]', username=None, password=None, use_tls=False, timeout=10, **kwargs):
+        super().__init__(**kwargs)
+        self.recipients = list(recipients)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.subject_prefix = subject_prefix
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, alerts):
+        message = EmailMessage()
+        total = sum(alert.count for alert in alerts)
+        message['Subject'] = f"{self.subject_prefix} {total} alert(s): {alerts[0].message[:80]}"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content('\n'.join(str(alert) for alert in alerts) + '\n')
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class WebhookSink(AlertSink):
+    """
+    POST each batch as JSON ({"alerts": [...]}) to a URL.
+    """
+    name = 'webhook'
+
+    def __init__(self, url, timeout=5, headers=None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+    def send(self, alerts):
+        body = json.dumps({'alerts': [alert.to_dict() for alert in alerts]}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class AlertDispatcher:
+    """
+    Deliver alerts from a background thread, batched and deduplicated.
+
+    submit() only puts the alert on a bounded queue, so a monitoring loop never waits on
+    delivery; when the queue is full the alert is counted as dropped. The worker groups alerts
+    by fingerprint: the first occurrence opens a group that collects repeats for
+    `group_window` seconds and is then delivered once with its count. After delivery, the same
+    fingerprint is suppressed for `dedup_window` seconds, and repeats within it are reported as
+    a single summary when the window ends. Every sink receives the ready groups as one batch,
+    within its own rate limit; a sink over its limit, or one that failed, keeps its batch and
+    merges it into the next delivery.
+    """
+    def __init__(self, sinks, group_window=10.0, dedup_window=300.0, max_queue=10000, max_pending=1000, tick=1.0):
+        self.sinks = list(sinks)
+        self.group_window = group_window
+        self.dedup_window = dedup_window
+        self.max_pending = max_pending
+        self.tick = tick
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.groups = {}
+        self.suppressed = {}
+        self.backlog = {sink: {} for sink in self.sinks}
+        self.stats = {'submitted': 0, 'dropped': 0, 'delivered': 0, 'suppressed': 0, 'failed': 0}
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, message, source='', severity='warning', fingerprint_key=None):
+        """
+        Queue an alert without blocking. Returns False if it was dropped because the queue is full.
+        """
+        alert = Alert(message, source, severity, fingerprint_key or fingerprint(message, source))
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['submitted'] += 1
+        return True
+
+    def _add(self, alert, now):
+        key = alert.fingerprint
+        if key in self.groups:
+            self.groups[key].merge(alert)
+        elif key in self.suppressed and now < self.suppressed[key][0]:
+            summary = self.suppressed[key][1]
+            if summary is None:
+                self.suppressed[key] = (self.suppressed[key][0], alert)
+            else:
+                summary.merge(alert)
+            self.stats['suppressed'] += 1
+        else:
+            self.groups[key] = alert
+
+    def _ready(self, now, flush_all=False):
+        ready = []
+        for key, alert in list(self.groups.items()):
+            if flush_all or now - alert.first_seen >= self.group_window:
+                ready.append(self.groups.pop(key))
+                self.suppressed[key] = (now + self.dedup_window, None)
+        for key, (until, summary) in list(self.suppressed.items()):
+            if flush_all or now >= until:
+                del self.suppressed[key]
+                if summary is not None:
+                    summary.message = f"{summary.message} (repeated while suppressed)"
+                    ready.append(summary)
+        return ready
+
+    def _deliver(self, ready, force=False):
+        for sink in self.sinks:
+            backlog = self.backlog[sink]
+            for alert in ready:
+                if alert.fingerprint in backlog:
+                    backlog[alert.fingerprint].merge(alert)
+                else:
+                    backlog[alert.fingerprint] = alert.copy()
+            while len(backlog) > self.max_pending:
+                backlog.pop(next(iter(backlog)))
+                self.stats['dropped'] += 1
+            if not backlog or not (force or sink.allow()):
+                continue
+            batch = list(backlog.values())
+            try:
+                sink.send(batch)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"Alert sink {sink.name} failed: {e}")
+                continue
+            backlog.clear()
+            self.stats['delivered'] += len(batch)
+
+    def _run(self):
+        while True:
+            stopping = self._stop.is_set()
+            deadline = time.monotonic() + self.tick
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    alert = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                self._add(alert, time.time())
+            self._deliver(self._ready(time.time(), flush_all=stopping), force=stopping)
+            if stopping and self.queue.empty():
+                return
+
+    def close(self, timeout=10.0):
+        """
+        Deliver everything queued or grouped now, ignoring windows and rate limits, and stop.
+        """
+        self._stop.set()
+        self.thread.join(timeout)
+
+
+def configure(file_path=None, smtp_host=None, smtp_port=25, recipients=None, webhook_url=None, console=True,
+              group_window=10.0, dedup_window=300.0, rate_limit=None):
+    """
+    Replace the process-wide dispatcher with one delivering to the given channels.
+    `rate_limit` is the maximum batches per minute for each external sink.
+    """
+    global _dispatcher
+    sinks = [ConsoleSink()] if console else []
+    if file_path:
+        sinks.append(FileSink(file_path, max_batches=rate_limit))
+    if smtp_host and recipients:
+        sinks.append(SMTPSink(recipients, host=smtp_host, port=smtp_port, max_batches=rate_limit))
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url, max_batches=rate_limit))
+    with _lock:
+        previous, _dispatcher = _dispatcher, AlertDispatcher(sinks, group_window, dedup_window)
+    if previous is not None:
+        previous.close()
+    return _dispatcher
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher([ConsoleSink()])
+        return _dispatcher
+
+
+def send_alert(message, source='', severity='warning'):
+    """
+    Queue an alert on the process-wide dispatcher (console only unless configure() was called).
+    """
+    return get_dispatcher().submit(message, source, severity)
+
+
+def _close():
+    if _dispatcher is not None:
+        _dispatcher.close()
+
 
-def send_alert(message):
-    # Implement the logic to send alerts via email or other channels
-    pass
+_dispatcher = None
+_lock = threading.Lock()
+atexit.register(_close)
@@ -0,0 +1,152 @@
+import os
+import glob
+import asyncio
+import fnmatch
+import logging
+from collections import deque
+from datetime import datetime
+
+from src.monitoring.log_tailer import LogTailer, OffsetStore, PollingWatcher, make_watcher
+from src.monitoring.pattern_matcher import PatternMatcher
+
+
+def _watch_root(target):
+    """
+    Return the deepest directory of a path or glob pattern that contains no wildcard.
+    """
+    parts = os.path.abspath(target).split(os.sep)
+    for depth, part in enumerate(parts):
+        if glob.has_magic(part):
+            return os.sep.join(parts[:depth]) or os.sep
+    return os.path.dirname(os.path.abspath(target))
+
+
+class AsyncLogMonitor:
+    """
+    Tail many log files and glob patterns from one asyncio event loop.
+
+    Files are discovered from `targets` at start-up, whenever inotify reports a file created
+    or moved into a watched directory, and on a periodic rescan. Changed files are queued and
+    served round-robin: each turn reads at most `read_budget` bytes from one file before moving
+    on, so a noisy log cannot starve the others. Lines are matched with a shared PatternMatcher
+    and matches fan into one bounded alert queue, drained by a separate task that runs the
+    (possibly blocking) alert callback in a worker thread.
+    """
+    def __init__(self, targets, patterns, alert_callback=None, poll_interval=1.0, rescan_interval=10.0,
+                 read_budget=256 * 1024, offset_file=None, use_inotify=True, from_end=False, queue_size=10000):
+        self.targets = [os.path.abspath(target) for target in targets]
+        self.matcher = PatternMatcher(patterns)
+        self.alert_callback = alert_callback
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.read_budget = read_budget
+        self.offsets = OffsetStore(offset_file) if offset_file else None
+        self.use_inotify = use_inotify
+        self.from_end = from_end
+        self.queue_size = queue_size
+        self.tailers = {}
+        self.ready = deque()
+        self.stats = {}
+        self._started = False
+
+    def _discover(self):
+        """
+        Start tailing every file matching a target that is not tailed yet.
+        """
+        for target in self.targets:
+            paths = glob.glob(target, recursive=True) if glob.has_magic(target) else [target]
+            for path in paths:
+                if path not in self.tailers and os.path.isfile(path):
+                    self._add(path)
+
+    def _add(self, path):
+        # Files present at start-up honour from_end; files that appear later are read in full
+        from_end = self.from_end and not self._started
+        self.tailers[path] = LogTailer(path, offsets=self.offsets, from_end=from_end)
+        self.stats[path] = {'bytes': 0, 'lines': 0, 'matches': 0}
+        self.watcher.add(os.path.dirname(path))
+        logging.info(f"Monitoring {path}")
+        self._mark(path)
+
+    def _mark(self, path):
+        if path not in self.ready:
+            self.ready.append(path)
+        self.wakeup.set()
+
+    def _on_events(self):
+        for path in self.watcher.drain():
+            if path in self.tailers:
+                self._mark(path)
+            elif any(fnmatch.fnmatch(path, target) for target in self.targets) and os.path.isfile(path):
+                self._add(path)
+
+    async def _read_loop(self):
+        while True:
+            if not self.ready:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            path = self.ready.popleft()
+            tailer = self.tailers[path]
+            position = tailer.position
+            lines = tailer.read_lines(max_bytes=self.read_budget)
+            stats = self.stats[path]
+            stats['bytes'] += max(tailer.position - position, 0)
+            stats['lines'] += len(lines)
+            for line, matched in self.matcher.match_lines(lines):
+                stats['matches'] += 1
+                await self.alerts.put((path, line, matched))
+            if tailer.has_more:
+                # Over budget: go to the back of the queue behind the other files
+                self.ready.append(path)
+            await asyncio.sleep(0)
+
+    async def _alert_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            path, line, matched = await self.alerts.get()
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            for pattern in matched:
+                message = f"[{timestamp}] {path}: Pattern '{pattern}' matched: {line.strip()}"
+                print(message)
+                if self.alert_callback:
+                    await loop.run_in_executor(None, self.alert_callback, message)
+
+    async def _timer_loop(self):
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            elapsed += self.poll_interval
+            if isinstance(self.watcher, PollingWatcher):
+                for path in self.tailers:
+                    self._mark(path)
+            if elapsed >= self.rescan_interval:
+                elapsed = 0.0
+                self._discover()
+            if self.offsets is not None:
+                self.offsets.save()
+
+    async def run(self):
+        """
+        Monitor until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.alerts = asyncio.Queue(maxsize=self.queue_size)
+        self.watcher = make_watcher([root for root in map(_watch_root, self.targets) if os.path.isdir(root)],
+                                    use_inotify=self.use_inotify)
+        if self.watcher.fd is not None:
+            loop.add_reader(self.watcher.fd, self._on_events)
+        self._discover()
+        self._started = True
+        tasks = [asyncio.create_task(coroutine) for coroutine in (self._read_loop(), self._alert_loop(), self._timer_loop())]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.watcher.fd is not None:
+                loop.remove_reader(self.watcher.fd)
+            self.watcher.close()
+            for tailer in self.tailers.values():
+                tailer.close()
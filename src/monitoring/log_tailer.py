@@ -0,0 +1,327 @@
+import os
+import json
+import mmap
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+# inotify event flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    Watch directories for file changes through inotify, called via ctypes so no extra
+    dependency is needed. Watching the directory rather than the file also reports the
+    creates and renames that happen during log rotation.
+    """
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for directory in directories:
+            self.add(directory)
+
+    def add(self, directory):
+        directory = os.path.abspath(directory)
+        if directory in self.watches.values():
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def fileno(self):
+        return self.fd
+
+    def drain(self):
+        """
+        Read all pending events and return the set of paths they refer to.
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+                if wd in self.watches:
+                    changed.add(os.path.join(self.watches[wd], os.fsdecode(name)))
+                offset += _EVENT_HEADER.size + length
+        return changed
+
+    def wait(self, timeout):
+        """
+        Block until an event arrives or `timeout` seconds pass. Returns the changed paths.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return self.drain() if readable else set()
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Fallback watcher for platforms without inotify: every wait simply times out, and callers
+    check their files on each wake-up.
+    """
+    fd = None
+
+    def __init__(self, directories=()):
+        pass
+
+    def add(self, directory):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return set()
+
+    def close(self):
+        pass
+
+
+def make_watcher(directories, use_inotify=True):
+    """
+    Return an InotifyWatcher for `directories`, or a PollingWatcher when inotify is unavailable.
+    """
+    if use_inotify:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            logging.info(f"inotify unavailable ({e}); falling back to polling")
+    return PollingWatcher(directories)
+
+
+class OffsetStore:
+    """
+    Persist read offsets per log file as JSON, so a restarted monitor resumes where it stopped.
+    Each entry records the file's inode; an offset is only reused for the same file.
+    """
+    def __init__(self, path, min_interval=1.0):
+        self.path = path
+        self.min_interval = min_interval
+        self.offsets = {}
+        self._last_save = 0.0
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.offsets = json.load(f)
+
+    def get(self, file_path):
+        return self.offsets.get(os.path.abspath(file_path))
+
+    def set(self, file_path, inode, offset):
+        self.offsets[os.path.abspath(file_path)] = {'inode': inode, 'offset': offset}
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.min_interval:
+            self.save()
+
+    def save(self):
+        """
+        Write the offsets atomically, if anything changed since the last save.
+        """
+        if not self.path or not self._dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.offsets, f)
+        os.replace(temp_path, self.path)
+        self._last_save = time.monotonic()
+        self._dirty = False
+
+
+class LogTailer:
+    """
+    Follow a log file through a persistent file descriptor, returning complete new lines.
+
+    Data is read in `block_size` blocks and split into lines in memory; a trailing partial line
+    is held back until its newline arrives. Each read checks the path's inode and size:
+    a new inode means the file was rotated, so the old descriptor is drained and the new file is
+    read from the start; a size below the current offset means it was truncated in place and is
+    re-read from the start. With an OffsetStore, the offset of the last complete line is
+    persisted and reused on restart when the inode still matches.
+    """
+    def __init__(self, path, offsets=None, block_size=1024 * 1024, from_end=False):
+        self.path = path
+        self.offsets = offsets
+        self.block_size = block_size
+        self.from_end = from_end
+        self.file = None
+        self.inode = None
+        self.position = 0
+        self.partial = b''
+        self.has_more = False
+
+    def _open(self, resume=True):
+        try:
+            self.file = open(self.path, 'rb', buffering=0)
+        except FileNotFoundError:
+            self.file = None
+            return False
+        stat = os.fstat(self.file.fileno())
+        self.inode = stat.st_ino
+        self.position = 0
+        saved = self.offsets.get(self.path) if (resume and self.offsets) else None
+        if saved and saved['inode'] == self.inode and saved['offset'] <= stat.st_size:
+            self.position = saved['offset']
+        elif resume and self.from_end:
+            self.position = stat.st_size
+        self.file.seek(self.position)
+        self.partial = b''
+        return True
+
+    def _read_available(self, max_bytes=None):
+        """
+        Read what is currently in the open file, in large blocks, and return its complete lines.
+        Stops after `max_bytes` when given, setting `has_more`.
+        """
+        lines = []
+        budget = max_bytes
+        self.has_more = False
+        while True:
+            if budget is not None and budget <= 0:
+                self.has_more = True
+                break
+            block = self.file.read(self.block_size if budget is None else min(self.block_size, budget))
+            if not block:
+                break
+            self.position += len(block)
+            if budget is not None:
+                budget -= len(block)
+            data = self.partial + block
+            parts = data.split(b'\n')
+            self.partial = parts.pop()
+            lines.extend(parts)
+        return lines
+
+    def read_lines(self, max_bytes=None):
+        """
+        Return the complete lines appended since the last call, following rotation and truncation.
+        With `max_bytes`, at most that much new data is read and `has_more` tells whether the
+        file has more waiting.
+        """
+        if self.file is None and not self._open():
+            return []
+
+        lines = []
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is not None and stat.st_ino != self.inode:
+            # Rotated: finish the old file, then start the new one from the beginning
+            lines.extend(self._read_available())
+            if self.partial:
+                lines.append(self.partial)
+            self.file.close()
+            logging.info(f"{self.path} was rotated; reopening")
+            self._open(resume=False)
+        elif stat is not None and stat.st_size < self.position:
+            logging.info(f"{self.path} was truncated; reading from the start")
+            self.file.seek(0)
+            self.position = 0
+            self.partial = b''
+
+        if self.file is not None:
+            lines.extend(self._read_available(max_bytes))
+            if self.offsets is not None:
+                self.offsets.set(self.path, self.inode, self.position - len(self.partial))
+        return [line.decode('utf-8', errors='replace').rstrip('\r') for line in lines]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.offsets is not None:
+            self.offsets.save()
+
+
+def reverse_lines(path):
+    """
+    Yield the lines of a file from last to first, memory-mapping it and searching backward for
+    each newline (memrchr), so the cost is proportional to the lines consumed, not the file
+    size, and lines of any length are returned whole. A trailing newline does not produce an
+    empty last line.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            end = size - 1 if mm[size - 1:size] == b'\n' else size
+            while end >= 0:
+                start = mm.rfind(b'\n', 0, end) + 1
+                yield mm[start:end].decode('utf-8', errors='replace').rstrip('\r')
+                end = start - 1
+
+
+def page_backward(path, page_size=100):
+    """
+    Page backward through a file's history: yield lists of up to `page_size` lines, newest page
+    first, each page in file order.
+    """
+    page = []
+    for line in reverse_lines(path):
+        page.append(line)
+        if len(page) == page_size:
+            yield page[::-1]
+            page = []
+    if page:
+        yield page[::-1]
+
+
+def follow(path, poll_interval=1.0, offset_file=None, block_size=1024 * 1024, use_inotify=True, from_end=False):
+    """
+    Yield batches of new lines from `path` as they are written, waking on inotify events
+    (or every `poll_interval` seconds without inotify).
+    """
+    offsets = OffsetStore(offset_file) if offset_file else None
+    tailer = LogTailer(path, offsets=offsets, block_size=block_size, from_end=from_end)
+    watcher = make_watcher([os.path.dirname(os.path.abspath(path))], use_inotify=use_inotify)
+    target = os.path.abspath(path)
+    try:
+        lines = tailer.read_lines()
+        while True:
+            if lines:
+                yield lines
+            # Wake on any event for the file (or its rotation), re-checking at least every poll_interval
+            while True:
+                changed = watcher.wait(poll_interval)
+                if not changed or target in changed or isinstance(watcher, PollingWatcher):
+                    break
+            lines = tailer.read_lines()
+    finally:
+        tailer.close()
+        watcher.close()
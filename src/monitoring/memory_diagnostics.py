@@ -0,0 +1,318 @@
+import os
+import gc
+import sys
+import time
+import signal
+import logging
+import tempfile
+import threading
+import tracemalloc
+import weakref
+import itertools
+from collections import Counter, OrderedDict, deque
+
+from src.monitoring.admin import admin_only, query_number
+
+
+def _resolve(obj, path):
+    """
+    Follow a dotted path of attribute names and dict keys, e.g. 'state.long_term_memory'.
+    """
+    for part in path.split('.'):
+        obj = obj[part] if isinstance(obj, dict) else getattr(obj, part)
+    return obj
+
+
+def summarize_container(container, max_depth=3, max_objects=20000):
+    """
+    Walk a container breadth-first (dict keys and values, sequence and set items) up to
+    `max_depth` levels and return its length, the number of objects reached, their shallow size
+    in bytes and the most common types. Shared objects are counted once. At most `max_objects`
+    objects are visited, so a huge store is inspected from a prefix of its items and reported
+    as truncated; its length is always exact.
+    """
+    seen = set()
+    types = Counter()
+    total_bytes = 0
+    queue = deque([(container, 0)])
+    truncated = False
+    while queue:
+        obj, depth = queue.popleft()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        types[type(obj).__name__] += 1
+        total_bytes += sys.getsizeof(obj)
+        if depth >= max_depth:
+            continue
+        budget = max_objects - len(seen) - len(queue)
+        if isinstance(obj, dict):
+            items = obj.items()
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            items = obj
+        else:
+            continue
+        if len(obj) > budget:
+            truncated = True
+        try:
+            # Copy a bounded prefix; a store mutated by another thread mid-copy is skipped
+            children = list(itertools.islice(items, max(budget, 0)))
+        except RuntimeError:
+            truncated = True
+            continue
+        for child in children:
+            if isinstance(obj, dict):
+                queue.append((child[0], depth + 1))
+                queue.append((child[1], depth + 1))
+            else:
+                queue.append((child, depth + 1))
+    return {
+        'len': len(container) if hasattr(container, '__len__') else None,
+        'objects': len(seen),
+        'bytes': total_bytes,
+        'truncated': truncated,
+        'types': dict(types.most_common(10)),
+    }
+
+
+class MemoryDiagnostics:
+    """
+    On-demand memory diagnostics built on tracemalloc.
+
+    Tracing is off until start() is called, because tracemalloc slows every allocation.
+    Labelled snapshots are kept (the oldest dropped beyond `max_snapshots`) so any two can be
+    diffed to find the allocation sites that grew. Independently of tracemalloc, objects
+    registered with track() are held weakly, and their in-memory stores (e.g. a model cache or
+    a request log) can be summarized by size and element type at any time.
+    """
+    def __init__(self, max_snapshots=8, report_dir=None):
+        self.max_snapshots = max_snapshots
+        self.report_dir = report_dir or os.environ.get('QUANTICORE_DIAGNOSTICS_DIR', tempfile.gettempdir())
+        self.snapshots = OrderedDict()
+        self.tracked = {}
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, nframes=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+            logging.info(f"tracemalloc started with {nframes} frames")
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logging.info("tracemalloc stopped")
+        self.snapshots.clear()
+
+    def take_snapshot(self, label=None):
+        """
+        Take and keep a tracemalloc snapshot, excluding tracemalloc's own and import-machinery
+        allocations. Returns its label.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; call start() first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        with self._lock:
+            label = label or time.strftime('%Y%m%d_%H%M%S')
+            self.snapshots.pop(label, None)
+            self.snapshots[label] = snapshot
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return label
+
+    def _snapshot(self, label):
+        if label is None:
+            if not self.snapshots:
+                return self.snapshots.get(self.take_snapshot())
+            return next(reversed(self.snapshots.values()))
+        if label not in self.snapshots:
+            raise KeyError(f"No snapshot labelled {label!r}")
+        return self.snapshots[label]
+
+    @staticmethod
+    def _site(statistic, key_type):
+        frames = statistic.traceback if key_type == 'traceback' else statistic.traceback[:1]
+        return [f'{frame.filename}:{frame.lineno}' for frame in frames]
+
+    def top(self, limit=20, key_type='lineno', label=None):
+        """
+        Return the top allocation sites of a snapshot (the latest by default), grouped by
+        'lineno', 'filename' or 'traceback'.
+        """
+        snapshot = self._snapshot(label)
+        statistics = snapshot.statistics(key_type)
+        return {
+            'total_bytes': sum(statistic.size for statistic in statistics),
+            'top': [{'site': self._site(statistic, key_type), 'bytes': statistic.size, 'count': statistic.count}
+                    for statistic in statistics[:limit]],
+        }
+
+    def diff(self, base, current=None, limit=20, key_type='lineno'):
+        """
+        Return the allocation sites that changed most between snapshot `base` and `current`
+        (a new snapshot if omitted).
+        """
+        old = self._snapshot(base)
+        new = self._snapshot(current) if current is not None else self._snapshot(self.take_snapshot())
+        statistics = new.compare_to(old, key_type)
+        return {
+            'size_diff': sum(statistic.size_diff for statistic in statistics),
+            'top': [{'site': self._site(statistic, key_type), 'size_diff': statistic.size_diff, 'bytes': statistic.size,
+                     'count_diff': statistic.count_diff}
+                    for statistic in statistics[:limit]],
+        }
+
+    def track(self, obj, *paths):
+        """
+        Register `obj` (held weakly) so the stores at `paths` are included in stores().
+        """
+        name = obj.__name__ if isinstance(obj, type(sys)) else type(obj).__name__
+        for path in paths:
+            self.tracked.setdefault(f'{name}.{path}', (path, weakref.WeakSet()))[1].add(obj)
+
+    def stores(self, max_depth=3):
+        """
+        Summarize every tracked store, summed over the live instances registered for it.
+        """
+        summary = {}
+        for name, (path, instances) in list(self.tracked.items()):
+            total = {'instances': 0, 'len': 0, 'objects': 0, 'bytes': 0, 'truncated': False, 'types': Counter()}
+            for obj in list(instances):
+                try:
+                    store = _resolve(obj, path)
+                except (AttributeError, KeyError, TypeError):
+                    continue
+                stats = summarize_container(store, max_depth)
+                total['instances'] += 1
+                total['len'] += stats['len'] or 0
+                total['objects'] += stats['objects']
+                total['bytes'] += stats['bytes']
+                total['truncated'] |= stats['truncated']
+                total['types'].update(stats['types'])
+            total['types'] = dict(total['types'].most_common(10))
+            summary[name] = total
+        return summary
+
+    @staticmethod
+    def type_counts(limit=20):
+        """
+        Return the most common types among all objects tracked by the garbage collector.
+        """
+        return dict(Counter(type(obj).__name__ for obj in gc.get_objects()).most_common(limit))
+
+    def report(self, limit=20):
+        """
+        Take a snapshot and return a text report: top sites, growth since the previous
+        snapshot (if any), tracked stores and object counts by type.
+        """
+        previous = next(reversed(self.snapshots)) if self.snapshots else None
+        label = self.take_snapshot()
+        lines = [f"Memory report {label} (pid {os.getpid()})", "", "Top allocation sites:"]
+        top = self.top(limit, label=label)
+        for entry in top['top']:
+            lines.append(f"  {entry['bytes'] / 1024:10.1f} KiB {entry['count']:8d} blocks  {entry['site'][0]}")
+        if previous is not None:
+            lines += ["", f"Growth since {previous}:"]
+            for entry in self.diff(previous, label, limit)['top']:
+                lines.append(f"  {entry['size_diff'] / 1024:+10.1f} KiB {entry['count_diff']:+8d} blocks  {entry['site'][0]}")
+        lines += ["", "Tracked stores:"]
+        for name, stats in self.stores().items():
+            lines.append(f"  {name}: {stats['instances']} instances, len {stats['len']}, "
+                         f"{stats['objects']} objects{' (sampled)' if stats['truncated'] else ''}, {stats['bytes'] / 1024:.1f} KiB, "
+                         f"types {stats['types']}")
+        lines += ["", "Objects by type:"]
+        for name, count in self.type_counts(limit).items():
+            lines.append(f"  {count:10d}  {name}")
+        return '\n'.join(lines) + '\n'
+
+    def install_signal_handler(self, signum=getattr(signal, 'SIGUSR2', None)):
+        """
+        Make `signum` (SIGUSR2 by default) a memory-diagnostics toggle: the first signal starts
+        tracemalloc and takes a baseline snapshot; each later one writes a report, including the
+        growth since the previous signal, to `report_dir`. The work runs on a separate thread so
+        the interrupted code is not held up.
+        """
+        if signum is None:
+            logging.warning("Signals are not supported on this platform; memory diagnostics signal handler not installed")
+            return
+
+        def work():
+            try:
+                if not self.tracing:
+                    self.start()
+                    label = self.take_snapshot('baseline')
+                    logging.info(f"Memory diagnostics started; baseline snapshot {label}")
+                    return
+                report = self.report()
+                path = os.path.join(self.report_dir, f"memory_report_{os.getpid()}_{time.strftime('%Y%m%d_%H%M%S')}.txt")
+                with open(path, 'w') as f:
+                    f.write(report)
+                logging.info(f"Memory report written to {path}")
+            except Exception as e:
+                logging.error(f"Memory diagnostics failed: {e}")
+
+        signal.signal(signum, lambda received, frame: threading.Thread(target=work, daemon=True).start())
+
+    def register_routes(self, app, prefix='/admin/memory'):
+        """
+        Add admin-only memory diagnostics routes to a Flask app:
+        POST {prefix}/start?nframes=, POST {prefix}/stop, POST {prefix}/snapshot?label=,
+        GET {prefix}/top?limit=&key_type=&label=, GET {prefix}/diff?base=&current=&limit=,
+        GET {prefix}/stores and GET {prefix}/types?limit=.
+        """
+        from flask import request, jsonify
+
+        def start():
+            self.start(query_number('nframes', 10))
+            return jsonify({'tracing': self.tracing, 'snapshot': self.take_snapshot(request.args.get('label', 'baseline'))})
+
+        def stop():
+            self.stop()
+            return jsonify({'tracing': self.tracing})
+
+        def snapshot():
+            try:
+                return jsonify({'snapshot': self.take_snapshot(request.args.get('label')), 'snapshots': list(self.snapshots)})
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 409
+
+        def top():
+            try:
+                return jsonify(self.top(query_number('limit', 20), request.args.get('key_type', 'lineno'), request.args.get('label')))
+            except (RuntimeError, KeyError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+
+        def diff():
+            base = request.args.get('base') or next(iter(self.snapshots), None)
+            if base is None:
+                return jsonify({'error': 'No base snapshot; POST to start or snapshot first'}), 400
+            try:
+                return jsonify(self.diff(base, request.args.get('current'), query_number('limit', 20),
+                                         request.args.get('key_type', 'lineno')))
+            except (RuntimeError, KeyError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+
+        def stores():
+            return jsonify(self.stores())
+
+        def types():
+            return jsonify(self.type_counts(query_number('limit', 20)))
+
+        for rule, view, methods in (('start', start, ['POST']), ('stop', stop, ['POST']), ('snapshot', snapshot, ['POST']),
+                                    ('top', top, ['GET']), ('diff', diff, ['GET']), ('stores', stores, ['GET']),
+                                    ('types', types, ['GET'])):
+            app.add_url_rule(f'{prefix}/{rule}', f'memory_{rule}', admin_only(view), methods=methods)
+        return app
+
+
+# Process-wide instance that services register their stores with
+diagnostics = MemoryDiagnostics()
+track = diagnostics.track
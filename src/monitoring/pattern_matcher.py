@@ -0,0 +1,275 @@
+import re
+import time
+from collections import deque
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def _parse(pattern):
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None, 0
+    state = getattr(parsed, 'state', None) or getattr(parsed, 'pattern', None)
+    return parsed, getattr(state, 'flags', 0)
+
+
+def literal_text(pattern):
+    """
+    Return the string a pattern matches if it is a plain literal (no regex operators), else None.
+    """
+    parsed, flags = _parse(pattern)
+    if parsed is None or flags & re.IGNORECASE or not len(parsed):
+        return None
+    if all(op == sre_parse.LITERAL for op, _ in parsed):
+        return ''.join(chr(value) for _, value in parsed)
+    return None
+
+
+def required_literal(pattern):
+    """
+    Return the longest literal substring every match of a regex must contain, or None.
+    Only top-level literal runs are considered, which is conservative but always safe.
+    """
+    parsed, flags = _parse(pattern)
+    if parsed is None or flags & re.IGNORECASE:
+        return None
+    best, run = '', []
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            run.append(chr(value))
+        else:
+            best = max(best, ''.join(run), key=len)
+            run = []
+    best = max(best, ''.join(run), key=len)
+    return best or None
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick automaton over a set of keywords: one pass over a text finds every
+    occurrence of every keyword, including overlapping ones.
+    """
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.terminal = set()
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(index)
+            self.terminal.add(state)
+
+        # Breadth-first, so every fail target is complete before its dependants
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text):
+        """
+        Return the set of keyword indices that occur in `text`.
+        """
+        found = set()
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def overlapping(self):
+        """
+        Return the indices of keywords that can overlap another keyword in a text: one contains
+        the other, or a proper suffix of one is a proper prefix of the other.
+        """
+        conflicts = set()
+        for i, first in enumerate(self.keywords):
+            for j, second in enumerate(self.keywords):
+                if i == j:
+                    continue
+                if first in second or any(first[-n:] == second[:n] for n in range(1, min(len(first), len(second)))):
+                    conflicts.update((i, j))
+        return conflicts
+
+    def scanner(self):
+        """
+        Compile the automaton's keyword trie into one factored regex that finds where any keyword
+        occurs. Branches share prefixes and stop at the first complete keyword, so the regex
+        engine scans at C speed and each match is exactly one keyword. Non-overlapping matching
+        can hide occurrences of the keywords returned by overlapping(), and only those.
+        """
+        if not self.keywords:
+            return None
+
+        def expression(state):
+            if state in self.terminal:
+                return ''
+            branches = [re.escape(char) + expression(child) for char, child in sorted(self.goto[state].items())]
+            return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+        return re.compile(expression(0))
+
+
+class PatternMatcher:
+    """
+    Match many patterns against log lines at once and report which patterns hit each line.
+
+    Patterns that are plain literals go into a single Aho–Corasick automaton. Regex patterns are
+    combined into one compiled alternation with a named group per pattern, and the longest
+    literal each regex requires is added to the automaton as a prefilter, so a regex is only
+    tried on lines containing its literal. Every line is first scanned by the regex compiled
+    from the automaton's trie, a single C-level call, and only the lines it flags are examined
+    further. Regexes with no required literal run on every line through the alternation;
+    regexes that cannot join it (backreferences, named groups, global inline flags) are
+    searched individually.
+    """
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))
+        keywords = {}
+        self.regexes = {}
+        self.unfiltered = []
+        standalone = []
+        for index, pattern in enumerate(self.patterns):
+            literal = literal_text(pattern)
+            if literal is not None:
+                keywords.setdefault(literal, []).append(('literal', index))
+                continue
+            compiled = re.compile(pattern)
+            self.regexes[index] = compiled
+            prefilter = required_literal(pattern)
+            if prefilter is not None:
+                keywords.setdefault(prefilter, []).append(('regex', index))
+            else:
+                self.unfiltered.append(index)
+            # Backreferences, named groups and global inline flags cannot be combined safely
+            if re.search(r'\\[1-9]|\(\?P[<=]|\(\?\(|\(\?[aiLmsux]+\)', pattern):
+                standalone.append(index)
+
+        self.automaton = AhoCorasick(keywords)
+        self.scan = self.automaton.scanner()
+        self.keyword_index = {keyword: index for index, keyword in enumerate(self.automaton.keywords)}
+        self.overlapping = sorted(self.automaton.overlapping())
+        # Per keyword: the literal patterns it completes and the regexes it lets through
+        self.keyword_literals = [[index for kind, index in targets if kind == 'literal'] for targets in keywords.values()]
+        self.keyword_regexes = [[index for kind, index in targets if kind == 'regex'] for targets in keywords.values()]
+        self.standalone = set(standalone)
+        combinable = [index for index in self.regexes if index not in self.standalone]
+        self.unfiltered_combinable = any(index not in self.standalone for index in self.unfiltered)
+        self.alternation = None
+        if combinable:
+            self.alternation = re.compile('|'.join(f'(?P<p{index}>{self.patterns[index]})' for index in combinable))
+
+    def _regex_hits(self, line, candidates, hits):
+        """
+        Add the regex pattern indices among `candidates` that match `line` to `hits`.
+        """
+        combined = [index for index in candidates if index not in self.standalone]
+        # A few prefiltered candidates are cheaper to test one by one; the alternation pays off
+        # for unfiltered regexes, which must be tried on every line, or many candidates at once
+        if combined and (len(combined) > 4 or self.unfiltered_combinable):
+            match = self.alternation.search(line)
+            if match is None:
+                combined = []
+            else:
+                hits.add(int(match.lastgroup[1:]))
+        # The alternation reports one pattern per match; confirm the other candidates individually
+        for index in combined + [index for index in candidates if index in self.standalone]:
+            if index not in hits and self.regexes[index].search(line):
+                hits.add(index)
+
+    def _keywords(self, line):
+        """
+        Return the indices of every keyword in a line the scan flagged.
+        """
+        keyword_index = self.keyword_index
+        keywords = {keyword_index[keyword] for keyword in self.scan.findall(line)}
+        if self.overlapping:
+            # Recover occurrences the scan may have consumed: a few substring tests, or one
+            # pass of the automaton when many keywords overlap
+            if len(self.overlapping) <= 16:
+                keywords.update(index for index in self.overlapping if self.automaton.keywords[index] in line)
+            else:
+                keywords |= self.automaton.search(line)
+        return keywords
+
+    def match(self, line):
+        """
+        Return the patterns that match `line`, in their original order.
+        """
+        results = self.match_lines([line])
+        return results[0][1] if results else []
+
+    def match_lines(self, lines):
+        """
+        Return (line, matched_patterns) for every line in `lines` that matches at least one pattern.
+        """
+        search = self.scan.search if self.scan is not None else None
+        # Without unfiltered regexes, only the lines the scan flags can match anything
+        if self.unfiltered:
+            candidates = lines
+        elif search is None:
+            candidates = []
+        else:
+            candidates = [line for line in lines if search(line)]
+
+        results = []
+        for line in candidates:
+            hits = set()
+            regex_candidates = set(self.unfiltered)
+            if search is not None and (not self.unfiltered or search(line)):
+                for keyword in self._keywords(line):
+                    hits.update(self.keyword_literals[keyword])
+                    regex_candidates.update(self.keyword_regexes[keyword])
+            if regex_candidates:
+                self._regex_hits(line, sorted(regex_candidates), hits)
+            if hits:
+                results.append((line, [self.patterns[index] for index in sorted(hits)]))
+        return results
+
+
+def benchmark(patterns, lines, repeat=3):
+    """
+    Time the original per-line, per-pattern re.search loop against PatternMatcher over `lines`.
+    Returns throughput in MB/s for each, plus the number of matching lines each found.
+    """
+    size = sum(len(line) + 1 for line in lines) / 1024 ** 2
+
+    def naive():
+        # The original monitor_logs loop: every pattern against every line
+        matched = 0
+        for line in lines:
+            hits = [pattern for pattern in patterns if re.search(pattern, line)]
+            matched += bool(hits)
+        return matched
+
+    matcher = PatternMatcher(patterns)
+    results = {}
+    for name, run in (('naive', naive), ('matcher', lambda: len(matcher.match_lines(lines)))):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matched = run()
+            best = min(best, time.perf_counter() - started)
+        results[name] = {'mb_per_s': size / best, 'matched_lines': matched}
+    return results
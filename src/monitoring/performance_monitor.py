@@ -1 +1,348 @@
-Performance Monitoring Placeholder
\ No newline at end of file
+import os
+import time
+import logging
+import threading
+import functools
+
+# Histogram bucket upper bounds in nanoseconds: powers of two from about 1 µs to about 69 s,
+# plus an overflow bucket. Power-of-two bounds let a duration's bucket be looked up from its
+# bit length instead of searched for.
+BUCKET_BOUNDS_NS = tuple(2 ** bits for bits in range(10, 37))
+_N_BUCKETS = len(BUCKET_BOUNDS_NS) + 1
+_BUCKET_BY_BITS = tuple(min(max(bits - 10, 0), _N_BUCKETS - 1) for bits in range(128))
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+class MetricsRegistry:
+    """
+    In-process latency histograms, counters and gauges for hot paths.
+
+    Writes never take a lock: each thread records into its own dictionaries, registered once
+    when the thread first records something, and snapshot() sums them. A histogram is one
+    flat list per thread, [bucket counts..., total ns], so recording a duration is a table
+    lookup on its bit length and two list increments. Stores of threads that have exited are
+    folded into a retired total on the next snapshot, so per-request threads do not accumulate.
+    Gauges hold one shared value each, since only the latest value matters.
+    """
+    def __init__(self, enabled=True, toggleable=True):
+        self.enabled = enabled
+        self.toggleable = toggleable
+        self.help = {}
+        self.gauges = {}
+        self.gauge_functions = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stores = []
+        self._retired = ({}, {})
+
+    def _store(self):
+        try:
+            return self._local.store
+        except AttributeError:
+            store = self._local.store = ({}, {})
+            self._local.histograms = store[0]
+            with self._lock:
+                self._stores.append((threading.current_thread(), store))
+            return store
+
+    def _histogram(self, key):
+        histograms = self._store()[0]
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0] * (_N_BUCKETS + 1)
+        return counts
+
+    def describe(self, name, help_text):
+        self.help.setdefault(name, help_text)
+
+    def record_ns(self, key, duration_ns):
+        """
+        Add one duration (in nanoseconds) to the histogram `key`, as built by _key().
+        """
+        counts = self._histogram(key)
+        counts[_BUCKET_BY_BITS[duration_ns.bit_length()]] += 1
+        counts[-1] += duration_ns
+
+    def observe(self, name, seconds, **labels):
+        if self.enabled:
+            self.record_ns(_key(name, labels), int(seconds * 1e9))
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        counters = self._store()[1]
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        if self.enabled:
+            self.gauges[_key(name, labels)] = value
+
+    def gauge_function(self, name, function, **labels):
+        """
+        Register a gauge whose value is read from `function()` at snapshot time.
+        """
+        self.gauge_functions[_key(name, labels)] = function
+
+    def timed(self, name, help_text='', **labels):
+        """
+        Decorator recording each call's latency in the histogram `name`. The recording path is
+        inlined, with everything it needs bound in the closure. While the registry is disabled
+        the wrapper only checks a flag before calling through; a registry created disabled
+        (QUANTICORE_METRICS=0) returns functions undecorated, at no cost at all.
+        """
+        key = _key(name, labels)
+        if help_text:
+            self.describe(name, help_text)
+        registry, local, clock, bucket_by_bits = self, self._local, time.perf_counter_ns, _BUCKET_BY_BITS
+
+        def decorator(func):
+            if not registry.enabled and not registry.toggleable:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not registry.enabled:
+                    return func(*args, **kwargs)
+                started = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    elapsed = clock() - started
+                    try:
+                        counts = local.histograms[key]
+                    except (AttributeError, KeyError):
+                        counts = registry._histogram(key)
+                    counts[bucket_by_bits[elapsed.bit_length()]] += 1
+                    counts[-1] += elapsed
+            return wrapper
+        return decorator
+
+    def timer(self, name, **labels):
+        """
+        Context manager recording the latency of its block in the histogram `name`.
+        """
+        return _Timer(self, _key(name, labels))
+
+    def _merge(self, target, source):
+        histograms, counters = target
+        for key, counts in list(source[0].items()):
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = list(counts)
+            else:
+                for index, value in enumerate(counts):
+                    merged[index] += value
+        for key, value in list(source[1].items()):
+            counters[key] = counters.get(key, 0) + value
+
+    def snapshot(self):
+        """
+        Return the aggregate of all threads: {'histograms': {(name, labels): {'count', 'sum',
+        'buckets'}}, 'counters': {(name, labels): value}, 'gauges': {(name, labels): value}},
+        with sums in seconds and buckets as cumulative (upper bound in seconds, count) pairs.
+        """
+        with self._lock:
+            live = []
+            for thread, store in self._stores:
+                if thread.is_alive():
+                    live.append((thread, store))
+                else:
+                    self._merge(self._retired, store)
+            self._stores = live
+            total = ({}, {})
+            self._merge(total, self._retired)
+            for _, store in live:
+                self._merge(total, store)
+
+        histograms = {}
+        for key, counts in total[0].items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(BUCKET_BOUNDS_NS + (float('inf'),), counts[:-1]):
+                cumulative += count
+                buckets.append((bound / 1e9, cumulative))
+            histograms[key] = {'count': cumulative, 'sum': counts[-1] / 1e9, 'buckets': buckets}
+        gauges = dict(self.gauges)
+        for key, function in self.gauge_functions.items():
+            try:
+                gauges[key] = function()
+            except Exception as e:
+                logging.warning(f"Gauge {key[0]} failed: {e}")
+        return {'histograms': histograms, 'counters': total[1], 'gauges': gauges}
+
+    def reset(self):
+        with self._lock:
+            for _, store in self._stores:
+                for counts in store[0].values():
+                    counts[:] = [0] * len(counts)
+                store[1].clear()
+            self._retired = ({}, {})
+        self.gauges.clear()
+
+    def prometheus_families(self):
+        """
+        Return the current snapshot as metric families for src.monitoring.prometheus.format_metrics.
+        """
+        snapshot = self.snapshot()
+        families = {}
+
+        def family(name, kind):
+            if name not in families:
+                families[name] = (name, kind, self.help.get(name, name.replace('_', ' ')), [])
+            return families[name][3]
+
+        for (name, labels), histogram in sorted(snapshot['histograms'].items()):
+            samples = family(name, 'histogram')
+            labels = dict(labels)
+            for bound, count in histogram['buckets']:
+                samples.append(('_bucket', {**labels, 'le': '+Inf' if bound == float('inf') else repr(bound)}, count))
+            samples.append(('_sum', labels, histogram['sum']))
+            samples.append(('_count', labels, histogram['count']))
+        for (name, labels), value in sorted(snapshot['counters'].items()):
+            family(name, 'counter').append((dict(labels), value))
+        for (name, labels), value in sorted(snapshot['gauges'].items(), key=lambda item: item[0]):
+            family(name, 'gauge').append((dict(labels), value))
+        return list(families.values())
+
+
+class _Timer:
+    __slots__ = ('registry', 'key', 'started')
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+        self.started = None
+
+    def __enter__(self):
+        if self.registry.enabled:
+            self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.started is not None:
+            self.registry.record_ns(self.key, time.perf_counter_ns() - self.started)
+            self.started = None
+        return False
+
+
+def quantile(histogram, q):
+    """
+    Estimate the q-quantile (0..1) of a snapshot histogram, interpolating within its bucket.
+    """
+    if not histogram['count']:
+        return None
+    rank = q * histogram['count']
+    lower_bound, lower_count = 0.0, 0
+    for bound, cumulative in histogram['buckets']:
+        if cumulative >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            fraction = (rank - lower_count) / max(cumulative - lower_count, 1)
+            return lower_bound + (bound - lower_bound) * fraction
+        lower_bound, lower_count = bound, cumulative
+    return lower_bound
+
+
+def summarize(snapshot):
+    """
+    Return one human-readable line per histogram and counter of a snapshot.
+    """
+    lines = []
+    for (name, labels), histogram in sorted(snapshot['histograms'].items()):
+        label_text = ','.join(f'{key}={value}' for key, value in labels)
+        p50, p99 = quantile(histogram, 0.5), quantile(histogram, 0.99)
+        mean = histogram['sum'] / histogram['count'] if histogram['count'] else 0.0
+        lines.append(f"{name}{{{label_text}}}: n={histogram['count']} mean={mean * 1e3:.3f}ms "
+                     f"p50={p50 * 1e3:.3f}ms p99={p99 * 1e3:.3f}ms")
+    for (name, labels), value in sorted(snapshot['counters'].items()):
+        label_text = ','.join(f'{key}={value}' for key, value in labels)
+        lines.append(f"{name}{{{label_text}}}: {value}")
+    return lines
+
+
+class Aggregator:
+    """
+    Background thread that takes a registry snapshot every `interval` seconds and passes it to
+    `callback` (by default, logging a summary line per metric).
+    """
+    def __init__(self, registry, interval=60.0, callback=None):
+        self.registry = registry
+        self.interval = interval
+        self.callback = callback or (lambda snapshot: [logging.info(line) for line in summarize(snapshot)])
+        self._stop = threading.Event()
+        self.thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.callback(self.registry.snapshot())
+            except Exception as e:
+                logging.error(f"Metrics aggregation failed: {e}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='metrics-aggregator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def instrument_flask(app, registry=None, metrics_path='/metrics'):
+    """
+    Time every request of a Flask app into 'http_request_duration_seconds', labelled by
+    endpoint, method and status, and serve the registry in Prometheus text format at
+    `metrics_path` (None to skip).
+    """
+    from flask import g, request, Response
+    from src.monitoring.prometheus import CONTENT_TYPE, format_metrics
+
+    registry = registry or metrics
+    registry.describe('http_request_duration_seconds', "Latency of Flask requests.")
+
+    @app.before_request
+    def _start_timer():
+        if registry.enabled:
+            g._metrics_started = time.perf_counter_ns()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            key = _key('http_request_duration_seconds', {
+                'endpoint': request.endpoint or 'unknown',
+                'method': request.method,
+                'status': str(response.status_code),
+            })
+            registry.record_ns(key, time.perf_counter_ns() - started)
+        return response
+
+    if metrics_path:
+        def _metrics():
+            return Response(format_metrics(registry.prometheus_families()), content_type=CONTENT_TYPE)
+        app.add_url_rule(metrics_path, 'metrics', _metrics)
+    return app
+
+
+# Process-wide default registry. QUANTICORE_METRICS=0 leaves hot paths undecorated;
+# QUANTICORE_METRICS=off starts disabled but keeps enable() available at runtime.
+_setting = os.environ.get('QUANTICORE_METRICS', '1')
+metrics = MetricsRegistry(enabled=_setting not in ('0', 'off'), toggleable=_setting != '0')
+timed = metrics.timed
+timer = metrics.timer
+observe = metrics.observe
+increment = metrics.increment
+set_gauge = metrics.set_gauge
+
+
+def enable():
+    metrics.enabled = True
+
+
+def disable():
+    metrics.enabled = False
@@ -0,0 +1,100 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if isinstance(value, float) and value != value:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_metrics(families):
+    """
+    Render metric families in the Prometheus text exposition format.
+
+    families: iterable of (name, type, help, samples), where samples is a list of
+    (labels dict, value) pairs, or (suffix, labels dict, value) triples for histogram
+    series such as '_bucket', '_sum' and '_count'.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {_escape(help_text)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample in samples:
+            suffix, labels, value = sample if len(sample) == 3 else ('', *sample)
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name}{suffix} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusExporter:
+    """
+    Minimal HTTP endpoint serving the latest rendered metrics at /metrics.
+
+    The exposition text is rendered by the sampler when it takes a sample and swapped in
+    whole, so a scrape only copies a string and never touches the processes being measured.
+    Extra collectors (callables returning families) are rendered at scrape time.
+    """
+    def __init__(self, port=9100, host='0.0.0.0'):
+        self.host = host
+        self.port = port
+        self.text = ''
+        self.collectors = []
+        self.server = None
+        self.thread = None
+
+    def update(self, families):
+        self.text = format_metrics(families)
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        text = self.text
+        for collector in self.collectors:
+            text += format_metrics(collector())
+        return text
+
+    def start(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='prometheus-exporter', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
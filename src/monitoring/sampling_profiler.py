@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+from src.monitoring.admin import admin_only, query_number
+
+# Leaf frames in these modules are threads blocked waiting (locks, sockets, queues, sleeping
+# servers); they are left out of profiles unless include_idle is set
+IDLE_MODULES = ('threading.py', 'selectors.py', 'socketserver.py', 'queue.py', 'socket.py', 'ssl.py')
+
+
+class SamplingProfiler:
+    """
+    In-process statistical profiler.
+
+    A background thread wakes `hz` times per second, reads every other thread's current frame
+    with sys._current_frames() and counts the stack as a tuple of code objects; a thread whose
+    innermost frame has not changed since the previous sample reuses its stack. Stacks are only
+    turned into text when results are requested, in the collapsed format flame graph tools
+    read ('thread;outer (file:line);inner (file:line) count'). The profiler's own CPU time is
+    measured with time.thread_time(), so its overhead can be checked against the wall time.
+    """
+    def __init__(self, hz=100, include_idle=False, max_depth=128):
+        self.hz = hz
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self.cpu_time = 0.0
+        self.thread = None
+        self._stop = threading.Event()
+        self._labels = {}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration=None, hz=None):
+        """
+        Start sampling, for `duration` seconds or until stop(). Clears previous results.
+        """
+        if self.running:
+            raise RuntimeError("The profiler is already running")
+        self.hz = hz or self.hz
+        self.stacks = Counter()
+        self.samples = 0
+        self.cpu_time = 0.0
+        self.elapsed = 0.0
+        self._stop.clear()
+        self.started = time.time()
+        self.thread = threading.Thread(target=self._run, args=(duration,), name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self, duration):
+        interval = 1.0 / self.hz
+        own = threading.get_ident()
+        include_idle = self.include_idle
+        max_depth = self.max_depth
+        stacks = self.stacks
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        deadline = started + duration if duration else None
+        next_tick = started
+        names = {}
+        last = {}
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if not self.samples % 100:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            seen = {}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                # A thread still in the same innermost frame has the same stack as last time,
+                # which is the common case for blocked threads
+                cached = last.get(ident)
+                if cached is not None and cached[0] is frame:
+                    key = cached[1]
+                else:
+                    key = None
+                    if include_idle or not frame.f_code.co_filename.endswith(IDLE_MODULES):
+                        codes = []
+                        caller = frame
+                        while caller is not None and len(codes) < max_depth:
+                            codes.append(caller.f_code)
+                            caller = caller.f_back
+                        key = (names.get(ident, str(ident)), tuple(codes))
+                seen[ident] = (frame, key)
+                if key is not None:
+                    stacks[key] += 1
+            last = seen
+            self.samples += 1
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # Fell behind (e.g. the GIL was busy): resume the schedule from now
+                next_tick = time.monotonic()
+        # Drop the frame references held by the cache
+        last = seen = None
+        self.elapsed = time.monotonic() - started
+        self.cpu_time = time.thread_time() - cpu_started
+        logging.info(f"Profiler took {self.samples} samples in {self.elapsed:.1f}s "
+                     f"({100 * self.overhead:.2f}% of a CPU)")
+
+    @property
+    def overhead(self):
+        """
+        The profiler thread's CPU time as a fraction of the wall time it ran.
+        """
+        return self.cpu_time / self.elapsed if self.elapsed else 0.0
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+        return label
+
+    def collapsed(self):
+        """
+        Return the samples in collapsed-stack format, one 'frames count' line per distinct stack,
+        root first.
+        """
+        lines = []
+        for (thread_name, codes), count in self.stacks.most_common():
+            frames = [thread_name.replace(';', ':')] + [self._label(code).replace(';', ':') for code in reversed(codes)]
+            lines.append(f"{';'.join(frames)} {count}")
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def top_functions(self, limit=20):
+        """
+        Return the functions most often at the top of the stack, as (label, samples) pairs.
+        """
+        leaves = Counter()
+        for (_, codes), count in self.stacks.items():
+            if codes:
+                leaves[self._label(codes[0])] += count
+        return leaves.most_common(limit)
+
+    def status(self):
+        return {
+            'running': self.running,
+            'hz': self.hz,
+            'started': self.started,
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+            'elapsed': self.elapsed,
+            'overhead': self.overhead,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+    def register_routes(self, app, prefix='/admin/profile', max_seconds=300, max_hz=1000):
+        """
+        Add admin-only profiler routes to a Flask app:
+        POST {prefix}/start?seconds=N&hz=H (add wait=1 to block and return the profile),
+        POST {prefix}/stop, GET {prefix}/status and GET {prefix}/collapsed (plain text, for
+        flamegraph.pl or speedscope). Runs are capped at `max_seconds`; a non-positive
+        duration or a rate outside 1..`max_hz` is rejected with 400.
+        """
+        from flask import request, jsonify, Response
+
+        def start():
+            seconds = query_number('seconds', 10, float)
+            hz = query_number('hz', self.hz, int)
+            if not seconds > 0:
+                return jsonify({'error': 'seconds must be positive'}), 400
+            if not 1 <= hz <= max_hz:
+                return jsonify({'error': f'hz must be between 1 and {max_hz}'}), 400
+            try:
+                self.start(duration=min(seconds, max_seconds), hz=hz)
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 409
+            if request.args.get('wait') in ('1', 'true'):
+                self.wait()
+                return collapsed()
+            return jsonify(self.status()), 202
+
+        def stop():
+            self.stop()
+            return jsonify(self.status())
+
+        def status():
+            return jsonify(self.status())
+
+        def collapsed():
+            return Response(self.collapsed(), content_type='text/plain; charset=utf-8')
+
+        for rule, view, methods in (('start', start, ['POST']), ('stop', stop, ['POST']),
+                                    ('status', status, ['GET']), ('collapsed', collapsed, ['GET'])):
+            app.add_url_rule(f'{prefix}/{rule}', f'profile_{rule}', admin_only(view), methods=methods)
+        return app
+
+
+# Process-wide profiler used by the admin routes
+profiler = SamplingProfiler()
@@ -0,0 +1,232 @@
+import time
+import fnmatch
+import psutil
+
+SYSTEM_METRICS = (
+    'cpu_percent',
+    'memory_percent',
+    'swap_percent',
+    'disk_percent',
+    'disk_read_bytes_per_s',
+    'disk_write_bytes_per_s',
+    'net_sent_bytes_per_s',
+    'net_recv_bytes_per_s',
+)
+
+
+class SystemSampler:
+    """
+    Take host-wide metric snapshots without blocking.
+
+    CPU usage is psutil's non-blocking cpu_percent(interval=None), which measures the time since
+    the previous call, and disk and network throughput are computed from the counter deltas
+    between two snapshots. A snapshot therefore costs a few system calls instead of a one-second
+    sleep, and every value in it covers the same interval.
+    """
+    def __init__(self, disk_path='/'):
+        self.disk_path = disk_path
+        psutil.cpu_percent(interval=None)
+        self._last_time = time.time()
+        self._last_disk = psutil.disk_io_counters()
+        self._last_net = psutil.net_io_counters()
+
+    @staticmethod
+    def _rate(current, previous, field, elapsed):
+        if current is None or previous is None or elapsed <= 0:
+            return 0.0
+        # Counters can wrap or reset (e.g. an interface going down); report 0 rather than a negative rate
+        return max(getattr(current, field) - getattr(previous, field), 0) / elapsed
+
+    def sample(self):
+        """
+        Return (timestamp, {metric: value}) for the interval since the previous sample.
+        """
+        now = time.time()
+        elapsed = now - self._last_time
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        snapshot = {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': psutil.virtual_memory().percent,
+            'swap_percent': psutil.swap_memory().percent,
+            'disk_percent': psutil.disk_usage(self.disk_path).percent,
+            'disk_read_bytes_per_s': self._rate(disk, self._last_disk, 'read_bytes', elapsed),
+            'disk_write_bytes_per_s': self._rate(disk, self._last_disk, 'write_bytes', elapsed),
+            'net_sent_bytes_per_s': self._rate(net, self._last_net, 'bytes_sent', elapsed),
+            'net_recv_bytes_per_s': self._rate(net, self._last_net, 'bytes_recv', elapsed),
+        }
+        self._last_time, self._last_disk, self._last_net = now, disk, net
+        return now, snapshot
+
+
+def _read_task_status(pid, tid):
+    """
+    Return (thread name, voluntary, involuntary context switches) for one thread from
+    /proc/<pid>/task/<tid>/status, or None where procfs is unavailable.
+    """
+    try:
+        with open(f'/proc/{pid}/task/{tid}/status', 'rb') as f:
+            status = f.read()
+    except OSError:
+        return None
+    fields = {}
+    for line in status.split(b'\n'):
+        key, _, value = line.partition(b':')
+        if key in (b'Name', b'voluntary_ctxt_switches', b'nonvoluntary_ctxt_switches'):
+            fields[key] = value.strip()
+    try:
+        return (fields[b'Name'].decode('utf-8', errors='replace'),
+                int(fields[b'voluntary_ctxt_switches']), int(fields[b'nonvoluntary_ctxt_switches']))
+    except (KeyError, ValueError):
+        return None
+
+
+class ProcessSampler:
+    """
+    Sample resource usage of selected processes and their threads.
+
+    Processes are selected by PID or by fnmatch-style patterns matched against the process name
+    and command line (e.g. '*deploy_model.py*', '*graphql*'). The process table is only scanned
+    every `rescan_interval` seconds; between scans the same psutil.Process handles are reused
+    and read inside oneshot(), so each sample costs a handful of /proc reads per process.
+    Fields a process does not allow us to read (AccessDenied) are left out rather than failing
+    the sample.
+    """
+    def __init__(self, pids=(), name_patterns=(), include_threads=True, rescan_interval=10.0):
+        self.pids = {int(pid) for pid in pids}
+        self.name_patterns = list(name_patterns)
+        self.include_threads = include_threads
+        self.rescan_interval = rescan_interval
+        self.processes = {}
+        self._last_scan = None
+        self._self = psutil.Process()
+        self._self_cpu = sum(self._self.cpu_times()[:2])
+        self._self_time = time.monotonic()
+        self.overhead = 0.0
+
+    def _matches(self, info):
+        candidates = [info.get('name') or '', ' '.join(info.get('cmdline') or [])]
+        return any(fnmatch.fnmatch(candidate, pattern) for pattern in self.name_patterns for candidate in candidates)
+
+    def _rescan(self):
+        found = {}
+        for pid in self.pids:
+            try:
+                found[pid] = self.processes.get(pid) or psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                continue
+        if self.name_patterns:
+            for proc in psutil.process_iter(['name', 'cmdline']):
+                if proc.pid == self._self.pid or proc.pid in found:
+                    continue
+                if self._matches(proc.info):
+                    # Keep the existing handle so psutil's create-time identity check still applies
+                    found[proc.pid] = self.processes.get(proc.pid) or proc
+        self.processes = found
+        self._last_scan = time.monotonic()
+
+    def _read(self, proc):
+        sample = {'pid': proc.pid}
+        with proc.oneshot():
+            sample['name'] = proc.name()
+            cpu = proc.cpu_times()
+            sample['cpu_user_seconds'] = cpu.user
+            sample['cpu_system_seconds'] = cpu.system
+            sample['rss_bytes'] = proc.memory_info().rss
+            sample['num_threads'] = proc.num_threads()
+            ctx = proc.num_ctx_switches()
+            sample['ctx_voluntary'] = ctx.voluntary
+            sample['ctx_involuntary'] = ctx.involuntary
+            for field, read in (('open_fds', proc.num_fds), ('io', proc.io_counters)):
+                try:
+                    sample[field] = read()
+                except (psutil.AccessDenied, AttributeError):
+                    pass
+            if 'io' in sample:
+                io = sample.pop('io')
+                sample['io_read_bytes'] = io.read_bytes
+                sample['io_write_bytes'] = io.write_bytes
+            if self.include_threads:
+                threads = []
+                for thread in proc.threads():
+                    entry = {'tid': thread.id, 'cpu_user_seconds': thread.user_time, 'cpu_system_seconds': thread.system_time}
+                    status = _read_task_status(proc.pid, thread.id)
+                    if status is not None:
+                        entry['name'], entry['ctx_voluntary'], entry['ctx_involuntary'] = status
+                    threads.append(entry)
+                sample['threads'] = threads
+        return sample
+
+    def sample(self):
+        """
+        Return a list of per-process samples (dicts), each with a 'threads' list when enabled.
+        """
+        if self._last_scan is None or time.monotonic() - self._last_scan >= self.rescan_interval:
+            self._rescan()
+        samples = []
+        for pid, proc in list(self.processes.items()):
+            try:
+                samples.append(self._read(proc))
+            except psutil.NoSuchProcess:
+                del self.processes[pid]
+            except psutil.AccessDenied:
+                continue
+
+        # The sampler's own CPU use as a fraction of wall time since the previous sample
+        now = time.monotonic()
+        cpu = sum(self._self.cpu_times()[:2])
+        if now > self._self_time:
+            self.overhead = (cpu - self._self_cpu) / (now - self._self_time)
+        self._self_cpu, self._self_time = cpu, now
+        return samples
+
+
+PROCESS_METRICS = (
+    ('cpu_user_seconds', 'quanticore_process_cpu_user_seconds_total', 'counter', "User CPU time of the process."),
+    ('cpu_system_seconds', 'quanticore_process_cpu_system_seconds_total', 'counter', "System CPU time of the process."),
+    ('rss_bytes', 'quanticore_process_resident_memory_bytes', 'gauge', "Resident set size of the process."),
+    ('num_threads', 'quanticore_process_threads', 'gauge', "Number of threads in the process."),
+    ('open_fds', 'quanticore_process_open_fds', 'gauge', "Open file descriptors of the process."),
+    ('ctx_voluntary', 'quanticore_process_voluntary_context_switches_total', 'counter', "Voluntary context switches of the process."),
+    ('ctx_involuntary', 'quanticore_process_involuntary_context_switches_total', 'counter', "Involuntary context switches of the process."),
+    ('io_read_bytes', 'quanticore_process_io_read_bytes_total', 'counter', "Bytes read from storage by the process."),
+    ('io_write_bytes', 'quanticore_process_io_write_bytes_total', 'counter', "Bytes written to storage by the process."),
+)
+
+THREAD_METRICS = (
+    ('cpu_user_seconds', 'quanticore_thread_cpu_user_seconds_total', 'counter', "User CPU time of the thread."),
+    ('cpu_system_seconds', 'quanticore_thread_cpu_system_seconds_total', 'counter', "System CPU time of the thread."),
+    ('ctx_voluntary', 'quanticore_thread_voluntary_context_switches_total', 'counter', "Voluntary context switches of the thread."),
+    ('ctx_involuntary', 'quanticore_thread_involuntary_context_switches_total', 'counter', "Involuntary context switches of the thread."),
+)
+
+
+def system_families(snapshot):
+    """
+    Return a SystemSampler snapshot as Prometheus gauge families.
+    """
+    return [(f'quanticore_system_{metric}', 'gauge', f"Host {metric.replace('_', ' ')}.", [({}, value)])
+            for metric, value in snapshot.items()]
+
+
+def process_families(samples, overhead=None):
+    """
+    Return ProcessSampler samples as Prometheus metric families, labelled by pid and name
+    (and tid and thread name for thread series).
+    """
+    families = []
+    for field, name, kind, help_text in PROCESS_METRICS:
+        series = [({'pid': sample['pid'], 'name': sample['name']}, sample[field]) for sample in samples if field in sample]
+        families.append((name, kind, help_text, series))
+    for field, name, kind, help_text in THREAD_METRICS:
+        series = []
+        for sample in samples:
+            for thread in sample.get('threads', ()):
+                if field in thread:
+                    labels = {'pid': sample['pid'], 'name': sample['name'], 'tid': thread['tid'], 'thread': thread.get('name', '')}
+                    series.append((labels, thread[field]))
+        families.append((name, kind, help_text, series))
+    if overhead is not None:
+        families.append(('quanticore_sampler_cpu_ratio', 'gauge',
+                         "CPU time spent by the sampler as a fraction of wall time.", [({}, overhead)]))
+    return families
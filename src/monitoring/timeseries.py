@@ -0,0 +1,248 @@
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+
+# (name, bucket width in seconds, number of rows kept)
+DEFAULT_TIERS = (
+    ('1s', 1, 3600),          # one hour at full resolution
+    ('1m', 60, 24 * 60),      # one day of minutes
+    ('1h', 3600, 90 * 24),    # ninety days of hours
+)
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of time-series rows in a binary .npy file, memory-mapped so writes go
+    straight to the page cache and the file never grows. Each row holds a timestamp and the
+    mean, min and max of every metric over the row's bucket. The write position is not stored:
+    on reopen it is recovered as the slot after the newest timestamp.
+    """
+    def __init__(self, path, metrics, capacity):
+        self.path = path
+        self.metrics = list(metrics)
+        self.capacity = capacity
+        fields = [('t', 'f8'), ('count', 'u4')]
+        for metric in self.metrics:
+            fields += [(metric, 'f4'), (f'{metric}_min', 'f4'), (f'{metric}_max', 'f4')]
+        self.dtype = np.dtype(fields)
+
+        if os.path.exists(path):
+            self.rows = open_memmap(path, mode='r+')
+            if self.rows.dtype != self.dtype or len(self.rows) != capacity:
+                raise ValueError(f"{path} has a different layout; remove it or use another store directory")
+        else:
+            self.rows = open_memmap(path, mode='w+', dtype=self.dtype, shape=(capacity,))
+        filled = self.rows['t'] > 0
+        self.count = int(filled.sum())
+        self.head = (int(np.argmax(self.rows['t'])) + 1) % capacity if self.count else 0
+
+    def append(self, t, count, means, minimums, maximums):
+        row = self.rows[self.head]
+        row['t'] = t
+        row['count'] = count
+        for metric in self.metrics:
+            row[metric] = means[metric]
+            row[f'{metric}_min'] = minimums[metric]
+            row[f'{metric}_max'] = maximums[metric]
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self, start=None, end=None):
+        """
+        Return the rows with start <= t <= end, oldest first, as a copy.
+        """
+        if self.count < self.capacity:
+            rows = self.rows[:self.count]
+        else:
+            rows = np.concatenate([self.rows[self.head:], self.rows[:self.head]])
+        mask = np.ones(len(rows), dtype=bool)
+        if start is not None:
+            mask &= rows['t'] >= start
+        if end is not None:
+            mask &= rows['t'] <= end
+        return np.array(rows[mask])
+
+    def oldest(self):
+        if not self.count:
+            return None
+        return float(self.rows['t'][self.head if self.count == self.capacity else 0])
+
+    def flush(self):
+        self.rows.flush()
+
+
+class _Bucket:
+    """
+    Running mean/min/max of each metric over one downsampling bucket.
+    """
+    def __init__(self, start, metrics):
+        self.start = start
+        self.count = 0
+        self.sums = dict.fromkeys(metrics, 0.0)
+        self.minimums = dict.fromkeys(metrics, np.inf)
+        self.maximums = dict.fromkeys(metrics, -np.inf)
+
+    def add(self, values):
+        self.count += 1
+        for metric, value in values.items():
+            self.sums[metric] += value
+            if value < self.minimums[metric]:
+                self.minimums[metric] = value
+            if value > self.maximums[metric]:
+                self.maximums[metric] = value
+
+    def means(self):
+        return {metric: total / self.count for metric, total in self.sums.items()}
+
+
+class TimeSeriesStore:
+    """
+    Multi-resolution metric history in a directory of ring buffers, one per tier.
+
+    Every sample is written to the finest tier and folded into a running bucket for each
+    coarser tier; when a sample falls into a new bucket, the finished bucket's mean, min and
+    max become one row of that tier. Storage is fixed at creation, so the store can run forever
+    without growing or rotating. Queries build the window from the finest tier that still holds
+    each part of it: recent samples from the finest tier, older stretches from the coarser ones,
+    cut at bucket boundaries so no sample is counted twice. A coarser tier's unfinished bucket
+    is included while it is still open in this process.
+    """
+    LAYOUT_FILE = 'layout.json'
+
+    def __init__(self, directory, metrics, tiers=DEFAULT_TIERS):
+        self.directory = directory
+        self.metrics = list(metrics)
+        self.tiers = list(tiers)
+        os.makedirs(directory, exist_ok=True)
+        layout_path = os.path.join(directory, self.LAYOUT_FILE)
+        layout = {'metrics': self.metrics, 'tiers': [list(tier) for tier in self.tiers]}
+        if os.path.exists(layout_path):
+            with open(layout_path, 'r') as f:
+                if json.load(f) != layout:
+                    raise ValueError(f"{directory} was created with different metrics or tiers")
+        else:
+            with open(layout_path, 'w') as f:
+                json.dump(layout, f)
+        self.buffers = {name: RingBuffer(os.path.join(directory, f'{name}.npy'), self.metrics, capacity)
+                        for name, _, capacity in self.tiers}
+        self.buckets = {}
+
+    def append(self, t, values):
+        """
+        Record one sample: a timestamp (epoch seconds) and a value for every metric.
+        """
+        values = {metric: float(values[metric]) for metric in self.metrics}
+        # The finest tier holds the raw samples, written as they arrive
+        self.buffers[self.tiers[0][0]].append(t, 1, values, values, values)
+        for name, width, _ in self.tiers[1:]:
+            start = t - t % width
+            bucket = self.buckets.get(name)
+            if bucket is not None and bucket.start != start:
+                self.buffers[name].append(bucket.start, bucket.count, bucket.means(), bucket.minimums, bucket.maximums)
+                bucket = None
+            if bucket is None:
+                bucket = self.buckets[name] = _Bucket(start, self.metrics)
+            bucket.add(values)
+
+    def _window(self, name, start=None, end=None):
+        """
+        Return one tier's rows with start <= t <= end, followed by its open bucket if it is in range.
+        """
+        rows = self.buffers[name].window(start, end)
+        bucket = self.buckets.get(name)
+        if bucket is None or (start is not None and bucket.start < start) or (end is not None and bucket.start > end):
+            return rows
+        row = np.zeros(1, dtype=rows.dtype)
+        row['t'] = bucket.start
+        row['count'] = bucket.count
+        for metric, mean in bucket.means().items():
+            row[metric] = mean
+            row[f'{metric}_min'] = bucket.minimums[metric]
+            row[f'{metric}_max'] = bucket.maximums[metric]
+        return np.concatenate([rows, row])
+
+    def _oldest(self, name):
+        oldest = self.buffers[name].oldest()
+        if oldest is None and name in self.buckets:
+            return self.buckets[name].start
+        return oldest
+
+    def _stitched(self, start=None, end=None):
+        """
+        Return the rows between `start` and `end`, oldest first, and the names of the tiers they
+        came from. Each coarser tier only supplies buckets that end before the finer tiers'
+        history begins. That point is rounded up to the coarser tier's bucket boundary when the
+        bucket ending there is written and inside the window, so the finer rows before it are
+        left to that bucket and the tiers meet without overlapping.
+        """
+        parts, used = [], []
+        last, cover = end, None
+        for i, (name, _, _) in enumerate(self.tiers):
+            oldest = self._oldest(name)
+            if oldest is None:
+                continue
+            lower = start
+            finished = i + 1 == len(self.tiers) or (start is not None and oldest <= start)
+            if not finished:
+                coarser, width, _ = self.tiers[i + 1]
+                boundary = float(np.ceil(oldest / width) * width)
+                cut = oldest
+                if (cover is None or boundary <= cover) and (start is None or boundary - width >= start) \
+                        and len(self._window(coarser, boundary - width, boundary - width)):
+                    cut = boundary
+                lower = cut if start is None else max(start, cut)
+            rows = self._window(name, lower, last)
+            if len(rows):
+                parts.append(rows)
+                used.append(name)
+            if finished:
+                break
+            cover = cut if cover is None else min(cover, cut)
+            last = cover - width if last is None else min(last, cover - width)
+        if not parts:
+            return self.buffers[self.tiers[0][0]].window(start, end), []
+        return np.concatenate(parts[::-1]), used[::-1]
+
+    def query(self, metric, start=None, end=None, resolution=None, stat='mean'):
+        """
+        Return (timestamps, values) for one metric between `start` and `end` (epoch seconds).
+        `stat` selects the bucket 'mean', 'min' or 'max'. Rows come from a single tier if
+        `resolution` names one, and are stitched from the finest tiers covering the window otherwise.
+        """
+        if metric not in self.metrics:
+            raise KeyError(f"Unknown metric: {metric}")
+        if resolution is None:
+            rows, _ = self._stitched(start, end)
+        else:
+            rows = self._window(resolution, start, end)
+        column = metric if stat == 'mean' else f'{metric}_{stat}'
+        return rows['t'], rows[column].astype(float)
+
+    def recent(self, metric, seconds, now, resolution=None, stat='mean'):
+        """
+        Return (timestamps, values) for the last `seconds` seconds before `now`.
+        """
+        return self.query(metric, start=now - seconds, end=now, resolution=resolution, stat=stat)
+
+    def summary(self, metric, seconds, now):
+        """
+        Return the count, mean, min and max of a metric over the last `seconds` seconds, and the
+        tiers the window was built from (coarsest first, e.g. '1m+1s').
+        """
+        rows, used = self._stitched(now - seconds, now)
+        resolution = '+'.join(used) or self.tiers[0][0]
+        if not len(rows):
+            return {'resolution': resolution, 'samples': 0, 'mean': None, 'min': None, 'max': None}
+        weights = rows['count'].astype(float)
+        return {
+            'resolution': resolution,
+            'samples': int(weights.sum()),
+            'mean': float(np.average(rows[metric], weights=weights)),
+            'min': float(rows[f'{metric}_min'].min()),
+            'max': float(rows[f'{metric}_max'].max()),
+        }
+
+    def flush(self):
+        for buffer in self.buffers.values():
+            buffer.flush()
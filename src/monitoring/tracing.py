@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+import functools
+import contextvars
+from collections import deque
+
+_current_span = contextvars.ContextVar('quanticore_current_span', default=None)
+
+
+def _new_id(bits=64):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+class _Trace:
+    """
+    The finished spans of one sampled trace, exported together when its local root ends.
+    """
+    __slots__ = ('spans',)
+
+    def __init__(self):
+        self.spans = []
+
+
+class Span:
+    """
+    One timed operation. Use it as a context manager: entering makes it the current span of
+    the running context (thread or task), so spans started inside become its children.
+    """
+    __slots__ = ('tracer', 'trace', 'trace_id', 'span_id', 'parent_id', 'name', 'tags',
+                 'start_us', '_start_ns', 'duration_us', '_token', 'is_root')
+    sampled = True
+
+    def __init__(self, tracer, trace, trace_id, parent_id, name, tags, is_root):
+        self.tracer = tracer
+        self.trace = trace
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.tags = tags
+        self.is_root = is_root
+        self.start_us = time.time_ns() // 1000
+        self._start_ns = time.perf_counter_ns()
+        self.duration_us = None
+        self._token = None
+
+    def set_tag(self, key, value):
+        self.tags[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.tags['error'] = f'{exc_type.__name__}: {exc}'
+        self.finish()
+        return False
+
+    def finish(self):
+        if self.duration_us is not None:
+            return
+        self.duration_us = max((time.perf_counter_ns() - self._start_ns) // 1000, 1)
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Finished from another context (e.g. a Flask teardown on a different task)
+                _current_span.set(None)
+            self._token = None
+        self.trace.spans.append(self)
+        if self.is_root:
+            self.tracer._export(self.trace.spans)
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def to_dict(self, service):
+        span = {
+            'traceId': self.trace_id,
+            'id': self.span_id,
+            'name': self.name,
+            'timestamp': self.start_us,
+            'duration': self.duration_us,
+            'localEndpoint': {'serviceName': service},
+            'tags': {key: str(value) for key, value in self.tags.items()},
+        }
+        if self.parent_id:
+            span['parentId'] = self.parent_id
+        return span
+
+
+class _UnsampledSpan:
+    """
+    Stand-in for spans of traces that were not sampled: it keeps the "not sampled" decision
+    in the context so nested spans stay no-ops, and records nothing.
+    """
+    __slots__ = ('_token', 'trace_id', 'span_id')
+    sampled = False
+
+    def __init__(self, trace_id=None, span_id=None):
+        self._token = None
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def set_tag(self, key, value):
+        pass
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+    def finish(self):
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                _current_span.set(None)
+            self._token = None
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-00' if self.trace_id else None
+
+
+class _NoopSpan:
+    __slots__ = ()
+    sampled = False
+
+    def set_tag(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def finish(self):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def parse_traceparent(header):
+    """
+    Parse a W3C traceparent header into (trace_id, parent_span_id, sampled), or None.
+    """
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class FileExporter:
+    """
+    Append finished traces to a file as JSON lines, one Zipkin v2 span per line. Writes happen
+    on a background thread so request threads never wait on disk.
+    """
+    def __init__(self, path, service='quanticore', max_pending=10000):
+        self.path = path
+        self.service = service
+        self.pending = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self.thread.start()
+
+    def export(self, spans):
+        self.pending.append(spans)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(1.0)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        lines = []
+        while self.pending:
+            spans = self.pending.popleft()
+            lines.extend(json.dumps(span.to_dict(self.service)) for span in spans)
+        if lines:
+            with open(self.path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+
+
+class InMemoryCollector:
+    """
+    Keep the most recent `max_traces` traces in memory, as lists of Zipkin v2 span dicts.
+    """
+    def __init__(self, max_traces=1000, service='quanticore'):
+        self.service = service
+        self.traces = deque(maxlen=max_traces)
+
+    def export(self, spans):
+        self.traces.append([span.to_dict(self.service) for span in spans])
+
+    def spans(self):
+        return [span for trace in list(self.traces) for span in trace]
+
+
+class Tracer:
+    """
+    Minimal span tracer with head sampling.
+
+    The sampling decision is made once per trace, when its root span starts (or taken from an
+    incoming traceparent header), and inherited by every nested span through a ContextVar,
+    so unsampled requests only pay for a context lookup per span. A sampled trace's spans are
+    buffered on the trace and handed to the exporter together when the local root span ends.
+    """
+    def __init__(self, exporter=None, sample_rate=0.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+
+    def configure(self, exporter, sample_rate=1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def span(self, name, parent=None, **tags):
+        """
+        Return a new span as a child of the current span, or of `parent`, a parsed
+        traceparent (trace_id, span_id, sampled). Without either, a new trace is started and
+        sampled with probability `sample_rate`.
+        """
+        if self.exporter is None:
+            return _NOOP
+        current = _current_span.get()
+        if parent is None and current is not None:
+            if not current.sampled:
+                return _UnsampledSpan(current.trace_id, current.span_id)
+            return Span(self, current.trace, current.trace_id, current.span_id, name, tags, False)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = _new_id(128), None, random.random() < self.sample_rate
+        if not sampled:
+            return _UnsampledSpan(trace_id, parent_id)
+        return Span(self, _Trace(), trace_id, parent_id, name, tags, True)
+
+    def traced(self, name=None, **tags):
+        """
+        Decorator running each call in a span, named after the function by default.
+        """
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.exporter is None:
+                    return func(*args, **kwargs)
+                with self.span(span_name, **tags):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _export(self, spans):
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logging.error(f"Trace export failed: {e}")
+
+
+def current_span():
+    return _current_span.get()
+
+
+def trace_flask(app, tracer=None):
+    """
+    Run every request of a Flask app in a root span named '<METHOD> <url rule>', continuing
+    the trace of an incoming W3C traceparent header, and return the trace id of sampled
+    requests in the X-Trace-Id response header.
+    """
+    from flask import g, request
+
+    tracer = tracer or _default_tracer
+
+    @app.before_request
+    def _start_span():
+        if not tracer.enabled:
+            return
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        span = tracer.span(f'{request.method} {rule}', parent=parse_traceparent(request.headers.get('traceparent')),
+                           **{'http.method': request.method, 'http.path': request.path})
+        g._trace_span = span.__enter__()
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get('_trace_span')
+        if span is not None and span.sampled:
+            span.set_tag('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = span.trace_id
+        return response
+
+    @app.teardown_request
+    def _finish_span(exc):
+        span = g.pop('_trace_span', None)
+        if span is not None:
+            if exc is not None:
+                span.set_tag('error', f'{type(exc).__name__}: {exc}')
+            span.finish()
+
+    return app
+
+
+def trace_sqlalchemy(tracer=None):
+    """
+    Record every SQLAlchemy statement as a 'sql' span, for all engines. Failed statements are
+    finished with an 'error' tag.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    tracer = tracer or _default_tracer
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if tracer.enabled:
+            span = tracer.span('sql', **{'db.statement': statement[:200]})
+            conn.info.setdefault('_trace_spans', []).append(span.__enter__())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('_trace_spans')
+        if spans:
+            spans.pop().finish()
+
+    @event.listens_for(Engine, 'handle_error')
+    def _error(context):
+        # A failed statement never reaches after_cursor_execute
+        spans = context.connection.info.get('_trace_spans') if context.connection is not None else None
+        if spans:
+            span = spans.pop()
+            exc = context.original_exception
+            span.set_tag('error', f'{type(exc).__name__}: {exc}')
+            span.finish()
+
+
+# Process-wide default tracer. Set QUANTICORE_TRACE_FILE (and optionally
+# QUANTICORE_TRACE_SAMPLE_RATE, default 0.01) to export sampled traces to a file.
+tracer = _default_tracer = Tracer()
+if os.environ.get('QUANTICORE_TRACE_FILE'):
+    tracer.configure(FileExporter(os.environ['QUANTICORE_TRACE_FILE']),
+                     float(os.environ.get('QUANTICORE_TRACE_SAMPLE_RATE', '0.01')))
+traced = tracer.traced
@@ -0,0 +1,200 @@
+import os
+import json
+import sqlite3
+import datetime
+
+from src.utils.backup_store import load_manifest
+
+
+def _to_epoch(value):
+    """
+    Convert a datetime, epoch number or ISO date string ('2024-05-01', '2024-05-01T12:00') to epoch seconds.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _parse_timestamp(timestamp):
+    """
+    Parse a backup_model.py timestamp ('%Y%m%d_%H%M%S', optionally with '_%f') to epoch seconds.
+    """
+    for fmt in ('%Y%m%d_%H%M%S_%f', '%Y%m%d_%H%M%S'):
+        try:
+            return datetime.datetime.strptime(str(timestamp), fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+class BackupCatalog:
+    """
+    SQLite index of the backups in a backup directory, stored as `catalog.sqlite` next to them.
+
+    Each backup is one row (model name, creation time, sizes, metadata as JSON) plus its chunk
+    references, so listing, filtering by model, date range or metadata field, keep-last-N
+    retention and chunk garbage collection are indexed queries instead of directory scans.
+    Every change runs in a single transaction. A missing catalog is rebuilt from the backup
+    directories on first use.
+    """
+    FILENAME = 'catalog.sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS backups (
+            name TEXT PRIMARY KEY,
+            model_name TEXT NOT NULL,
+            created REAL NOT NULL,
+            size INTEGER,
+            stored_size INTEGER,
+            metadata TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS backups_model_created ON backups (model_name, created);
+        CREATE INDEX IF NOT EXISTS backups_created ON backups (created);
+        CREATE TABLE IF NOT EXISTS chunk_refs (
+            backup TEXT NOT NULL REFERENCES backups (name) ON DELETE CASCADE,
+            hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS chunk_refs_backup ON chunk_refs (backup);
+        CREATE INDEX IF NOT EXISTS chunk_refs_hash ON chunk_refs (hash);
+    """
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.path = os.path.join(backup_dir, self.FILENAME)
+        os.makedirs(backup_dir, exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+        if is_new:
+            self.rebuild()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, name, model_name, created, size=None, stored_size=None, metadata=None, chunks=()):
+        """
+        Record a backup and its chunk references in one transaction.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM backups WHERE name = ?", (name,))
+            self.conn.execute(
+                "INSERT INTO backups (name, model_name, created, size, stored_size, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, model_name, _to_epoch(created), size, stored_size, json.dumps(metadata or {}, default=str)),
+            )
+            self.conn.executemany("INSERT INTO chunk_refs (backup, hash) VALUES (?, ?)",
+                                  ((name, chunk['hash']) for chunk in chunks))
+
+    def remove(self, names):
+        """
+        Remove backups and their chunk references in one transaction.
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM backups WHERE name = ?", ((name,) for name in names))
+
+    def find(self, model_name=None, since=None, until=None, metadata=None, limit=None):
+        """
+        Return backups as dicts, newest first, filtered by model name, creation time range
+        (datetimes, epoch seconds or ISO strings) and exact metadata field values.
+        """
+        clauses, params = [], []
+        if model_name is not None:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        if since is not None:
+            clauses.append("created >= ?")
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append("created <= ?")
+            params.append(_to_epoch(until))
+        for field, value in (metadata or {}).items():
+            clauses.append("json_extract(metadata, ?) = ?")
+            params.extend([f'$."{field}"', value])
+
+        query = "SELECT * FROM backups"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [self._row(row) for row in self.conn.execute(query, params)]
+
+    def latest(self, model_name):
+        """
+        Return the newest backup of a model, or None.
+        """
+        backups = self.find(model_name=model_name, limit=1)
+        return backups[0] if backups else None
+
+    def expired(self, keep_last_n, model_name=None):
+        """
+        Return the names of backups outside the newest `keep_last_n` of their model.
+        """
+        query = """
+            SELECT name FROM (
+                SELECT name, model_name, ROW_NUMBER() OVER (PARTITION BY model_name ORDER BY created DESC) AS rank
+                FROM backups
+            ) WHERE rank > ?
+        """
+        params = [keep_last_n]
+        if model_name is not None:
+            query += " AND model_name = ?"
+            params.append(model_name)
+        return [row['name'] for row in self.conn.execute(query, params)]
+
+    def referenced_chunks(self):
+        """
+        Return the set of chunk hashes referenced by any cataloged backup.
+        """
+        return {row['hash'] for row in self.conn.execute("SELECT DISTINCT hash FROM chunk_refs")}
+
+    def rebuild(self):
+        """
+        Re-index every backup directory under `backup_dir` from its manifest and metadata.
+        """
+        entries = []
+        for name in os.listdir(self.backup_dir):
+            backup_path = os.path.join(self.backup_dir, name)
+            if not os.path.isdir(backup_path) or name == 'chunks':
+                continue
+            metadata_files = [f for f in os.listdir(backup_path) if f.endswith('_metadata.json') or f == 'metadata.json']
+            metadata = {}
+            if metadata_files:
+                with open(os.path.join(backup_path, metadata_files[0]), 'r') as f:
+                    metadata = json.load(f)
+            manifest = load_manifest(backup_path)
+            if manifest is not None:
+                entries.append((name, manifest['model_name'], manifest.get('size'), manifest.get('stored_size'), metadata, manifest['chunks']))
+            elif metadata_files:
+                model_name = metadata.get('model_name') or metadata_files[0][:-len('_metadata.json')] or name
+                entries.append((name, model_name, None, None, metadata, []))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM backups")
+            for name, model_name, size, stored_size, metadata, chunks in entries:
+                created = _parse_timestamp(metadata.get('backup_timestamp')) or os.path.getmtime(os.path.join(self.backup_dir, name))
+                self.conn.execute(
+                    "INSERT INTO backups (name, model_name, created, size, stored_size, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, model_name, created, size, stored_size, json.dumps(metadata, default=str)),
+                )
+                self.conn.executemany("INSERT INTO chunk_refs (backup, hash) VALUES (?, ?)",
+                                      ((name, chunk['hash']) for chunk in chunks))
+        return len(entries)
+
+    def _row(self, row):
+        backup = dict(row)
+        backup['metadata'] = json.loads(backup['metadata'])
+        backup['path'] = os.path.join(self.backup_dir, backup['name'])
+        backup['created_at'] = datetime.datetime.fromtimestamp(backup['created']).isoformat(timespec='seconds')
+        return backup
@@ -0,0 +1,390 @@
+import io
+import os
+import json
+import zlib
+import pickle
+import hashlib
+import threading
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# File suffix of a stored chunk per compression codec
+CODEC_SUFFIXES = {'none': '', 'zstd': '.zst', 'zlib': '.zz'}
+_DECOMPRESSION_ERRORS = (zlib.error, zstandard.ZstdError) if HAS_ZSTD else (zlib.error,)
+
+# Gear table for the rolling hash, derived from a fixed hash so chunk boundaries are stable
+# across processes, machines and library versions
+_GEAR = np.array([int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), 'little') for i in range(256)],
+                 dtype=np.uint32)
+
+
+def _rotl(x, shift):
+    return (x << shift) | (x >> ((32 - shift) & 31))
+
+
+# _GEAR rotated left by every phase 0-31, so a rotation by position becomes a single lookup
+_ROTATED_GEAR = _rotl(_GEAR[None, :], np.arange(32, dtype=np.uint32)[:, None])
+
+
+class ContentDefinedChunker:
+    """
+    Split a byte stream at content-defined boundaries.
+
+    A boundary is placed after byte i when a 32-bit buzhash of the preceding `window` bytes has
+    its low log2(avg_size) bits clear, subject to `min_size` and `max_size`. Because boundaries
+    depend only on nearby content, an insertion or change early in a serialized model shifts
+    only the chunks around it, and the rest dedupe against earlier backups. The hash is
+    computed for a whole buffer at once with a prefix XOR instead of a per-byte loop.
+    """
+    def __init__(self, avg_size=1024 * 1024, min_size=None, max_size=None, window=48):
+        self.mask = np.uint32((1 << int(np.log2(avg_size))) - 1)
+        self.min_size = min_size or avg_size // 4
+        self.max_size = max_size or avg_size * 4
+        self.window = window
+
+    def candidates(self, data):
+        """
+        Return every offset in `data` where the rolling hash allows a cut.
+        """
+        values = np.frombuffer(data, dtype=np.uint8)
+        n = len(values)
+        if n <= self.window:
+            return np.empty(0, dtype=np.int64)
+        # Lay the bytes out in rows of 32 so each column has a fixed rotation phase
+        padded = np.zeros(-(-n // 32) * 32, dtype=np.uint8)
+        padded[:n] = values
+        phases = np.arange(32)
+        prefix = np.bitwise_xor.accumulate(_ROTATED_GEAR[phases, padded.reshape(-1, 32)].ravel())[:n]
+        prefix[self.window:] ^= prefix[:-self.window].copy()
+        # The window hash is the prefix XOR rotated back by the position; instead of rotating
+        # every hash, test it against the mask rotated forward by the same phase
+        masks = _rotl(np.full(32, self.mask, dtype=np.uint32), phases.astype(np.uint32))
+        padded_prefix = np.zeros(len(padded), dtype=np.uint32)
+        padded_prefix[:n] = prefix
+        hits = ((padded_prefix.reshape(-1, 32) & masks) == 0).ravel()[:n]
+        positions = np.flatnonzero(hits) + 1
+        return positions[positions >= self.window]
+
+    def cut_points(self, data, final=False):
+        """
+        Return the chunk end offsets in `data`. Unless `final`, a trailing partial chunk is left
+        for the caller to carry over into the next buffer.
+        """
+        candidates = self.candidates(data)
+        cuts = []
+        start = 0
+        while True:
+            low, high = start + self.min_size, start + self.max_size
+            index = np.searchsorted(candidates, low)
+            if index < len(candidates) and candidates[index] <= high:
+                cut = int(candidates[index])
+            elif high <= len(data):
+                cut = high
+            else:
+                break
+            cuts.append(cut)
+            start = cut
+        if final and start < len(data):
+            cuts.append(len(data))
+        return cuts
+
+
+class ChunkIntegrityError(ValueError):
+    """
+    Raised when a stored chunk is missing, fails to decompress or does not match its checksum.
+    """
+
+
+def _compress(data, codec, level):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    if codec == 'zlib':
+        return zlib.compress(data, level or 6)
+    return bytes(data)
+
+
+def _decompress(data, codec, size):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+
+class _ChunkingWriter:
+    """
+    File-like sink for pickle.dump that cuts the stream into chunks as it goes. Chunks are
+    hashed, compressed and written on a thread pool, with a bounded number in flight.
+    """
+    def __init__(self, store, executor, max_pending):
+        self.store = store
+        self.executor = executor
+        self.max_pending = max_pending
+        self.buffer = bytearray()
+        self.pending = deque()
+        self.chunks = []
+
+    def write(self, data):
+        # Protocol 5 hands over large array buffers as PickleBuffer objects
+        with memoryview(data) as view:
+            self.buffer += view
+            size = view.nbytes
+        if len(self.buffer) >= 2 * self.store.chunker.max_size:
+            self.flush(final=False)
+        return size
+
+    def flush(self, final=True):
+        view = memoryview(self.buffer)
+        start = 0
+        for cut in self.store.chunker.cut_points(view, final=final):
+            self.pending.append(self.executor.submit(self.store.put, bytes(view[start:cut])))
+            start = cut
+            while len(self.pending) > self.max_pending:
+                self.chunks.append(self.pending.popleft().result())
+        view.release()
+        del self.buffer[:start]
+        if final:
+            while self.pending:
+                self.chunks.append(self.pending.popleft().result())
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    Raw stream over the chunks of a manifest. Upcoming chunks are read, decompressed and
+    verified on a thread pool while earlier ones are consumed.
+    """
+    def __init__(self, store, chunks, executor, lookahead):
+        self.store = store
+        self.executor = executor
+        self.lookahead = lookahead
+        self.remaining = iter(chunks)
+        self.futures = deque()
+        self.current = memoryview(b'')
+        self._prefetch()
+
+    def _prefetch(self):
+        while len(self.futures) < self.lookahead:
+            entry = next(self.remaining, None)
+            if entry is None:
+                break
+            self.futures.append(self.executor.submit(self.store.get, entry))
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not len(self.current):
+            if not self.futures:
+                return 0
+            self.current = memoryview(self.futures.popleft().result())
+            self._prefetch()
+        n = min(len(buffer), len(self.current))
+        buffer[:n] = self.current[:n]
+        self.current = self.current[n:]
+        return n
+
+
+class ChunkStore:
+    """
+    Content-addressed store of deduplicated, compressed chunks, shared by every backup in a
+    directory.
+
+    Objects are pickled straight into a ContentDefinedChunker and each chunk is written once,
+    keyed by the SHA-256 of its uncompressed bytes, to `root/<hash[:2]>/<hash><suffix>`, where
+    the suffix names the codec (zstd when the zstandard package is installed, zlib otherwise).
+    A backup is just the resulting chunk list, so backing up a model whose pickle is largely
+    unchanged only writes the changed chunks. Chunks are compressed and written, or read,
+    decompressed and checked against their hash, on `n_threads` threads; a chunk that fails
+    its check raises ChunkIntegrityError as soon as it is reached.
+    `bytes_written` and `bytes_reused` count new and deduplicated bytes since construction.
+
+    Writers and the garbage collector coordinate through lock(): a backup holds it shared from
+    its first chunk until it is in the catalog, and garbage collection holds it exclusively,
+    so chunks written or reused by an unfinished backup are never collected.
+    """
+    def __init__(self, root, avg_chunk_size=1024 * 1024, codec=None, level=None, n_threads=None):
+        self.root = root
+        self.chunker = ContentDefinedChunker(avg_chunk_size)
+        self.codec = codec or ('zstd' if HAS_ZSTD else 'zlib')
+        if self.codec not in CODEC_SUFFIXES:
+            raise ValueError(f"Unknown codec: {self.codec}")
+        if self.codec == 'zstd' and not HAS_ZSTD:
+            raise ImportError("The zstandard package is required for zstd compression.")
+        self.level = level
+        self.n_threads = n_threads or min(8, os.cpu_count() or 1)
+        self.bytes_written = 0
+        self.bytes_reused = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest, codec):
+        return os.path.join(self.root, digest[:2], digest + CODEC_SUFFIXES[codec])
+
+    def _find(self, digest):
+        """
+        Return the codec of the stored copy of a chunk, or None if it is not stored.
+        """
+        for codec in CODEC_SUFFIXES:
+            if os.path.exists(self._path(digest, codec)):
+                return codec
+        return None
+
+    def put(self, data):
+        """
+        Store one chunk unless it already exists and return its manifest entry.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        codec = self._find(digest)
+        if codec is not None:
+            stored_size = os.path.getsize(self._path(digest, codec))
+            with self._lock:
+                self.bytes_reused += len(data)
+        else:
+            codec = self.codec
+            compressed = _compress(data, codec, self.level)
+            path = self._path(digest, codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(temp_path, path)
+            stored_size = len(compressed)
+            with self._lock:
+                self.bytes_written += len(data)
+        return {'hash': digest, 'size': len(data), 'codec': codec, 'stored_size': stored_size}
+
+    def get(self, entry):
+        """
+        Read, decompress and verify one chunk from its manifest entry.
+        """
+        digest = entry['hash']
+        codec = entry.get('codec', 'none')
+        try:
+            with open(self._path(digest, codec), 'rb') as f:
+                data = _decompress(f.read(), codec, entry['size'])
+        except FileNotFoundError:
+            raise ChunkIntegrityError(f"Chunk {digest} is missing from {self.root}")
+        except _DECOMPRESSION_ERRORS as e:
+            raise ChunkIntegrityError(f"Chunk {digest} failed to decompress: {e}")
+        if len(data) != entry['size'] or hashlib.sha256(data).hexdigest() != digest:
+            raise ChunkIntegrityError(f"Chunk {digest} does not match its checksum")
+        return data
+
+    def has(self, digest):
+        return self._find(digest) is not None
+
+    def write_object(self, obj):
+        """
+        Pickle `obj` into the store and return its list of chunk entries.
+        """
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            writer = _ChunkingWriter(self, executor, 2 * self.n_threads)
+            pickle.dump(obj, writer, protocol=pickle.HIGHEST_PROTOCOL)
+            writer.flush(final=True)
+        return writer.chunks
+
+    def read_object(self, chunks):
+        """
+        Unpickle an object from its chunk entries, streaming and verifying the chunks.
+        """
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            reader = _ChunkReader(self, chunks, executor, 2 * self.n_threads)
+            with io.BufferedReader(reader, buffer_size=1024 * 1024) as stream:
+                return pickle.load(stream)
+
+    def verify(self, chunks):
+        """
+        Read and verify every chunk of a manifest without unpickling it, stopping at the first
+        bad chunk. Returns the number of uncompressed bytes verified.
+        """
+        verified = 0
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            reader = _ChunkReader(self, chunks, executor, 2 * self.n_threads)
+            try:
+                while reader.futures:
+                    verified += len(reader.futures.popleft().result())
+                    reader._prefetch()
+            finally:
+                executor.shutdown(cancel_futures=True)
+        return verified
+
+    def digests(self):
+        """
+        Yield the hash of every chunk in the store.
+        """
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if os.path.isdir(prefix_dir):
+                for name in os.listdir(prefix_dir):
+                    if not name.endswith('.tmp'):
+                        yield name.split('.')[0]
+
+    @contextlib.contextmanager
+    def lock(self, exclusive=False):
+        """
+        Hold the store's file lock (flock on `root/.lock`), shared or exclusive, across
+        processes. Without fcntl (e.g. on Windows) this does not lock.
+        """
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            if HAS_FCNTL:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield self
+            finally:
+                if HAS_FCNTL:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def garbage_collect(self, referenced):
+        """
+        Delete every chunk whose hash is not in `referenced`. Returns (chunks, bytes) freed.
+        Hold lock(exclusive=True) from before `referenced` is read until this returns.
+        """
+        freed_chunks, freed_bytes = 0, 0
+        for digest in set(self.digests()):
+            if digest not in referenced:
+                codec = self._find(digest)
+                path = self._path(digest, codec)
+                freed_bytes += os.path.getsize(path)
+                os.remove(path)
+                freed_chunks += 1
+        return freed_chunks, freed_bytes
+
+
+def throughput(nbytes, seconds):
+    """
+    Format a byte count over elapsed seconds as MB/s.
+    """
+    return f"{nbytes / 1024 ** 2 / seconds if seconds else float('inf'):.1f} MB/s"
+
+
+def load_manifest(backup_path):
+    """
+    Load a backup's manifest.json, or return None for a legacy backup holding a plain pickle.
+    """
+    manifest_path = os.path.join(backup_path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def store_for_backup(backup_path, **kwargs):
+    """
+    Return the ChunkStore shared by the backup directory that contains `backup_path`.
+    """
+    return ChunkStore(os.path.join(os.path.dirname(os.path.abspath(backup_path)), 'chunks'), **kwargs)
@@ -1 +1,211 @@
-DataLoader Utility Placeholder
\ No newline at end of file
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def load_schema(schema_path):
+    """
+    Load a dtype schema: a JSON object mapping column names to pandas dtype strings
+    (e.g. {"age": "int16", "country": "category"}).
+    """
+    with open(schema_path, 'r') as f:
+        return json.load(f)
+
+
+def load_data(file_path, columns=None, dtypes=None, engine='auto', optimize=False, report_memory=False):
+    """
+    Load a dataset from a CSV, Parquet or NumPy (.npy) file, or a sparse CSR matrix (.npz).
+
+    file_path: str
+        The file to load. The format is detected from the extension; Parquet and .npy files
+        are memory-mapped instead of being parsed as text, and .npz files are returned as a
+        scipy.sparse CSR matrix.
+    columns: list of str, default=None
+        Only load these columns (ignored for .npz).
+    dtypes: dict, default=None
+        Explicit dtypes per column; columns not listed are inferred.
+    engine: str, default="auto"
+        CSV parser. "pyarrow" is multi-threaded; "auto" uses it when pyarrow is installed and
+        falls back to the pandas C parser otherwise.
+    optimize: bool, default=False
+        Downcast inferred columns with optimize_dtypes. Columns in `dtypes` are left as given.
+    report_memory: bool, default=False
+        Print the frame's memory usage after loading.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.npz':
+        return sparse.load_npz(file_path).tocsr()
+    if extension == '.npy':
+        df = load_npy(file_path, columns=columns)
+    elif extension == '.parquet':
+        df = pd.read_parquet(file_path, columns=columns, memory_map=True)
+    else:
+        df = read_csv(file_path, columns=columns, dtypes=dtypes, engine=engine)
+
+    if dtypes:
+        df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+    if optimize:
+        df = optimize_dtypes(df, exclude=list(dtypes or {}))
+    if report_memory:
+        print_memory_usage(df, label=os.path.basename(file_path))
+    return df
+
+
+def read_csv(file_path, columns=None, dtypes=None, engine='auto'):
+    """
+    Parse a CSV file, with the multi-threaded pyarrow engine when available.
+    """
+    if engine == 'auto':
+        engine = 'pyarrow' if HAS_PYARROW else 'c'
+    if engine == 'pyarrow':
+        try:
+            return pd.read_csv(file_path, usecols=columns, dtype=dtypes, engine='pyarrow')
+        except (ValueError, TypeError) as e:
+            logging.warning(f"pyarrow CSV engine failed on {file_path} ({e}); falling back to the C parser")
+    return pd.read_csv(file_path, usecols=columns, dtype=dtypes, engine='c')
+
+
+def load_npy(file_path, columns=None):
+    """
+    Memory-map a .npy file written by preprocess_data.save_npy and wrap it in a DataFrame,
+    restoring column names and dtypes from its `.schema.json` sidecar when present.
+    """
+    array = np.load(file_path, mmap_mode='r')
+    schema = {}
+    schema_path = os.path.splitext(file_path)[0] + '.schema.json'
+    if os.path.exists(schema_path):
+        with open(schema_path, 'r') as f:
+            schema = json.load(f)
+
+    if array.dtype.names:
+        names = [name for name in array.dtype.names if columns is None or name in columns]
+        df = pd.DataFrame({name: array[name] for name in names})
+    else:
+        df = pd.DataFrame(array, columns=schema.get('columns'), copy=False)
+        if columns is not None:
+            df = df[columns]
+
+    for column, dtype in schema.get('dtypes', {}).items():
+        if column in df.columns and str(df[column].dtype) != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def find_split_file(data_dir, name):
+    """
+    Locate `name` (e.g. 'X_train') in a directory written by preprocess_data.save_data,
+    preferring binary formats over CSV.
+    """
+    for extension in ('.npz', '.npy', '.parquet', '.csv'):
+        path = os.path.join(data_dir, f'{name}{extension}')
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {name} file found in {data_dir}")
+
+
+def load_split(data_dir, split):
+    """
+    Load the features and target of a split ('train' or 'test') from a directory
+    written by preprocess_data.save_data. Split files are loaded exactly as written.
+    """
+    X = load_data(find_split_file(data_dir, f'X_{split}'), optimize=False)
+    y = load_data(find_split_file(data_dir, f'y_{split}'), optimize=False)
+    return X, y.iloc[:, 0]
+
+
+def iter_chunks(file_path, chunksize, columns=None, dtypes=None, optimize=False):
+    """
+    Yield DataFrame chunks of at most `chunksize` rows from a CSV, Parquet or .npy file.
+
+    CSV chunks come from the pandas C parser (the pyarrow engine cannot stream); Parquet is
+    read batch by batch and .npy files are sliced from a memory map. Downcasting is off by
+    default because per-chunk inference can give different dtypes to different chunks.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns))
+    elif extension == '.npy':
+        df = load_npy(file_path, columns=columns)
+        chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+    else:
+        chunks = pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+    for chunk in chunks:
+        if dtypes and extension != '.csv':
+            chunk = chunk.astype({column: dtype for column, dtype in dtypes.items() if column in chunk.columns})
+        if optimize:
+            chunk = optimize_dtypes(chunk, exclude=list(dtypes or {}))
+        yield chunk
+
+
+def optimize_dtypes(df, category_threshold=0.5, exclude=None):
+    """
+    Shrink inferred dtypes without changing any values.
+
+    Object columns whose distinct-value ratio is below `category_threshold` become categoricals,
+    integers are downcast to the smallest type that holds their range, and floats become float32
+    only when every value survives the round trip exactly.
+    """
+    exclude = set(exclude or [])
+    converted = {}
+    for column in df.columns:
+        if column in exclude:
+            continue
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            if len(series) and series.nunique(dropna=True) / len(series) < category_threshold:
+                converted[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+            downcast = pd.to_numeric(series, downcast='unsigned' if len(series) and series.min() >= 0 else 'integer')
+            if downcast.dtype != series.dtype:
+                converted[column] = downcast
+        elif series.dtype == np.float64:
+            values = series.to_numpy()
+            narrowed = values.astype(np.float32)
+            if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+                converted[column] = pd.Series(narrowed, index=series.index, name=column)
+    if not converted:
+        return df
+    # Column labels need not be strings, so set columns by label rather than with assign()
+    df = df.copy(deep=False)
+    for column, series in converted.items():
+        df[column] = series
+    return df
+
+
+def memory_usage(df):
+    """
+    Return the deep memory usage of a DataFrame in bytes, per column and in total.
+    """
+    per_column = df.memory_usage(deep=True, index=True)
+    return {'total': int(per_column.sum()), 'columns': {str(column): int(size) for column, size in per_column.items()}}
+
+
+def print_memory_usage(df, label='DataFrame', top=5):
+    """
+    Print total memory usage and the largest columns of a DataFrame.
+    """
+    usage = memory_usage(df)
+    print(f"{label}: {len(df)} rows x {df.shape[1]} columns, {usage['total'] / 1024 ** 2:.2f} MB")
+    largest = sorted(usage['columns'].items(), key=lambda item: item[1], reverse=True)[:top]
+    for column, size in largest:
+        print(f"  {column}: {size / 1024 ** 2:.2f} MB")
@@ -1 +1,221 @@
-Data Validation Utilities Placeholder
\ No newline at end of file
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.utils.data_loader import load_data, iter_chunks
+
+
+class DataValidationError(ValueError):
+    """
+    Raised when a dataset violates its schema. The full ValidationReport is attached as `report`.
+    """
+    def __init__(self, report):
+        super().__init__(report.summary())
+        self.report = report
+
+
+class ValidationReport:
+    """
+    Violations found by SchemaValidator: a count and a small sample of offending rows per rule.
+    """
+    def __init__(self, sample_size=5):
+        self.sample_size = sample_size
+        self.rows = 0
+        self.errors = {}
+
+    def add(self, column, rule, count, sample=None):
+        if count == 0:
+            return
+        entry = self.errors.setdefault((column, rule), {'count': 0, 'sample': []})
+        entry['count'] += int(count)
+        room = self.sample_size - len(entry['sample'])
+        if sample and room > 0:
+            entry['sample'].extend(sample[:room])
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'ok': self.ok,
+            'errors': [dict(column=column, rule=rule, **entry) for (column, rule), entry in self.errors.items()],
+        }
+
+    def summary(self):
+        if self.ok:
+            return f"Validation passed: {self.rows} rows checked."
+        lines = [f"Validation failed: {len(self.errors)} rule(s) violated over {self.rows} rows."]
+        for (column, rule), entry in self.errors.items():
+            lines.append(f"  {column} [{rule}]: {entry['count']} violation(s), e.g. {entry['sample']}")
+        return "\n".join(lines)
+
+
+class SchemaValidator:
+    """
+    Declarative, vectorized DataFrame validator.
+
+    The schema is a dict (or JSON file) of the form::
+
+        {
+            "strict": false,
+            "columns": {
+                "age": {"dtype": "integer", "min": 0, "max": 120, "max_null_ratio": 0.05},
+                "country": {"allowed": ["us", "uk", "de"], "nullable": false},
+                "signup": {"dtype": "datetime", "required": false}
+            }
+        }
+
+    Supported rules per column: `required` (default true), `dtype` (numeric, integer, float,
+    bool, datetime, string), `min`, `max`, `allowed`, `nullable` and `max_null_ratio`. With
+    `strict`, columns not in the schema are reported. Every rule is evaluated on whole columns
+    at once; null ratios are accumulated across chunks and checked at the end.
+    """
+    DTYPES = ['numeric', 'integer', 'float', 'bool', 'datetime', 'string']
+
+    def __init__(self, schema, sample_size=5):
+        self.columns = schema.get('columns', {})
+        self.strict = schema.get('strict', False)
+        self.sample_size = sample_size
+        for column, rules in self.columns.items():
+            if rules.get('dtype') and rules['dtype'] not in self.DTYPES:
+                raise ValueError(f"Unknown dtype for column {column}: {rules['dtype']}")
+
+    @classmethod
+    def from_file(cls, schema_path, sample_size=5):
+        with open(schema_path, 'r') as f:
+            return cls(json.load(f), sample_size=sample_size)
+
+    def validate(self, df):
+        """
+        Validate a single DataFrame.
+        """
+        return self.validate_chunks([df])
+
+    def validate_chunks(self, chunks):
+        """
+        Validate a stream of DataFrame chunks, accumulating counts and samples per rule.
+        """
+        report = ValidationReport(self.sample_size)
+        null_counts = {column: 0 for column in self.columns}
+        seen_columns = None
+        for chunk in chunks:
+            seen_columns = set(chunk.columns) if seen_columns is None else seen_columns & set(chunk.columns)
+            positions = np.arange(report.rows, report.rows + len(chunk))
+            for column, rules in self.columns.items():
+                if column in chunk.columns:
+                    null_counts[column] += self._check_column(chunk[column], positions, rules, report)
+            report.rows += len(chunk)
+
+        seen_columns = seen_columns or set()
+        for column, rules in self.columns.items():
+            if column not in seen_columns:
+                if rules.get('required', True):
+                    report.add(column, 'required', 1, [{'row': None, 'value': 'column missing'}])
+                continue
+            max_null_ratio = 0.0 if rules.get('nullable') is False else rules.get('max_null_ratio')
+            if max_null_ratio is not None and report.rows and null_counts[column] / report.rows > max_null_ratio:
+                ratio = null_counts[column] / report.rows
+                report.add(column, 'max_null_ratio', null_counts[column], [{'row': None, 'value': f"null ratio {ratio:.4f}"}])
+
+        if self.strict:
+            for column in sorted(seen_columns - set(self.columns), key=str):
+                report.add(column, 'unexpected_column', 1, [{'row': None, 'value': 'column not in schema'}])
+        return report
+
+    def validate_file(self, file_path, chunksize=None):
+        """
+        Validate a CSV, Parquet or .npy file, streaming it in chunks when `chunksize` is set.
+        Only schema columns are read unless the schema is strict.
+        """
+        columns = None
+        if not self.strict:
+            header = next(iter_chunks(file_path, 1))
+            columns = [column for column in self.columns if column in header.columns]
+        if chunksize:
+            chunks = iter_chunks(file_path, chunksize, columns=columns)
+        else:
+            chunks = [load_data(file_path, columns=columns, optimize=False)]
+        return self.validate_chunks(chunks)
+
+    def _check_column(self, series, positions, rules, report):
+        """
+        Apply a column's rules to one chunk and return its null count.
+        """
+        column = series.name
+        nulls = series.isna().to_numpy()
+        present = ~nulls
+        dtype = rules.get('dtype')
+
+        values = series
+        if dtype in ('numeric', 'integer', 'float') or 'min' in rules or 'max' in rules:
+            values = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+            if dtype is not None or not pd.api.types.is_numeric_dtype(series):
+                self._add(report, column, 'dtype', present & values.isna().to_numpy(), series, positions)
+            if dtype == 'integer':
+                self._add(report, column, 'dtype', (values.notna() & (values % 1 != 0)).to_numpy(), series, positions)
+        elif dtype == 'datetime':
+            parsed = series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_datetime(series, errors='coerce')
+            self._add(report, column, 'dtype', present & parsed.isna().to_numpy(), series, positions)
+        elif dtype == 'bool':
+            if not pd.api.types.is_bool_dtype(series):
+                normalized = series.astype(str).str.strip().str.lower()
+                valid = normalized.isin(['true', 'false', '1', '0', '1.0', '0.0']).to_numpy()
+                self._add(report, column, 'dtype', present & ~valid, series, positions)
+        elif dtype == 'string':
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Check each category once; missing values have code -1 and are not present
+                is_str = np.append(_is_str(pd.Series(series.cat.categories, dtype=object)), False)[series.cat.codes]
+                self._add(report, column, 'dtype', present & ~is_str, series, positions)
+            elif pd.api.types.is_object_dtype(series):
+                # Object columns can mix types; every present value must be a str
+                self._add(report, column, 'dtype', present & ~_is_str(series), series, positions)
+            elif not pd.api.types.is_string_dtype(series):
+                self._add(report, column, 'dtype', present, series, positions)
+
+        if 'min' in rules:
+            self._add(report, column, 'min', (values < rules['min']).to_numpy(), series, positions)
+        if 'max' in rules:
+            self._add(report, column, 'max', (values > rules['max']).to_numpy(), series, positions)
+        if 'allowed' in rules:
+            self._add(report, column, 'allowed', present & ~series.isin(rules['allowed']).to_numpy(), series, positions)
+        return int(nulls.sum())
+
+    def _add(self, report, column, rule, mask, series, positions):
+        count = int(np.count_nonzero(mask))
+        if count:
+            offending = np.flatnonzero(mask)[:self.sample_size]
+            sample = [{'row': int(positions[i]), 'value': _jsonable(series.iloc[i])} for i in offending]
+            report.add(column, rule, count, sample)
+
+
+def _is_str(values):
+    """
+    Mark the str values of an object Series. Columns pandas infers as all strings skip the
+    per-value check; otherwise the value types are factorized and each type is checked once.
+    """
+    if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+        return np.ones(len(values), dtype=bool)
+    codes, types = pd.factorize(values.map(type))
+    return np.array([issubclass(kind, str) for kind in types], dtype=bool)[codes]
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def validate_dataframe(df, schema, raise_on_error=True):
+    """
+    Validate `df` against a schema dict and raise DataValidationError on any violation.
+    Returns the ValidationReport.
+    """
+    report = SchemaValidator(schema).validate(df)
+    if raise_on_error and not report.ok:
+        raise DataValidationError(report)
+    return report
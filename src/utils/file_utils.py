@@ -1 +1,40 @@
-FileUtils Module Placeholder
\ No newline at end of file
+import os
+import hashlib
+
+
+def file_fingerprint(path, sample_blocks=16, block_size=64 * 1024):
+    """
+    Cheap content fingerprint of a file: its size and mtime plus a hash of sampled blocks.
+
+    The first and last blocks and `sample_blocks` evenly spaced blocks in between are hashed,
+    so multi-GB files are fingerprinted in a handful of reads. Files no larger than the sampled
+    total are hashed in full.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if stat.st_size <= block_size * (sample_blocks + 2):
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        else:
+            last = stat.st_size - block_size
+            offsets = [0] + [last * i // (sample_blocks + 1) for i in range(1, sample_blocks + 1)] + [last]
+            for offset in offsets:
+                f.seek(offset)
+                digest.update(f.read(block_size))
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sample_hash': digest.hexdigest(),
+    }
+
+
+def directory_size(path):
+    """
+    Total size in bytes of the regular files under `path`.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
@@ -1 +1,430 @@
-Hyperparameter Tuning Utilities Placeholder
\ No newline at end of file
+import os
+import json
+import math
+import time
+import shutil
+import hashlib
+import logging
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LogisticRegression, LinearRegression
+from sklearn.svm import SVC, SVR
+
+
+# Model families mirror the names accepted by scripts/train_model.py
+ESTIMATORS = {
+    'classification': {
+        'random_forest': RandomForestClassifier,
+        'logistic_regression': LogisticRegression,
+        'svm': SVC,
+    },
+    'regression': {
+        'random_forest': RandomForestRegressor,
+        'linear_regression': LinearRegression,
+        'svm': SVR,
+    },
+}
+
+
+class Uniform:
+    """
+    Continuous search dimension sampled uniformly (or log-uniformly) between `low` and `high`.
+    """
+    def __init__(self, low, high, log=False):
+        self.low = low
+        self.high = high
+        self.log = log
+
+    def sample(self, rng):
+        if self.log:
+            return float(math.exp(rng.uniform(math.log(self.low), math.log(self.high))))
+        return float(rng.uniform(self.low, self.high))
+
+    def grid(self, n_points):
+        if self.log:
+            return [float(v) for v in np.geomspace(self.low, self.high, n_points)]
+        return [float(v) for v in np.linspace(self.low, self.high, n_points)]
+
+
+class IntUniform:
+    """
+    Integer search dimension sampled uniformly from [`low`, `high`].
+    """
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng):
+        return int(rng.integers(self.low, self.high + 1))
+
+    def grid(self, n_points):
+        return sorted({int(round(v)) for v in np.linspace(self.low, self.high, n_points)})
+
+
+class LogUniform(Uniform):
+    """
+    Continuous search dimension sampled log-uniformly between `low` and `high`.
+    """
+    def __init__(self, low, high):
+        super().__init__(low, high, log=True)
+
+
+DEFAULT_SEARCH_SPACES = {
+    'classification': {
+        'random_forest': {
+            'n_estimators': [50, 100, 200, 400],
+            'max_depth': [None, 5, 10, 20, 40],
+            'min_samples_split': IntUniform(2, 20),
+            'max_features': ['sqrt', 'log2', None],
+        },
+        'logistic_regression': {
+            'C': LogUniform(1e-3, 1e2),
+            'max_iter': [1000],
+        },
+        'svm': {
+            'C': LogUniform(1e-2, 1e2),
+            'gamma': ['scale', 'auto'],
+            'kernel': ['rbf', 'linear'],
+        },
+    },
+    'regression': {
+        'random_forest': {
+            'n_estimators': [50, 100, 200, 400],
+            'max_depth': [None, 5, 10, 20, 40],
+            'min_samples_split': IntUniform(2, 20),
+            'max_features': [1.0, 'sqrt', 'log2'],
+        },
+        'linear_regression': {
+            'fit_intercept': [True, False],
+        },
+        'svm': {
+            'C': LogUniform(1e-2, 1e2),
+            'epsilon': Uniform(0.01, 1.0),
+            'kernel': ['rbf', 'linear'],
+        },
+    },
+}
+
+
+def build_estimator(model_type, model_name, params=None):
+    """
+    Instantiate the estimator for a model family with the given hyperparameters.
+    """
+    if model_type not in ESTIMATORS:
+        raise ValueError(f"Unknown model type: {model_type}")
+    if model_name not in ESTIMATORS[model_type]:
+        raise ValueError(f"Unknown model name: {model_name}")
+    return ESTIMATORS[model_type][model_name](**(params or {}))
+
+
+def grid_candidates(space, grid_points=5):
+    """
+    Expand a search space into every combination; continuous dimensions contribute `grid_points` values.
+    """
+    names = sorted(space)
+    values = [space[name] if isinstance(space[name], list) else space[name].grid(grid_points) for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def random_candidates(space, n_candidates, rng):
+    """
+    Draw `n_candidates` independent parameter sets from a search space.
+    """
+    candidates = []
+    for _ in range(n_candidates):
+        params = {}
+        for name in sorted(space):
+            dimension = space[name]
+            if isinstance(dimension, list):
+                params[name] = dimension[int(rng.integers(len(dimension)))]
+            else:
+                params[name] = dimension.sample(rng)
+        candidates.append(params)
+    return candidates
+
+
+def share_arrays(X, y, directory):
+    """
+    Write X and y to .npy files under `directory` so worker processes can memory-map them.
+
+    Sparse matrices are stored as their CSR components. Object targets (e.g. string labels)
+    are stored as fixed-width unicode so they stay memory-mappable.
+    """
+    paths = {}
+    if sparse.issparse(X):
+        X = X.tocsr()
+        for name in ('data', 'indices', 'indptr'):
+            paths[f'X_{name}'] = os.path.join(directory, f'X_{name}.npy')
+            np.save(paths[f'X_{name}'], getattr(X, name))
+        paths['X_shape'] = list(X.shape)
+    else:
+        paths['X'] = os.path.join(directory, 'X.npy')
+        np.save(paths['X'], np.ascontiguousarray(np.asarray(X)))
+
+    y = np.asarray(y)
+    if y.dtype == object:
+        y = y.astype(str)
+    paths['y'] = os.path.join(directory, 'y.npy')
+    np.save(paths['y'], y)
+    return paths
+
+
+def data_fingerprint(X, y):
+    """
+    Hash the shape, dtype and contents of X and y, so logged trials are only reused for the
+    data they were run on.
+    """
+    digest = hashlib.sha1()
+    if sparse.issparse(X):
+        X = X.tocsr()
+        parts = [X.data, X.indices, X.indptr]
+        digest.update(repr(X.shape).encode('utf-8'))
+    else:
+        parts = [np.asarray(X)]
+    parts.append(np.asarray(y))
+    for part in parts:
+        if part.dtype == object:
+            part = part.astype(str)
+        digest.update(f'{part.shape}{part.dtype.str}'.encode('utf-8'))
+        digest.update(np.ascontiguousarray(part).data)
+    return digest.hexdigest()
+
+
+def load_shared_arrays(paths):
+    """
+    Memory-map the arrays written by share_arrays.
+    """
+    if 'X' in paths:
+        X = np.load(paths['X'], mmap_mode='r')
+    else:
+        components = [np.load(paths[f'X_{name}'], mmap_mode='r') for name in ('data', 'indices', 'indptr')]
+        X = sparse.csr_matrix(tuple(components), shape=tuple(paths['X_shape']), copy=False)
+    return X, np.load(paths['y'], mmap_mode='r')
+
+
+_shared = {}
+
+
+def _init_worker(paths, train_index, validation_index):
+    _shared['X'], _shared['y'] = load_shared_arrays(paths)
+    _shared['train_index'] = train_index
+    _shared['validation_index'] = validation_index
+
+
+def _run_trial(model_type, model_name, params, budget):
+    """
+    Fit one candidate on the first `budget` training rows and score it on the validation rows.
+    Higher scores are better: accuracy for classification, negative MSE for regression.
+    """
+    X, y = _shared['X'], _shared['y']
+    train_index = _shared['train_index'][:budget]
+    validation_index = _shared['validation_index']
+    started = time.perf_counter()
+    try:
+        model = build_estimator(model_type, model_name, params)
+        model.fit(X[train_index], y[train_index])
+        predictions = model.predict(X[validation_index])
+        if model_type == 'classification':
+            score = float(accuracy_score(y[validation_index], predictions))
+        else:
+            score = -float(mean_squared_error(y[validation_index], predictions))
+        return {'status': 'ok', 'score': score, 'seconds': time.perf_counter() - started}
+    except Exception as e:
+        return {'status': 'error', 'score': None, 'error': str(e), 'seconds': time.perf_counter() - started}
+
+
+class TrialLog:
+    """
+    Append-only JSON-lines record of finished trials, keyed by model, parameters, budget and
+    a fingerprint of the data and its validation split.
+    Re-opening an existing log lets an interrupted search resume without re-running trials.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.records = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self.records[record['key']] = record
+
+    @staticmethod
+    def key(model_type, model_name, params, budget, random_state, data=None):
+        payload = json.dumps([model_type, model_name, params, budget, random_state, data], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def append(self, record):
+        self.records[record['key']] = record
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+class HyperparameterTuner:
+    """
+    Parallel hyperparameter search over the model families in scripts/train_model.py.
+
+    Candidates come from a random or grid search space and are allocated training-set rows
+    as their budget by successive halving or Hyperband (or all get the full budget with
+    strategy='none'). Trials run in a process pool against memory-mapped copies of the
+    training data, and finished trials are appended to a resumable trial log. With Hyperband,
+    the search stops early once `patience` brackets in a row fail to improve the best
+    full-budget score by `min_delta`. Successive halving visits each budget only once, so
+    `patience` is rejected for the other strategies.
+
+    Scores are only compared between rungs of the same budget, since a small-budget score is
+    noisier and not comparable to a full-budget one. The result is the best candidate at the
+    highest budget that was evaluated.
+    """
+    def __init__(self, model_type, model_name, search_space=None, search='random', n_candidates=27,
+                 strategy='successive_halving', eta=3, min_resource=None, n_jobs=None, trial_log=None,
+                 patience=None, min_delta=0.0, validation_size=0.2, grid_points=5, random_state=42):
+        if search not in ['random', 'grid']:
+            raise ValueError(f"Unknown search: {search}")
+        if strategy not in ['successive_halving', 'hyperband', 'none']:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        if patience is not None and strategy != 'hyperband':
+            raise ValueError("patience only applies to strategy='hyperband'")
+
+        self.model_type = model_type
+        self.model_name = model_name
+        self.search_space = search_space if search_space is not None else DEFAULT_SEARCH_SPACES[model_type][model_name]
+        self.search = search
+        self.n_candidates = n_candidates
+        self.strategy = strategy
+        self.eta = eta
+        self.min_resource = min_resource
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.trial_log = TrialLog(trial_log)
+        self.patience = patience
+        self.min_delta = min_delta
+        self.validation_size = validation_size
+        self.grid_points = grid_points
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state)
+        self.trials = []
+        self.best_params = None
+        self.best_score = None
+        self.best_by_budget = {}
+        self._data = None
+
+    def _candidates(self, n_candidates):
+        if self.search == 'grid':
+            grid = grid_candidates(self.search_space, self.grid_points)
+            if n_candidates is None or n_candidates >= len(grid):
+                return grid
+            chosen = self.rng.choice(len(grid), size=n_candidates, replace=False)
+            return [grid[i] for i in chosen]
+        return random_candidates(self.search_space, n_candidates, self.rng)
+
+    def _evaluate(self, executor, candidates, budget):
+        """
+        Score every candidate at `budget`, reusing logged results, and return (score, params) pairs.
+        """
+        keys = [TrialLog.key(self.model_type, self.model_name, params, budget, self.random_state, self._data)
+                for params in candidates]
+        pending = {}
+        for key, params in zip(keys, candidates):
+            if self.trial_log.get(key) is None and key not in pending:
+                pending[key] = executor.submit(_run_trial, self.model_type, self.model_name, params, budget)
+
+        for key, params in zip(keys, candidates):
+            if key in pending:
+                record = dict(pending[key].result(), key=key, params=params, budget=budget)
+                self.trial_log.append(record)
+                del pending[key]
+
+        results = []
+        for key, params in zip(keys, candidates):
+            record = self.trial_log.get(key)
+            self.trials.append(record)
+            score = record['score'] if record['status'] == 'ok' else float('-inf')
+            results.append((score, params))
+        logging.info(f"Evaluated {len(candidates)} candidates at budget {budget}: best {max(r[0] for r in results):.4f}")
+        return results
+
+    def _successive_halving(self, executor, candidates, min_resource, max_resource):
+        rung = 0
+        while True:
+            # Budgets come from the rung number rather than repeated rounding, so Hyperband
+            # brackets meet at identical budgets whose results can be compared
+            budget = min(max(int(round(min_resource * self.eta ** rung)), 1), max_resource)
+            results = self._evaluate(executor, candidates, budget)
+            results.sort(key=lambda r: r[0], reverse=True)
+            self._record(budget, results[0])
+            if len(results) == 1 or budget >= max_resource:
+                return results[0]
+            candidates = [params for _, params in results[:max(1, len(results) // self.eta)]]
+            rung += 1
+
+    def _record(self, budget, result):
+        """
+        Keep a rung's best result if it beats earlier rungs at the same budget, and take the
+        overall best from the highest budget evaluated.
+        """
+        score, params = result
+        best = self.best_by_budget.get(budget)
+        if best is None or score > best[0]:
+            self.best_by_budget[budget] = (score, params)
+        self.best_score, self.best_params = self.best_by_budget[max(self.best_by_budget)]
+
+    def fit(self, X, y):
+        """
+        Run the search on (X, y) and return the best parameters found. Raises RuntimeError if
+        every trial failed.
+        """
+        n_samples = X.shape[0]
+        permutation = self.rng.permutation(n_samples)
+        n_validation = max(1, int(n_samples * self.validation_size))
+        validation_index, train_index = permutation[:n_validation], permutation[n_validation:]
+        max_resource = len(train_index)
+        min_resource = self.min_resource or max(min(max_resource, 100), max_resource // self.eta ** 3)
+        self.best_by_budget = {}
+        self._data = f'{data_fingerprint(X, y)}:{self.validation_size}'
+
+        directory = tempfile.mkdtemp(prefix='quanticore_tuning_')
+        try:
+            paths = share_arrays(X, y, directory)
+            with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                     initargs=(paths, train_index, validation_index)) as executor:
+                if self.strategy == 'none':
+                    results = self._evaluate(executor, self._candidates(self.n_candidates), max_resource)
+                    self._record(max_resource, max(results, key=lambda r: r[0]))
+                elif self.strategy == 'successive_halving':
+                    self._successive_halving(executor, self._candidates(self.n_candidates), min_resource, max_resource)
+                else:
+                    self._hyperband(executor, min_resource, max_resource)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if self.best_score == float('-inf'):
+            errors = [trial['error'] for trial in self.trials if trial['status'] == 'error']
+            raise RuntimeError(f"Every trial failed for {self.model_name}; first error: {errors[0]}")
+        logging.info(f"Best parameters for {self.model_name}: {self.best_params} (score {self.best_score:.4f})")
+        return self.best_params
+
+    def _hyperband(self, executor, min_resource, max_resource):
+        s_max = int(math.floor(math.log(max_resource / min_resource, self.eta) + 1e-9))
+        stale = 0
+        for s in range(s_max, -1, -1):
+            n_candidates = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            previous = self.best_by_budget.get(max_resource)
+            self._successive_halving(executor, self._candidates(n_candidates), max_resource / self.eta ** s, max_resource)
+            # Brackets are compared on their full-budget results only
+            current = self.best_by_budget.get(max_resource)
+            improved = current is not None and (previous is None or current[0] > previous[0] + self.min_delta)
+            stale = 0 if improved else stale + 1
+            if self.patience is not None and stale >= self.patience:
+                logging.info(f"No full-budget improvement in {stale} brackets; stopping early")
+                break
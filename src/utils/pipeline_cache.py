@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+from src.utils.file_utils import file_fingerprint, directory_size
+
+
+class PipelineCache:
+    """
+    Content-addressed cache of pipeline stage outputs (preprocess_data.py, data_cleanup.py).
+
+    Entries are keyed by the fingerprints of the input files plus the stage's full parameter
+    set. A hit copies the stored outputs into place instead of recomputing them. The cache
+    directory is kept under `max_bytes` by evicting the least recently used entries, and
+    hits/misses are counted per stage.
+    """
+    VERSION = 1
+
+    def __init__(self, cache_dir='.quanticore_cache', max_bytes=5 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage, input_files, params):
+        """
+        Build the cache key for a stage run over `input_files` with `params`.
+        """
+        payload = {
+            'version': self.VERSION,
+            'stage': stage,
+            'inputs': [file_fingerprint(path) for path in input_files],
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _record(self, stage, hit):
+        counts = self.stats.setdefault(stage, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+        print(f"[cache] {stage}: {'hit' if hit else 'miss'}")
+
+    def fetch(self, stage, key, output_dir):
+        """
+        Copy a cached entry's files into `output_dir`. Returns the restored paths, or None on a miss.
+        """
+        manifest_path = os.path.join(self._entry_dir(key), 'manifest.json')
+        if not os.path.exists(manifest_path):
+            self._record(stage, False)
+            return None
+
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        os.makedirs(output_dir, exist_ok=True)
+        restored = []
+        for name in manifest['files']:
+            destination = os.path.join(output_dir, name)
+            shutil.copyfile(os.path.join(self._entry_dir(key), 'files', name), destination)
+            restored.append(destination)
+
+        # Touch the manifest so its mtime tracks the last access for LRU eviction
+        os.utime(manifest_path)
+        self._record(stage, True)
+        return restored
+
+    def store(self, stage, key, paths):
+        """
+        Store the output files of a stage run under `key`, then evict entries over the size bound.
+        """
+        entry_dir = self._entry_dir(key)
+        staging_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(os.path.join(staging_dir, 'files'))
+        for path in paths:
+            shutil.copyfile(path, os.path.join(staging_dir, 'files', os.path.basename(path)))
+
+        manifest = {
+            'stage': stage,
+            'files': [os.path.basename(path) for path in paths],
+            'size': directory_size(staging_dir),
+            'created': time.time(),
+        }
+        with open(os.path.join(staging_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=4)
+
+        # Publish atomically so concurrent readers never see a partial entry
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(staging_dir, entry_dir)
+        self.evict()
+
+    def entries(self):
+        """
+        List (last_access, size, key) for every complete entry, least recently used first.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, key, 'manifest.json')
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r') as f:
+                    size = json.load(f)['size']
+                entries.append((os.path.getmtime(manifest_path), size, key))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted cache entry {key} ({size} bytes)")
+
+    def report(self):
+        """
+        Print hit/miss counts per stage.
+        """
+        for stage, counts in self.stats.items():
+            print(f"[cache] {stage}: {counts['hits']} hit(s), {counts['misses']} miss(es)")
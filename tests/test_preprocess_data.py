@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from preprocess_data import encode_categorical_features_sparse
+
+
+class TestEncodeCategoricalFeaturesSparse:
+    def setup_method(self):
+        self.df = pd.DataFrame({'color': ['red', None, 'blue', np.nan, 'red'], 'size': ['s', 'm', None, 'm', 's']})
+
+    def test_hashing_with_missing_values(self):
+        encoded, names = encode_categorical_features_sparse(self.df, ['color', 'size'], method='hashing', n_features=64)
+        assert names is None
+        assert encoded.shape == (5, 64)
+        # One token per column and row, missing values included
+        assert encoded.sum(axis=1).A1.tolist() == [2.0] * 5
+        # Rows 1 and 3 share color=missing and size=m, so they hash identically
+        assert (encoded[1] != encoded[3]).nnz == 0
+
+    def test_onehot_with_missing_values(self):
+        encoded, names = encode_categorical_features_sparse(self.df, ['color', 'size'], method='onehot')
+        # Missing is a category of its own: 3 colors and 3 sizes, first of each dropped
+        assert encoded.shape == (5, 4)
+        assert len(names) == 4
+        assert (encoded[1] != encoded[3]).nnz == 0